@@ -0,0 +1,214 @@
+"""Solve one day for many inputs in a single process, or a pool of them.
+
+Starting an interpreter and importing a day costs more than solving most
+inputs, so a batch imports the day once per process and then only parses
+and solves. Inputs come from a directory (every file in it) or a manifest
+(one path per line, relative to the manifest, `#` starts a comment). Every
+input becomes one JSON line, in the order of the inputs. Answers are kept
+in `result_cache`, an input that was solved before is answered from there
+unless `--no-cache` is given.
+
+    {"file": "...", "engine": "...", "results": {"part_one": ..., ...},
+     "wall_time": 0.01, "error": null}
+
+    python batch.py -D 9 inputs/
+    python batch.py -D 9 manifest.txt -j 0 -O results.jsonl
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import json
+import os
+import sys
+import time
+
+from result_cache import MISSING, ResultCache
+from runner import PARTS, get_module_name, load_day
+import engines
+import stages
+
+
+class BatchResult(NamedTuple):
+    file: str
+    engine: Optional[str]
+    results: Dict[str, Any]
+    wall_time: float
+    error: Optional[str]
+
+
+def get_inputs(source: str) -> List[str]:
+    """the files in a directory, or the paths listed in a manifest"""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if os.path.isfile(os.path.join(source, name))
+        )
+    directory = os.path.dirname(source)
+    inputs = []  # type: List[str]
+    with open(source) as f:
+        for line in f:
+            path = line.split("#", 1)[0].strip()
+            if path:
+                inputs.append(os.path.join(directory, path))
+    return inputs
+
+
+def solve(
+    day: int,
+    file: str,
+    parts: Sequence[str] = PARTS,
+    engine: str = engines.AUTO,
+    cache: Optional[ResultCache] = None,
+) -> BatchResult:
+    """parse and solve one input, reporting failures instead of raising them"""
+    module = load_day(day)
+    start = time.perf_counter()
+    selected = None  # type: Optional[engines.Engine]
+    try:
+        selected = engines.select(module, engine, os.path.getsize(file))
+        results = {}  # type: Dict[str, Any]
+        keys = {}  # type: Dict[str, str]
+        if cache is not None:
+            keys = {
+                part: cache.get_key(module, selected.name, file, {"part": part})
+                for part in parts
+            }
+            results = {part: cache.get(key) for part, key in keys.items()}
+        if not results or any(answer is MISSING for answer in results.values()):
+            data = module.parse(file)
+            results = stages.solve(module, selected, data, parts)
+            for part, key in keys.items():
+                cache.put(key, results[part])
+    except Exception as e:
+        return BatchResult(
+            file,
+            selected and selected.name,
+            {},
+            time.perf_counter() - start,
+            f"{type(e).__name__}: {e}",
+        )
+    return BatchResult(
+        file, selected.name, results, time.perf_counter() - start, None
+    )
+
+
+def _warm(day: int):
+    # pay for the imports once per worker, not once per input
+    load_day(day)
+
+
+def _solve_all(
+    day: int,
+    files: Sequence[str],
+    parts: Sequence[str],
+    engine: str,
+    cache_results: bool,
+) -> List[BatchResult]:
+    if not cache_results:
+        return [solve(day, file, parts, engine) for file in files]
+    with ResultCache() as cache:
+        return [solve(day, file, parts, engine, cache) for file in files]
+
+
+def _chunks(files: Sequence[str], size: int) -> Iterator[Sequence[str]]:
+    for start in range(0, len(files), size):
+        yield files[start : start + size]
+
+
+def run_batch(
+    day: int,
+    files: Sequence[str],
+    parts: Sequence[str] = PARTS,
+    jobs: int = 1,
+    chunk_size: int = 16,
+    engine: str = engines.AUTO,
+    cache_results: bool = True,
+) -> Iterator[BatchResult]:
+    """yield one result per input, in order, as soon as it is available"""
+    # an unknown day fails here, before any worker starts
+    get_module_name(day)
+    if jobs == 1:
+        for chunk in _chunks(files, chunk_size):
+            yield from _solve_all(day, chunk, parts, engine, cache_results)
+        return
+    with ProcessPoolExecutor(
+        max_workers=jobs or None, initializer=_warm, initargs=(day,)
+    ) as pool:
+        # inputs go out in chunks, one round trip per input would cost more
+        # than solving most of them
+        futures = [
+            pool.submit(_solve_all, day, chunk, parts, engine, cache_results)
+            for chunk in _chunks(files, chunk_size)
+        ]
+        for future in futures:
+            yield from future.result()
+
+
+def to_json_line(result: BatchResult) -> str:
+    return json.dumps(result._asdict(), default=str)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-D", "--day", type=int, required=True)
+    parser.add_argument("source", help="a directory of inputs or a manifest")
+    parser.add_argument("-P", "--part", choices=PARTS, action="append", dest="parts")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="solve on a pool of this many processes (0: one per core)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=16,
+        help="with --jobs, inputs sent to a worker at a time",
+    )
+    parser.add_argument(
+        "--engine",
+        default=engines.AUTO,
+        help="implementation of the parts to run (default: auto, per input)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="solve every input again, even ones answered before",
+    )
+    parser.add_argument(
+        "-O", "--output", help="write the JSON lines here instead of stdout"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    files = get_inputs(args.source)
+    output = open(args.output, "w") if args.output else sys.stdout
+    failures = 0
+    try:
+        for result in run_batch(
+            args.day,
+            files,
+            args.parts or PARTS,
+            args.jobs,
+            args.chunk_size,
+            args.engine,
+            not args.no_cache,
+        ):
+            if result.error:
+                failures += 1
+            output.write(to_json_line(result) + "\n")
+    finally:
+        if args.output:
+            output.close()
+    if failures:
+        print(f"{failures} of {len(files)} inputs failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
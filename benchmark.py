@@ -0,0 +1,337 @@
+"""Run every day against generated inputs of growing size.
+
+Each (day, scale) runs in its own process through `runner.py`, so a day that
+blows up only loses its own measurement. For every pair of consecutive scales
+the growth exponent log(t2 / t1) / log(s2 / s1) is reported; linear solvers
+stay around 1 and anything above `--threshold` is flagged. The time it takes
+to import each day module in a fresh interpreter (`python -X importtime`) is
+reported separately, it is paid by every short lived run.
+
+With `--calibrate` every engine of the days that have several is measured
+instead, and the smallest input each engine was the fastest for becomes its
+threshold for `--engine auto` (see `engines`).
+
+Every run is also recorded in the benchmark history, `python history.py`
+compares the latest one with the runs before it (see `history`).
+
+    python benchmark.py -D 9 -D 15 -S 1 -S 10 -S 100
+    python benchmark.py -D 5 -D 15 --calibrate
+"""
+from argparse import ArgumentParser
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import json
+import math
+import os
+import subprocess
+import sys
+
+from generators import GENERATED_DIRECTORY, SCALES, write_input
+from runner import DAYS, get_module_name, load_day
+import engines
+import history
+
+
+class Measurement(NamedTuple):
+    day: int
+    scale: int
+    input_bytes: int
+    wall_time: Optional[float]
+    cpu_time: Optional[float]
+    peak_memory: Optional[int]
+    error: Optional[str]
+    engine: str = engines.AUTO
+
+
+class Growth(NamedTuple):
+    day: int
+    from_scale: int
+    to_scale: int
+    time_exponent: Optional[float]
+    memory_exponent: Optional[float]
+
+
+def measure(
+    day: int,
+    path: str,
+    scale: int,
+    timeout: float,
+    trace_memory: bool = True,
+    engine: str = engines.AUTO,
+) -> Measurement:
+    command = [sys.executable, "runner.py", "-D", str(day), "-F", path]
+    command += ["--format", "json", "--engine", engine]
+    if not trace_memory:
+        command.append("--no-memory")
+    input_bytes = os.path.getsize(path)
+    try:
+        process = subprocess.run(
+            command, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return Measurement(
+            day, scale, input_bytes, None, None, None, "timeout", engine
+        )
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ["failed"])[-1]
+        return Measurement(day, scale, input_bytes, None, None, None, error, engine)
+
+    (report,) = json.loads(process.stdout)
+    timings = report["timings"]
+    return Measurement(
+        day,
+        scale,
+        input_bytes,
+        wall_time=sum(timing["wall_time"] for timing in timings),
+        cpu_time=sum(timing["cpu_time"] for timing in timings),
+        peak_memory=max(timing["peak_memory"] for timing in timings),
+        error=None,
+        engine=report["engine"],
+    )
+
+
+def measure_import_time(day: int) -> Optional[float]:
+    """cumulative seconds to import a day module in a fresh interpreter"""
+    module_name = get_module_name(day)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        return None
+    # lines look like "import time:   self [us] | cumulative | imported package"
+    for line in process.stderr.splitlines():
+        fields = line.rsplit("|", 2)
+        if len(fields) != 3:
+            # warnings printed while importing
+            continue
+        _, cumulative, package = fields
+        if package.strip() == module_name:
+            return int(cumulative) / 1e6
+    return None
+
+
+def _exponent(
+    before: Optional[float], after: Optional[float], ratio: float
+) -> Optional[float]:
+    if not before or not after:
+        return None
+    return math.log(after / before) / math.log(ratio)
+
+
+def get_growth(measurements: List[Measurement]) -> List[Growth]:
+    growth = []  # type: List[Growth]
+    for before, after in zip(measurements, measurements[1:]):
+        ratio = after.scale / before.scale
+        growth.append(
+            Growth(
+                before.day,
+                before.scale,
+                after.scale,
+                time_exponent=_exponent(before.wall_time, after.wall_time, ratio),
+                memory_exponent=_exponent(
+                    before.peak_memory, after.peak_memory, ratio
+                ),
+            )
+        )
+    return growth
+
+
+class DayBenchmark(NamedTuple):
+    import_time: Optional[float]
+    measurements: List[Measurement]
+
+
+def run_benchmark(
+    days: Sequence[int],
+    scales: Sequence[int],
+    seed: int = 0,
+    timeout: float = 60,
+    trace_memory: bool = True,
+    directory: str = GENERATED_DIRECTORY,
+) -> Dict[int, DayBenchmark]:
+    results = {}  # type: Dict[int, DayBenchmark]
+    for day in days:
+        results[day] = DayBenchmark(measure_import_time(day), [])
+        for scale in sorted(scales):
+            path = write_input(day, scale, seed, directory)
+            measurement = measure(day, path, scale, timeout, trace_memory)
+            results[day].measurements.append(measurement)
+            if measurement.error:
+                # larger inputs will only fail slower
+                break
+    return results
+
+
+def calibrate(
+    days: Sequence[int],
+    scales: Sequence[int],
+    seed: int = 0,
+    timeout: float = 60,
+    directory: str = GENERATED_DIRECTORY,
+) -> Tuple[Dict[str, Dict[str, Optional[int]]], List[Measurement]]:
+    """the smallest input each engine of each day was the fastest for
+
+    Engines that were never the fastest get no threshold, `auto` skips them.
+    """
+    calibration = {}  # type: Dict[str, Dict[str, Optional[int]]]
+    measurements = []  # type: List[Measurement]
+    for day in days:
+        module = load_day(day)
+        if module.__name__ not in engines.REGISTRY:
+            continue
+        candidates = [
+            engine.name
+            for engine in engines.get_engines(module).values()
+            if engine.min_size is not None
+        ]
+        thresholds = dict.fromkeys(candidates)  # type: Dict[str, Optional[int]]
+        for scale in sorted(scales):
+            path = write_input(day, scale, seed, directory)
+            timed = []  # type: List[Measurement]
+            for name in candidates:
+                measurement = measure(day, path, scale, timeout, False, name)
+                measurements.append(measurement)
+                if not measurement.error:
+                    timed.append(measurement)
+            # an engine that failed or timed out will not do better on more
+            candidates = [measurement.engine for measurement in timed]
+            if not timed:
+                break
+            fastest = min(timed, key=lambda measurement: measurement.wall_time)
+            if thresholds[fastest.engine] is None:
+                thresholds[fastest.engine] = fastest.input_bytes
+        calibration[module.__name__] = thresholds
+    return calibration, measurements
+
+
+def to_calibration_table(measurements: List[Measurement]) -> str:
+    table = f"{'day':>4} {'scale':>6} {'engine':<12} {'wall (s)':>10}\n"
+    for measurement in measurements:
+        wall_time = measurement.error or f"{measurement.wall_time:>10.4f}"
+        table += (
+            f"{measurement.day:>4} {measurement.scale:>6} "
+            f"{measurement.engine:<12} {wall_time:>10}\n"
+        )
+    return table
+
+
+def to_table(results: Dict[int, DayBenchmark], threshold: float) -> str:
+    table = (
+        f"{'day':>4} {'scale':>6} {'input (KiB)':>12} {'wall (s)':>10} "
+        f"{'peak (KiB)':>12} {'time exp':>9} {'mem exp':>8}\n"
+    )
+    for day, (_, measurements) in results.items():
+        exponents = [None] + get_growth(measurements)  # type: List[Optional[Growth]]
+        for measurement, growth in zip(measurements, exponents):
+            if measurement.error:
+                table += (
+                    f"{day:>4} {measurement.scale:>6} "
+                    f"{measurement.input_bytes / 1024:>12.1f} {measurement.error}\n"
+                )
+                continue
+            time_exponent = memory_exponent = ""
+            flag = ""
+            if growth and growth.time_exponent is not None:
+                time_exponent = f"{growth.time_exponent:.2f}"
+                if growth.time_exponent > threshold:
+                    flag = " superlinear"
+            if growth and growth.memory_exponent is not None:
+                memory_exponent = f"{growth.memory_exponent:.2f}"
+            table += (
+                f"{day:>4} {measurement.scale:>6} "
+                f"{measurement.input_bytes / 1024:>12.1f} "
+                f"{measurement.wall_time:>10.4f} "
+                f"{(measurement.peak_memory or 0) / 1024:>12.1f} "
+                f"{time_exponent:>9} {memory_exponent:>8}{flag}\n"
+            )
+    table += f"\n{'day':>4} {'import (ms)':>12}\n"
+    for day, (import_time, _) in results.items():
+        milliseconds = "failed" if import_time is None else f"{import_time * 1e3:.1f}"
+        table += f"{day:>4} {milliseconds:>12}\n"
+    return table
+
+
+def to_json(results: Dict[int, DayBenchmark]) -> str:
+    return json.dumps(
+        [
+            {
+                "day": day,
+                "import_time": import_time,
+                "measurements": [m._asdict() for m in measurements],
+                "growth": [g._asdict() for g in get_growth(measurements)],
+            }
+            for day, (import_time, measurements) in results.items()
+        ],
+        indent=2,
+    )
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-D", "--day", type=int, action="append", dest="days")
+    parser.add_argument("-S", "--scale", type=int, action="append", dest="scales")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-T", "--timeout", type=float, default=60, help="seconds per run"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="flag time growth exponents above this",
+    )
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--directory", default=GENERATED_DIRECTORY)
+    parser.add_argument("-O", "--output", help="also write the results as JSON")
+    parser.add_argument("--history", default=history.HISTORY_PATH)
+    parser.add_argument(
+        "--no-history", action="store_true", help="do not record this run"
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help=f"time every engine and save the auto thresholds to "
+        f"{engines.CALIBRATION_PATH}",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    if args.calibrate:
+        calibration, measurements = calibrate(
+            args.days or range(1, len(DAYS) + 1),
+            args.scales or SCALES,
+            seed=args.seed,
+            timeout=args.timeout,
+            directory=args.directory,
+        )
+        print(to_calibration_table(measurements))
+        if not args.no_history:
+            history.record(measurements, args.history)
+        engines.save_calibration({**engines.load_calibration(), **calibration})
+        print(json.dumps(calibration, indent=2))
+        return
+    results = run_benchmark(
+        args.days or range(1, len(DAYS) + 1),
+        args.scales or SCALES,
+        seed=args.seed,
+        timeout=args.timeout,
+        trace_memory=not args.no_memory,
+        directory=args.directory,
+    )
+    print(to_table(results, args.threshold))
+    if not args.no_history:
+        history.record(
+            [m for _, measurements in results.values() for m in measurements],
+            args.history,
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(to_json(results))
+
+
+if __name__ == "__main__":
+    main()
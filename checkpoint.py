@@ -0,0 +1,138 @@
+"""Snapshot long simulations so a killed run can pick up where it stopped.
+
+A simulation calls `tick` after every step with the number of steps done and
+a function returning its state. Once `interval` seconds have passed since
+the last snapshot, the state is pickled, compressed and written over the
+previous snapshot (atomically, a run killed while writing keeps the old
+one). A run started with `resume` loads the snapshot and continues from its
+step. Snapshots are named after the simulation and a key of its inputs and
+parameters, and hold the full key, so a run only ever resumes its own
+snapshot. The snapshot is removed once the simulation is done.
+
+    checkpoint = Checkpoint.for_run("day_six", fish, days, resume=True)
+    start, counts = checkpoint.load() or (0, initial_counts)
+    for step in range(start, days):
+        ...
+        checkpoint.tick(step + 1, lambda: counts)
+    checkpoint.done()
+
+Scripts take the interval and resume options with `add_checkpoint_arguments`.
+"""
+from argparse import ArgumentParser, Namespace
+from typing import Any, Callable, NamedTuple, Optional
+
+import hashlib
+import os
+import pickle
+import time
+import zlib
+
+
+CHECKPOINT_DIRECTORY = ".cache/checkpoints"
+INTERVAL = 60.0
+MAGIC = b"AOCSNAP1"
+
+
+class CorruptCheckpoint(Exception):
+    pass
+
+
+class Snapshot(NamedTuple):
+    step: int
+    state: Any
+
+
+def get_key(*values: Any) -> str:
+    return hashlib.sha256(pickle.dumps(values, protocol=4)).hexdigest()
+
+
+class Checkpoint(object):
+    def __init__(
+        self,
+        path: Optional[str],
+        key: str = "",
+        interval: float = INTERVAL,
+        resume: bool = False,
+    ):
+        # without a path nothing is ever saved or loaded
+        self.path = path
+        self.key = key
+        self.interval = interval
+        self.resume = resume
+        self._last_saved = time.monotonic()
+
+    @classmethod
+    def for_run(
+        cls,
+        name: str,
+        *values: Any,
+        interval: float = INTERVAL,
+        resume: bool = False,
+        directory: str = CHECKPOINT_DIRECTORY,
+    ) -> "Checkpoint":
+        key = get_key(name, *values)
+        path = os.path.join(directory, f"{name}-{key[:16]}.snapshot")
+        return cls(path, key, interval, resume)
+
+    def load(self) -> Optional[Snapshot]:
+        """the saved snapshot when resuming, None to start from scratch"""
+        if not self.path or not self.resume or not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise CorruptCheckpoint(f"{self.path} is not a snapshot")
+        try:
+            key, step, state = pickle.loads(zlib.decompress(data[len(MAGIC) :]))
+        except (zlib.error, pickle.UnpicklingError, ValueError) as e:
+            raise CorruptCheckpoint(f"{self.path}: {e}") from e
+        if key != self.key:
+            raise CorruptCheckpoint(f"{self.path} belongs to another run")
+        return Snapshot(step, state)
+
+    def save(self, step: int, state: Any):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = zlib.compress(
+            pickle.dumps((self.key, step, state), protocol=pickle.HIGHEST_PROTOCOL)
+        )
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(MAGIC + data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._last_saved = time.monotonic()
+
+    def tick(self, step: int, get_state: Callable[[], Any]):
+        """save a snapshot if the interval has passed since the last one"""
+        if self.path and time.monotonic() - self._last_saved >= self.interval:
+            self.save(step, get_state())
+
+    def done(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# for simulations that are not checkpointed
+DISABLED = Checkpoint(None)
+
+
+def add_checkpoint_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=INTERVAL,
+        help="seconds between snapshots of the simulation",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the snapshot a killed run of the same input left",
+    )
+
+
+def checkpoint_from_args(args: Namespace, name: str, *values: Any) -> Checkpoint:
+    return Checkpoint.for_run(
+        name, *values, interval=args.checkpoint_interval, resume=args.resume
+    )
@@ -0,0 +1,187 @@
+"""Send inputs to `daemon.py` instead of solving them in a new process.
+
+Takes the same inputs as `batch.py` (a directory, a manifest or `-F` files)
+and prints the same JSON lines, in the order of the inputs, with the time
+each request waited for a worker of the daemon added. All requests go over
+one connection, up to `--window` of them at a time.
+
+    python client.py -D 9 inputs/
+    python client.py -D 21 -F data/game.txt -P part_two
+    python client.py --stats
+"""
+from argparse import ArgumentParser
+from typing import Any, Dict, Iterator, List, Sequence
+
+import json
+import os
+import socket
+import sys
+
+from batch import get_inputs
+from daemon import PING, SHUTDOWN, SOCKET_PATH, STATS
+from runner import PARTS
+import engines
+
+
+WINDOW = 64
+
+
+class DaemonNotRunning(Exception):
+    pass
+
+
+class Client(object):
+    def __init__(self, path: str = SOCKET_PATH):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(path)
+        except OSError as e:
+            self._socket.close()
+            raise DaemonNotRunning(f"no daemon listens on {path}: {e}") from e
+        self._reader = self._socket.makefile("rb")
+        self._next_id = 0
+
+    def send(self, request: Dict[str, Any]) -> int:
+        self._next_id += 1
+        line = json.dumps({**request, "id": self._next_id}).encode() + b"\n"
+        self._socket.sendall(line)
+        return self._next_id
+
+    def receive(self) -> Dict[str, Any]:
+        line = self._reader.readline()
+        if not line:
+            raise DaemonNotRunning("the daemon closed the connection")
+        return json.loads(line)
+
+    def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.send(request)
+        return self.receive()
+
+    def solve_all(
+        self,
+        day: int,
+        files: Sequence[str],
+        parts: Sequence[str] = PARTS,
+        engine: str = engines.AUTO,
+        cache: bool = True,
+        window: int = WINDOW,
+    ) -> Iterator[Dict[str, Any]]:
+        """yield the response of every file, in order"""
+        ids = []  # type: List[int]
+        responses = {}  # type: Dict[int, Dict[str, Any]]
+        sent = 0
+        for i in range(len(files)):
+            # keep up to `window` requests at the daemon, responses come back
+            # in any order
+            while sent < len(files) and sent - i < window:
+                request = {
+                    "day": day,
+                    # the daemon may run in another directory
+                    "file": os.path.abspath(files[sent]),
+                    "parts": list(parts),
+                    "engine": engine,
+                    "cache": cache,
+                }
+                ids.append(self.send(request))
+                sent += 1
+            while ids[i] not in responses:
+                response = self.receive()
+                responses[response["id"]] = response
+            response = responses.pop(ids[i])
+            del response["id"]
+            yield {**response, "file": files[i]}
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-D", "--day", type=int)
+    parser.add_argument(
+        "source", nargs="?", help="a directory of inputs or a manifest"
+    )
+    parser.add_argument(
+        "-F", "--file", action="append", dest="files", help="an input to solve"
+    )
+    parser.add_argument("-P", "--part", choices=PARTS, action="append", dest="parts")
+    parser.add_argument(
+        "--engine",
+        default=engines.AUTO,
+        help="implementation of the parts to run (default: auto, per input)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="solve every input again, even ones answered before",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=WINDOW,
+        help="requests sent before waiting for their responses",
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument(
+        "-O", "--output", help="write the JSON lines here instead of stdout"
+    )
+    for op in (PING, STATS, SHUTDOWN):
+        parser.add_argument(
+            f"--{op}",
+            action="store_const",
+            const=op,
+            dest="op",
+            help=f"send a {op} request instead of inputs",
+        )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    files = list(args.files or [])
+    if args.source:
+        files += get_inputs(args.source)
+    if not args.op and (args.day is None or not files):
+        print("give a day and inputs, or an op", file=sys.stderr)
+        sys.exit(2)
+    try:
+        client = Client(args.socket)
+    except DaemonNotRunning as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    with client:
+        if args.op:
+            response = client.request({"op": args.op})
+            print(json.dumps(response))
+            sys.exit(1 if response.get("error") else 0)
+        output = open(args.output, "w") if args.output else sys.stdout
+        failures = 0
+        try:
+            for response in client.solve_all(
+                args.day,
+                files,
+                args.parts or PARTS,
+                args.engine,
+                not args.no_cache,
+                max(args.window, 1),
+            ):
+                if response.get("error"):
+                    failures += 1
+                output.write(json.dumps(response, default=str) + "\n")
+        finally:
+            if args.output:
+                output.close()
+    if failures:
+        print(f"{failures} of {len(files)} inputs failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Pack integer coordinates into single ints, for dict and set keys.
+
+A NamedTuple key is hashed and compared by python code, field by field
+(more so when it overrides `__eq__` and `__hash__`). A packed key is one
+int, hashed and compared in C. Every coordinate is biased by `BIAS` and
+takes `BITS` bits, so the coordinates of a key may be from -BIAS to
+BIAS - 1, and three of them still fit in a 64 bit int.
+
+Packing is linear, a neighbour is the key plus an offset and the offset
+between two keys is their difference:
+
+    key = pack2(i, j)
+    for offset in ORTHOGONAL2:
+        neighbour = key + offset
+    pack3(*b) - pack3(*a) == offset3(*(b - a))
+
+Keys sort like the tuples they pack, so they can break ties in a heap the
+same way. Keys and offsets only stay valid while every coordinate stays in
+range, `pack2` and `pack3` check that, the arithmetic does not.
+"""
+from typing import Iterable, List, Tuple
+
+
+BITS = 21
+BIAS = 1 << (BITS - 1)
+MASK = (1 << BITS) - 1
+
+
+class OutOfRange(Exception):
+    pass
+
+
+def _check(*values: int):
+    for value in values:
+        if not -BIAS <= value < BIAS:
+            raise OutOfRange(f"{value} does not fit in {BITS} bits")
+
+
+def pack2(x: int, y: int) -> int:
+    _check(x, y)
+    return ((x + BIAS) << BITS) | (y + BIAS)
+
+
+def unpack2(key: int) -> Tuple[int, int]:
+    return (key >> BITS) - BIAS, (key & MASK) - BIAS
+
+
+def offset2(dx: int, dy: int) -> int:
+    return (dx << BITS) + dy
+
+
+def pack3(x: int, y: int, z: int) -> int:
+    _check(x, y, z)
+    return ((x + BIAS) << (2 * BITS)) | ((y + BIAS) << BITS) | (z + BIAS)
+
+
+def unpack3(key: int) -> Tuple[int, int, int]:
+    return (
+        (key >> (2 * BITS)) - BIAS,
+        ((key >> BITS) & MASK) - BIAS,
+        (key & MASK) - BIAS,
+    )
+
+
+def offset3(dx: int, dy: int, dz: int) -> int:
+    return (dx << (2 * BITS)) + (dy << BITS) + dz
+
+
+# the keys of the origins, an offset plus these is the key of the offset
+ORIGIN2 = pack2(0, 0)
+ORIGIN3 = pack3(0, 0, 0)
+
+
+def unpack_offset2(offset: int) -> Tuple[int, int]:
+    return unpack2(offset + ORIGIN2)
+
+
+def unpack_offset3(offset: int) -> Tuple[int, int, int]:
+    return unpack3(offset + ORIGIN3)
+
+
+def pack_all3(points: Iterable[Tuple[int, int, int]]) -> List[int]:
+    return [pack3(x, y, z) for x, y, z in points]
+
+
+ORTHOGONAL2 = tuple(
+    offset2(dx, dy) for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1))
+)  # type: Tuple[int, ...]
+SURROUNDING2 = ORTHOGONAL2 + tuple(
+    offset2(dx, dy) for dx, dy in ((-1, -1), (-1, 1), (1, -1), (1, 1))
+)  # type: Tuple[int, ...]
+ORTHOGONAL3 = tuple(
+    offset3(*delta)
+    for delta in (
+        (-1, 0, 0),
+        (1, 0, 0),
+        (0, -1, 0),
+        (0, 1, 0),
+        (0, 0, -1),
+        (0, 0, 1),
+    )
+)  # type: Tuple[int, ...]
@@ -0,0 +1,327 @@
+"""Serve solutions from a long running process over a local Unix socket.
+
+Every `python day_X.py` (or `batch.py`) run pays for starting an interpreter
+and importing the day, and starts with cold caches. The daemon imports every
+day once, in every worker of its process pool, and keeps the workers (and
+whatever the days memoize in them, such as the Dirac wins of day 21) alive
+between requests. Answers also go through `result_cache` unless a request
+says otherwise.
+
+Requests and responses are JSON, one object per line. A connection may send
+any number of requests without waiting, the responses come back as they are
+ready, with the `id` of their request:
+
+    {"id": 1, "day": 9, "file": "/abs/path/input.txt"}
+    {"id": 2, "day": 21, "input": "Player 1 starting position: 4\\n...",
+     "parts": ["part_two"], "engine": "auto", "cache": false}
+    {"id": 3, "op": "stats"}
+
+    {"id": 1, "file": "...", "engine": "...", "results": {...},
+     "wall_time": 0.01, "queue_time": 0.0, "error": null}
+
+`op` is `solve` (the default), `ping`, `stats` or `shutdown`. Paths are read
+by the daemon, relative ones from its working directory. `client.py` sends
+requests the way `batch.py` runs inputs.
+
+    python daemon.py -j 4 &
+    python client.py -D 9 inputs/
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from batch import solve
+from result_cache import ResultCache
+from runner import DAYS, PARTS, load_day
+import engines
+
+
+SOCKET_PATH = ".cache/solver.sock"
+# longest request line, inline inputs included
+LIMIT = 64 << 20
+
+SOLVE = "solve"
+PING = "ping"
+STATS = "stats"
+SHUTDOWN = "shutdown"
+OPS = (SOLVE, PING, STATS, SHUTDOWN)
+# what a solve request may hold besides its op and id
+FIELDS = {"day", "file", "input", "parts", "engine", "cache"}
+
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class BadRequest(Exception):
+    pass
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+def check_request(request: Any) -> Dict[str, Any]:
+    """the request, with defaults filled in, or BadRequest"""
+    if not isinstance(request, dict):
+        raise BadRequest("a request is a JSON object")
+    op = request.get("op", SOLVE)
+    if op not in OPS:
+        raise BadRequest(f"op {op!r} is not one of {', '.join(OPS)}")
+    if op != SOLVE:
+        return {"op": op}
+    unknown = set(request) - FIELDS - {"op", "id"}
+    if unknown:
+        raise BadRequest(f"unknown fields {', '.join(sorted(unknown))}")
+    day = request.get("day")
+    # bool is an int too, true is not day 1
+    if isinstance(day, bool) or not isinstance(day, int) or not 1 <= day <= len(DAYS):
+        raise BadRequest(f"day must be from 1 to {len(DAYS)}")
+    if ("file" in request) == ("input" in request):
+        raise BadRequest("a request has either a file or an input")
+    parts = request.get("parts", list(PARTS))
+    if not parts or any(part not in PARTS for part in parts):
+        raise BadRequest(f"parts must be some of {', '.join(PARTS)}")
+    engine = request.get("engine", engines.AUTO)
+    if not isinstance(engine, str):
+        raise BadRequest("engine must be a string")
+    cache = request.get("cache", True)
+    if not isinstance(cache, bool):
+        raise BadRequest("cache must be true or false")
+    return {
+        "op": op,
+        "day": day,
+        "file": request.get("file"),
+        "input": request.get("input"),
+        "parts": tuple(parts),
+        "engine": engine,
+        "cache": cache,
+    }
+
+
+# the result cache of a worker, open for as long as the worker lives
+_CACHE = None  # type: Optional[ResultCache]
+
+
+def _warm():
+    """import every day up front, so the first request of a day is warm too"""
+    global _CACHE
+    for day in range(1, len(DAYS) + 1):
+        try:
+            load_day(day)
+        except Exception:
+            # a day whose dependencies are missing fails when it is asked for
+            pass
+    _CACHE = ResultCache()
+
+
+def _solve(request: Dict[str, Any]) -> Dict[str, Any]:
+    cache = _CACHE if request["cache"] else None
+    if request["file"] is not None:
+        result = solve(
+            request["day"], request["file"], request["parts"], request["engine"], cache
+        )
+        return result._asdict()
+    # the days parse paths, an inline input is solved from a file of its own
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        f.write(request["input"])
+        f.flush()
+        result = solve(
+            request["day"], f.name, request["parts"], request["engine"], cache
+        )
+    return {**result._asdict(), "file": None}
+
+
+class Daemon(object):
+    def __init__(self, path: str = SOCKET_PATH, workers: Optional[int] = None):
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._pool = None  # type: Optional[ProcessPoolExecutor]
+        self._server = None  # type: Optional[asyncio.AbstractServer]
+        self._stopped = None  # type: Optional[asyncio.Event]
+        # the connections open, to stop reading from when the daemon stops
+        self._connections = {}  # type: Dict[asyncio.Task, Connection]
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            # nothing listens there, a previous daemon did not clean up
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise AlreadyRunning(f"a daemon already listens on {self.path}")
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_warm)
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        """replace a pool a worker died in, it takes no more work"""
+        if self._pool is not broken:
+            # another request that was on it already replaced it
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._start_pool()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "uptime": time.time() - self.started,
+            "workers": self.workers,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+        }
+
+    async def _answer(self, line: bytes) -> Dict[str, Any]:
+        request_id = None
+        try:
+            raw = json.loads(line)
+            if isinstance(raw, dict):
+                request_id = raw.get("id")
+            request = check_request(raw)
+        except (ValueError, BadRequest) as e:
+            self.errors += 1
+            return {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        if request["op"] == PING:
+            return {"id": request_id, "error": None}
+        if request["op"] == STATS:
+            return {"id": request_id, **self.get_stats(), "error": None}
+        if request["op"] == SHUTDOWN:
+            self._stopped.set()
+            return {"id": request_id, "error": None}
+        self.requests += 1
+        self.in_flight += 1
+        queued = time.perf_counter()
+        pool = self._pool
+        try:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(pool, _solve, request)
+        except BrokenProcessPool as e:
+            # a worker that died takes the request with it, and its pool
+            self._restart_pool(pool)
+            response = {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= 1
+        # whatever the worker did not spend solving, it spent waiting
+        response["queue_time"] = max(
+            time.perf_counter() - queued - response.get("wall_time", 0), 0
+        )
+        if response["error"]:
+            self.errors += 1
+        return {"id": request_id, **response}
+
+    async def _respond(
+        self, line: bytes, writer: asyncio.StreamWriter, lock: asyncio.Lock
+    ):
+        response = await self._answer(line)
+        async with lock:
+            if writer.is_closing():
+                # the client went away, nobody is waiting for the answer
+                return
+            writer.write(json.dumps(response, default=str).encode() + b"\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        lock = asyncio.Lock()
+        tasks = set()
+        self._connections[asyncio.current_task()] = (reader, writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than LIMIT, the rest of the stream is unusable
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # answer everything read, the daemon may be stopping
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def serve(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._remove_stale_socket()
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._stopped.set)
+        self._start_pool()
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._serve_connection, self.path, limit=LIMIT
+            )
+            print(
+                f"listening on {self.path} with {self.workers} workers",
+                file=sys.stderr,
+            )
+            await self._stopped.wait()
+        finally:
+            if self._server is not None:
+                self._server.close()
+            # ending the stream of a connection stops its handler reading,
+            # it answers the requests it already read, then closes
+            for reader, writer in list(self._connections.values()):
+                writer.transport.pause_reading()
+                reader.feed_eof()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            self._pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="solve on a pool of this many processes (0: one per core)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    try:
+        asyncio.run(Daemon(args.socket, args.jobs or None).serve())
+    except AlreadyRunning as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -172,9 +172,12 @@ class Entry(object):
         ]
 
 
-def main():
+INPUT = "data/seven_segment.txt"
+
+
+def parse(path: str) -> List[Entry]:
     entries = []  # type: List[Entry]
-    with open("data/seven_segment.txt") as f:
+    with open(path) as f:
         for line in f:
             entry = line.split("|")  # type: Tuple[str, str]
             unique_patterns_list = [
@@ -184,7 +187,20 @@ def main():
                 "".join(sorted(seg.strip())) for seg in entry[1].split() if seg.strip()
             ]  # type: List[str]
             entries.append(Entry(unique_patterns_list, output_list))
+    return entries
+
+
+def part_one(entries: List[Entry]) -> int:
+    # 1, 4, 7 and 8 are the only digits with a unique number of segments
+    return sum(
+        [
+            len([number for number in entry.output_list if len(number) in (2, 3, 4, 7)])
+            for entry in entries
+        ]
+    )
+
 
+def part_two(entries: List[Entry]) -> int:
     total = 0
     for entry in entries:
         code = entry.execute()
@@ -192,7 +208,14 @@ def main():
         for number in entry.output_list:
             digits.append(str(code.index(number)))
         total += int("".join(digits))
-    print(f"total is {total}")
+    return total
+
+
+def main():
+    entries = parse(INPUT)
+    print(f"total of 1, 4, 7, 8 is {part_one(entries)}")
+    print(f"total is {part_two(entries)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,32 @@ from __future__ import annotations
 import json
 
 from abc import ABC
+from argparse import ArgumentParser
 from functools import reduce
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from pools import Chunk, add_backend_argument
+import metrics
+import pools
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# a row of the homework as nested tuples, e.g. ((1, 2), 3)
+Row = Union[int, Tuple["Row", "Row"]]
 
 
 class SnailNumber(ABC):
+    __slots__ = ("parent",)
+
     def __init__(self):
         self.parent = None
 
 
 class RegularNumber(SnailNumber):
+    __slots__ = ("number",)
+
     def __init__(self, number: int):
         super().__init__()
         self.number = number
@@ -44,6 +60,8 @@ class RegularNumber(SnailNumber):
 
 
 class Pair(SnailNumber):
+    __slots__ = ("left", "right")
+
     def __init__(self, left: SnailNumber, right: SnailNumber):
         super().__init__()
         self.left = left
@@ -130,8 +148,10 @@ def reduce_snail_number(root_snail_number: SnailNumber) -> SnailNumber:
         if not reduce_split(root_snail_number):
             return root_snail_number
         else:
+            metrics.increment("day_eighteen.splits")
             return reduce_snail_number(root_snail_number)
     else:
+        metrics.increment("day_eighteen.explodes")
         return reduce_snail_number(root_snail_number)
 
 
@@ -152,32 +172,155 @@ def parse_to_snail_number(row) -> SnailNumber:
     return Pair(left, right)
 
 
-def main():
+def to_row(snail_number: SnailNumber) -> Row:
+    if isinstance(snail_number, RegularNumber):
+        return snail_number.number
+    return to_row(snail_number.left), to_row(snail_number.right)
+
+
+def to_tuples(row) -> Row:
+    if isinstance(row, int):
+        return row
+    return to_tuples(row[0]), to_tuples(row[1])
+
+
+def get_magnitude(row: Row) -> int:
+    if isinstance(row, int):
+        return row
+    return 3 * get_magnitude(row[0]) + 2 * get_magnitude(row[1])
+
+
+def add_rows(left: Row, right: Row) -> Row:
+    """the reduced sum of two rows"""
+    root = add_two_snail_numbers(
+        parse_to_snail_number(left), parse_to_snail_number(right)
+    )
+    return to_row(reduce_snail_number(root))
+
+
+INPUT = "data/snail_hw.txt"
+
+
+def parse(path: str) -> List[list]:
     rows = []
-    with open("data/snail_hw.txt") as f:
+    with open(path) as f:
         for line in f:
             rows.append(json.loads(line.strip()))
-    equation = []  # type: List[SnailNumber]
-    for row in rows:
-        equation.append(parse_to_snail_number(row))
-    root = reduce(
-        lambda root, eq: reduce_snail_number(add_two_snail_numbers(root, eq)), equation
+    return rows
+
+
+def get_sum(rows: List[list]) -> SnailNumber:
+    total = reduce(add_rows, map(to_tuples, rows))
+    return parse_to_snail_number(total)
+
+
+def part_one(rows: List[list]) -> int:
+    return get_sum(rows).magnitude()
+
+
+def _get_largest_magnitude(chunk: Chunk, arrays: Dict[str, np.ndarray]) -> int:
+    """the largest magnitude of the sums whose first row is in the chunk"""
+    text, offsets = arrays["text"], arrays["offsets"].tolist()
+    rows = [
+        to_tuples(json.loads(text[start:end].tobytes()))
+        for start, end in zip(offsets, offsets[1:])
+    ]
+    return max(
+        (
+            get_magnitude(add_rows(rows[i], rows[j]))
+            for i in range(chunk.start, chunk.stop)
+            for j in range(len(rows))
+            if i != j
+        ),
+        default=0,
     )
 
-    print(f"number = {root}")
-    print(f"magnitude = {root.magnitude()}")
+
+def get_largest_magnitude_in_parallel(rows: List[list], workers: int) -> int:
+    """split the first rows of the sums between workers
+
+    The rows are shared as their JSON text and the offsets of every row in
+    it, rather than pickled to every worker.
+    """
+    # numpy and the shared memory pool are only needed here
+    import numpy as np
+
+    from parallel import parallel_map
+
+    encoded = [json.dumps(row).encode() for row in rows]
+    offsets = np.cumsum([0] + [len(row) for row in encoded], dtype=np.int64)
+    text = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return parallel_map(
+        _get_largest_magnitude,
+        {"text": text, "offsets": offsets},
+        len(rows),
+        workers=workers,
+        reduce=max,
+        initial=0,
+    )
+
+
+def _get_largest_magnitude_on_thread(firsts: range, rows: List[Row]) -> int:
+    """the largest magnitude of the sums whose first row is in `firsts`"""
+    return max(
+        (
+            get_magnitude(add_rows(rows[i], rows[j]))
+            for i in firsts
+            for j in range(len(rows))
+            if i != j
+        ),
+        default=0,
+    )
+
+
+def part_two(rows: List[list], workers: int = 1, backend: str = pools.AUTO) -> int:
+    if workers != 1 and pools.get_backend(backend) == pools.THREADS:
+        # threads share the rows as they are
+        return pools.pool_map(
+            _get_largest_magnitude_on_thread,
+            range(len(rows)),
+            workers=workers,
+            backend=pools.THREADS,
+            shared=[to_tuples(row) for row in rows],
+            reduce=max,
+            initial=0,
+        )
+    if workers != 1:
+        return get_largest_magnitude_in_parallel(rows, workers)
+    rows = [to_tuples(row) for row in rows]
     largest_magnitude = 0
-    for i in range(len(equation)):
-        for j in range(len(equation)):
+    for i in range(len(rows)):
+        for j in range(len(rows)):
             if i == j:
                 continue
-            first = parse_to_snail_number(rows[i])
-            second = parse_to_snail_number(rows[j])
-            root = reduce_snail_number(add_two_snail_numbers(first, second))
-            root_magnitude = root.magnitude()
+            root_magnitude = get_magnitude(add_rows(rows[i], rows[j]))
             if root_magnitude > largest_magnitude:
                 largest_magnitude = root_magnitude
-    print(f"largest magnitude = {largest_magnitude}")
+    return largest_magnitude
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="add up the pairs on this many workers (0: one per core)",
+    )
+    add_backend_argument(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    rows = parse(args.file)
+    root = get_sum(rows)
+    print(f"number = {root}")
+    print(f"magnitude = {root.magnitude()}")
+    print(f"largest magnitude = {part_two(rows, args.workers, args.backend)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,170 @@
-from typing import List, Set, Tuple
+from argparse import ArgumentParser
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from checkpoint import (
+    DISABLED,
+    Checkpoint,
+    add_checkpoint_arguments,
+    checkpoint_from_args,
+)
+from stages import Stage
+import grids
+import stages
 
 
 class Cavern(object):
-    def __init__(self):
-        self._cavern = []  # type: List[List[int]]
+    def __init__(self, energy_levels: Optional[np.ndarray] = None):
+        if energy_levels is None:
+            energy_levels = np.zeros((0, 0), dtype=np.uint8)
+        self._cavern = energy_levels
 
     def add_row(self, row: List[int]):
-        self._cavern.append(row)
+        row = np.array([row], dtype=np.uint8)
+        self._cavern = np.concatenate([self._cavern.reshape(-1, row.shape[1]), row])
 
     def get_total_octopuses(self) -> int:
-        total = 0
-        for row in self._cavern:
-            total += len(row)
-        return total
+        return self._cavern.size
 
-    def step(self) -> Set[Tuple[int, int]]:
+    def get_energy_levels(self) -> np.ndarray:
+        return self._cavern
+
+    def step(self) -> int:
+        """advance one step and return how many octopuses flashed"""
         self._step_one()
         return self._step_two()
 
     def _step_one(self):
-        for i in range(len(self._cavern)):
-            for j in range(len(self._cavern[i])):
-                self._cavern[i][j] += 1
-
-    def _step_two(self) -> Set[Tuple[int, int]]:
-        coords_that_flashed = set()  # type: Set[Tuple[int, int]]
-        for i in range(len(self._cavern)):
-            for j in range(len(self._cavern[i])):
-                coords_that_flashed = self._process(i, j, coords_that_flashed)
-        return coords_that_flashed
-
-    def _process(
-        self, i: int, j: int, coords_that_flashed: Set[Tuple[int, int]]
-    ) -> Set[Tuple[int, int]]:
-        if self._cavern[i][j] > 9:
-            return self._flash(i, j, coords_that_flashed | set([(i, j)]))
-        return coords_that_flashed
-
-    def _flash(self, i: int, j: int, coords_that_flashed) -> Set[Tuple[int, int]]:
-        # top left
-        self._cavern[i][j] = 0
-        coords = [
-            (i - 1, j - 1),  # top left
-            (i - 1, j),  # top
-            (i - 1, j + 1),  # top right
-            (i + 1, j - 1),  # bottom left
-            (i + 1, j),  # bottom
-            (i + 1, j + 1),  # bottom right
-            (i, j - 1),  # left
-            (i, j + 1),  # right
-        ]
-        for coord in coords:
-            new_i, new_j = coord
-            if (
-                new_i < 0
-                or new_i >= len(self._cavern)
-                or new_j < 0
-                or new_j >= len(self._cavern[new_i])
-            ):
-                continue
-            if (new_i, new_j) in coords_that_flashed:
-                continue
-            self._cavern[new_i][new_j] += 1
-            coords_that_flashed = self._process(new_i, new_j, coords_that_flashed)
-        return coords_that_flashed
+        self._cavern += 1
 
+    def _step_two(self) -> int:
+        flashed = np.zeros(self._cavern.shape, dtype=bool)
+        flashing = self._cavern > 9
+        while flashing.any():
+            flashed |= flashing
+            # an octopus can flash at most once a step, so at most 8 of its
+            # neighbours add to it and the energy level stays well within uint8
+            self._cavern += grids.count_neighbours(flashing)
+            flashing = (self._cavern > 9) & ~flashed
+        self._cavern[flashed] = 0
+        return int(flashed.sum())
 
-def main():
-    cavern = Cavern()
-    with open("data/octopuses.txt") as f:
-        for line in f:
-            cavern.add_row([int(o) for o in line.strip()])
-
-    # part 1
-    # flashes = 0
-    # steps = 100
-    # for i in range(1, steps + 1):
-    #    current_flashes = len(cavern.step())
-    #    print(f"total flashes after step {i} steps is {current_flashes}")
-    #    # print(cavern.display())
-    #    flashes += current_flashes
-    # print(f"total flashes after {steps} steps is {flashes}")
+    def display(self) -> str:
+        return grids.display(self._cavern, "0123456789")
+
+
+INPUT = "data/octopuses.txt"
+
+
+def parse(path: str) -> np.ndarray:
+    with open(path) as f:
+        return grids.parse_digits(f)
 
+
+def to_arrays(energy_levels: np.ndarray) -> Dict[str, np.ndarray]:
+    return {"energy_levels": energy_levels}
+
+
+def from_arrays(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    return arrays["energy_levels"]
+
+
+def part_one(
+    energy_levels: np.ndarray, steps: int = 100, checkpoint: Checkpoint = DISABLED
+) -> int:
+    cavern = Cavern(energy_levels.copy())
+    flashes = 0
+    start = 0
+    snapshot = checkpoint.load()
+    if snapshot:
+        start, (energy_levels, flashes) = snapshot
+        cavern = Cavern(energy_levels)
+    for step in range(start + 1, steps + 1):
+        flashes += cavern.step()
+        checkpoint.tick(step, lambda: (cavern.get_energy_levels(), flashes))
+    checkpoint.done()
+    return flashes
+
+
+def part_two(energy_levels: np.ndarray, checkpoint: Checkpoint = DISABLED) -> int:
+    cavern = Cavern(energy_levels.copy())
     flashes = 0
     step = 0
+    snapshot = checkpoint.load()
+    if snapshot:
+        step, energy_levels = snapshot
+        cavern = Cavern(energy_levels)
     while flashes < cavern.get_total_octopuses():
-        flashes = len(cavern.step())
+        flashes = cavern.step()
         step += 1
+        checkpoint.tick(step, lambda: cavern.get_energy_levels())
+    checkpoint.done()
+    return step
+
 
+class Simulation(NamedTuple):
+    energy_levels: np.ndarray
+    steps: int
+    flashes: int
+    # the first step every octopus flashed at, if it happened yet
+    synchronized_at: Optional[int]
+
+
+def simulate(energy_levels: np.ndarray, steps: int) -> Simulation:
+    cavern = Cavern(energy_levels.copy())
+    flashes = 0
+    synchronized_at = None
+    for step in range(1, steps + 1):
+        flashed = cavern.step()
+        flashes += flashed
+        if synchronized_at is None and flashed == cavern.get_total_octopuses():
+            synchronized_at = step
+    return Simulation(cavern.get_energy_levels(), steps, flashes, synchronized_at)
+
+
+def get_synchronized_step(simulation: Simulation) -> int:
+    """carry on where part one stopped, unless everything flashed already"""
+    if simulation.synchronized_at is not None:
+        return simulation.synchronized_at
+    return simulation.steps + part_two(simulation.energy_levels)
+
+
+def get_first_steps(energy_levels: np.ndarray) -> Simulation:
+    return simulate(energy_levels, 100)
+
+
+# part two starts from the cavern after the 100 steps of part one
+stages.register(
+    __name__,
+    Stage("first_steps", get_first_steps, ("data",)),
+    Stage("part_one", lambda simulation: simulation.flashes, ("first_steps",)),
+    Stage("part_two", get_synchronized_step, ("first_steps",)),
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument("-S", "--steps", type=int, default=100)
+    add_checkpoint_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    energy_levels = parse(args.file)
+    flashes = part_one(
+        energy_levels,
+        args.steps,
+        checkpoint_from_args(args, "day_eleven", energy_levels, args.steps),
+    )
+    print(f"total flashes after {args.steps} steps is {flashes}")
+    step = part_two(
+        energy_levels, checkpoint_from_args(args, "day_eleven", energy_levels)
+    )
     print(f"synchronized flashes happen at step {step}")
 
 
-main()
+if __name__ == "__main__":
+    main()
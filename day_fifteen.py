@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+from argparse import ArgumentParser
 from collections import defaultdict
 from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 
-import copy
 import heapq
 
+import numpy as np
+
+from output import add_output_arguments, configure_from_args
+from stages import Stage
+import coords
+import engines
+import grids
+import metrics
+import output
+import stages
+
 
 class Node(NamedTuple):
     x: int
@@ -27,145 +38,248 @@ class PathNotFound(Exception):
 
 
 class Network(object):
+    """a weighted directed graph of grid nodes
+
+    Nodes are kept as packed keys, the search hashes and compares ints and
+    remembers the edge it reached every node by instead of copying paths.
+    """
+
     def __init__(self):
-        self._nodes = set()  # type: Set[Node]
-        self._edges = defaultdict(list)  # type: Dict[Node, List[Edge]]
+        self._nodes = set()  # type: Set[int]
+        # the nodes every node has an edge to, with the weight of the edge
+        self._edges = defaultdict(list)  # type: Dict[int, List[Tuple[int, int]]]
 
     def add_node(self, node: Node):
-        self._nodes.add(node)
+        self._nodes.add(coords.pack2(*node))
 
     def add_edge(self, node_a: Node, node_b: Node, weight: int):
-        if node_a not in self._nodes or node_b not in self._nodes:
+        key_a = coords.pack2(*node_a)
+        key_b = coords.pack2(*node_b)
+        if key_a not in self._nodes or key_b not in self._nodes:
             raise MissingNode
-        self._edges[node_a].append(Edge(weight, node_a, node_b))
+        self._edges[key_a].append((key_b, weight))
+
+    def get_edges(self, key: int) -> List[Edge]:
+        node = Node(*coords.unpack2(key))
+        return [
+            Edge(weight, node, Node(*coords.unpack2(key_b)))
+            for key_b, weight in self._edges[key]
+        ]
 
     def display(self) -> str:
-        display = ""
-        for node in sorted(self._edges):
-            for edge in self._edges[node]:
-                display += f"{node} -> {edge}"
-                display += "\n"
-        return display
+        return "".join(
+            f"{edge.node_a} -> {edge}\n"
+            for key in sorted(self._edges)
+            for edge in self.get_edges(key)
+        )
 
     def get_shortest_path(self, start: Node, end: Node) -> Tuple[int, List[Edge]]:
-        distances = {}  # type: Dict[Node, Tuple[float, List[Edge]]]
-        distances[start] = (0, [])
-        heap = []
-        heapq.heappush(heap, (0, start))
-        visited_nodes = set()
+        start_key = coords.pack2(*start)
+        end_key = coords.pack2(*end)
+        distances = {start_key: 0}  # type: Dict[int, int]
+        # the node every node was last reached from, and the weight it took
+        reached_from = {}  # type: Dict[int, Tuple[int, int]]
+        # keys sort like nodes, ties in the heap break the same way
+        heap = [(0, start_key)]
+        visited_nodes = set()  # type: Set[int]
+        pops = 0
         while heap:
-            _, node_with_min_distance = heapq.heappop(heap)
-            if node_with_min_distance == end:
-                return distances[node_with_min_distance]
-            visited_nodes.add(node_with_min_distance)
-            self._explore_node(node_with_min_distance, distances, visited_nodes, heap)
+            _, key = heapq.heappop(heap)
+            pops += 1
+            if key == end_key:
+                # everything pushed was either popped or is still queued
+                metrics.increment("day_fifteen.heap_pops", pops)
+                metrics.increment("day_fifteen.heap_pushes", pops + len(heap))
+                return distances[key], self._get_path(reached_from, key)
+            visited_nodes.add(key)
+            self._explore_node(key, distances, reached_from, visited_nodes, heap)
         raise PathNotFound
 
     def _explore_node(
         self,
-        node: Node,
-        distances: Dict[Node, float],
-        visited_nodes: Set[Node],
-        heap: List[Tuple[int, Node]],
+        key: int,
+        distances: Dict[int, int],
+        reached_from: Dict[int, Tuple[int, int]],
+        visited_nodes: Set[int],
+        heap: List[Tuple[int, int]],
     ):
-        for edge in self._edges[node]:
-            if edge.node_b not in visited_nodes:
-                if (distances[node][0] + edge.weight) < distances.get(
-                    edge.node_b, (float("inf"), None)
-                )[0]:
-                    distances[edge.node_b] = (
-                        (distances[node][0] + edge.weight),
-                        distances[node][1] + [edge],
-                    )
-                    heapq.heappush(
-                        heap, ((distances[node][0] + edge.weight), edge.node_b)
-                    )
+        distance = distances[key]
+        for key_b, weight in self._edges[key]:
+            if key_b not in visited_nodes:
+                if distance + weight < distances.get(key_b, float("inf")):
+                    distances[key_b] = distance + weight
+                    reached_from[key_b] = (key, weight)
+                    heapq.heappush(heap, (distance + weight, key_b))
+
+    def _get_path(
+        self, reached_from: Dict[int, Tuple[int, int]], key: int
+    ) -> List[Edge]:
+        path = []  # type: List[Edge]
+        while key in reached_from:
+            key_a, weight = reached_from[key]
+            path.append(
+                Edge(weight, Node(*coords.unpack2(key_a)), Node(*coords.unpack2(key)))
+            )
+            key = key_a
+        return path[::-1]
 
 
 class Grid(object):
-    def __init__(self, grid: Optional[List[List[int]]] = None):
-        self._grid = grid or []  # type: List[List[int]]
+    def __init__(self, grid: Optional[np.ndarray] = None):
+        if grid is None:
+            grid = np.zeros((0, 0), dtype=np.uint8)
+        self._grid = np.asarray(grid, dtype=np.uint8)
 
     def add_row(self, row: List[int]):
-        self._grid.append(row)
+        row = np.array([row], dtype=np.uint8)
+        self._grid = np.concatenate([self._grid.reshape(-1, row.shape[1]), row])
 
     def get_dimensions(self) -> Tuple[int, int]:
-        length = len(self._grid)
-        width = len(self._grid[0]) if length else 0
-        return (length, width)
+        return self._grid.shape
+
+    def get_weights(self) -> np.ndarray:
+        return self._grid
 
     def get_network(self) -> Network:
         network = Network()
-        for i, row in enumerate(self._grid):
-            for j, weight in enumerate(row):
+        length, width = self.get_dimensions()
+        for i in range(length):
+            for j in range(width):
                 network.add_node(Node(x=i, y=j))
-        for i, row in enumerate(self._grid):
+        for i, row in enumerate(self._grid.tolist()):
             for j, weight in enumerate(row):
                 this_node = Node(x=i, y=j)
-
-                if j - 1 >= 0:
-                    left_node = Node(x=i, y=j - 1)
-                    network.add_edge(left_node, this_node, weight)
-
-                if j + 1 < len(row):
-                    right_node = Node(x=i, y=j + 1)
-                    network.add_edge(right_node, this_node, weight)
-
-                if i - 1 >= 0:
-                    top_node = Node(x=i - 1, y=j)
-                    network.add_edge(top_node, this_node, weight)
-
-                if i + 1 < len(self._grid):
-                    bottom_node = Node(x=i + 1, y=j)
-                    network.add_edge(bottom_node, this_node, weight)
+                for di, dj in grids.ORTHOGONAL:
+                    if grids.in_bounds((length, width), i + di, j + dj):
+                        network.add_edge(Node(x=i + di, y=j + dj), this_node, weight)
         return network
 
     def display(self) -> str:
-        display = ""
-        for row in self._grid:
-            for weight in row:
-                display += f" {weight} "
-            display += "\n"
-        return display
+        return grids.display(self._grid, [f" {weight} " for weight in range(10)])
 
     def get_expanded_grid(self, multiple: int) -> Grid:
         """expand grid to be `multiple` times larger"""
-        length, width = self.get_dimensions()
+        # tile (i, j) adds i + j to every weight, wrapping 10 back around to 1
+        weights = self._grid.astype(np.int64)
+        tiles = [
+            [(weights + i + j - 1) % 9 + 1 for j in range(multiple)]
+            for i in range(multiple)
+        ]
+        return Grid(np.block(tiles))
+
+
+INPUT = "data/path_test.txt"
+
+
+def parse(path: str) -> np.ndarray:
+    with open(path) as f:
+        return grids.parse_digits(f)
+
 
-        def get_weight(w):
-            return (w % 9) or 9
+def to_arrays(weights: np.ndarray) -> Dict[str, np.ndarray]:
+    return {"weights": weights}
 
-        new_grid = copy.deepcopy(self._grid)
-        for row_i in range(length):
-            for add in range(1, multiple):
-                row = [get_weight(weight + add) for weight in self._grid[row_i]]
-                new_grid[row_i].extend(row)
 
-        for add in range(1, multiple):
-            for row_i in range(length):
-                new_grid.append(
-                    [get_weight(weight + add) for weight in new_grid[row_i]]
-                )
-        return Grid(new_grid)
+def from_arrays(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    return arrays["weights"]
+
+
+def get_lowest_total_risk(grid: Grid) -> int:
+    network = grid.get_network()
+    START = Node(0, 0)
+    length, width = grid.get_dimensions()
+    END = Node(length - 1, width - 1)
+    distance, shortest_path = network.get_shortest_path(START, END)
+    return distance
+
+
+def get_lowest_total_risk_on_grid(weights: np.ndarray) -> int:
+    """dijkstra straight on the flattened grid, without a network or paths"""
+    length, width = weights.shape
+    risks = weights.ravel().tolist()
+    end = length * width - 1
+    distances = [float("inf")] * (end + 1)
+    distances[0] = 0
+    heap = [(0, 0)]
+    pops = pushes = 0
+    while heap:
+        distance, node = heapq.heappop(heap)
+        pops += 1
+        if node == end:
+            metrics.increment("day_fifteen.heap_pops", pops)
+            metrics.increment("day_fifteen.heap_pushes", pushes + 1)
+            return distance
+        if distance > distances[node]:
+            # already reached through a shorter path
+            continue
+        i, j = divmod(node, width)
+        for neighbour, exists in (
+            (node - width, i > 0),
+            (node + width, i < length - 1),
+            (node - 1, j > 0),
+            (node + 1, j < width - 1),
+        ):
+            if exists and distance + risks[neighbour] < distances[neighbour]:
+                distances[neighbour] = distance + risks[neighbour]
+                heapq.heappush(heap, (distances[neighbour], neighbour))
+                pushes += 1
+    raise PathNotFound
+
+
+def part_one(weights: np.ndarray) -> int:
+    return get_lowest_total_risk(Grid(weights))
+
+
+def part_two(weights: np.ndarray) -> int:
+    return get_lowest_total_risk(Grid(weights).get_expanded_grid(5))
+
+
+def part_one_on_grid(weights: np.ndarray) -> int:
+    return get_lowest_total_risk_on_grid(weights)
+
+
+def part_two_on_grid(weights: np.ndarray) -> int:
+    expanded = Grid(weights).get_expanded_grid(5)
+    return get_lowest_total_risk_on_grid(expanded.get_weights())
+
+
+engines.register(__name__, "reference", part_one, part_two)
+engines.register(__name__, "on_grid", part_one_on_grid, part_two_on_grid)
+
+# part two searches a network of the expanded grid, which holds paths that
+# leave the original tile, so only the grid is shared. The on_grid engine
+# searches the weights as parsed for part one, its parts share nothing but
+# the parsed input and run without a graph
+stages.register(
+    __name__,
+    Stage("grid", Grid, ("data",)),
+    Stage("expanded_grid", lambda grid: grid.get_expanded_grid(5), ("grid",)),
+    Stage("part_one", get_lowest_total_risk, ("grid",)),
+    Stage("part_two", get_lowest_total_risk, ("expanded_grid",)),
+    engine="reference",
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    add_output_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
-    grid = Grid()
-    with open("data/path_test.txt") as f:
-        for i, line in enumerate(f):
-            grid.add_row([int(weight) for weight in line.strip()])
+    args = get_args()
+    configure_from_args(args)
+    grid = Grid(parse(args.file))
 
     # part 1
-    # network = grid.get_network()
-    # START = Node(0, 0)
-    # length, width = grid.get_dimensions()
-    # END = Node(length - 1, width - 1)
-    # distance, shortest_path = network.get_shortest_path(START, END)
-    # print(distance)
+    output.line(str(get_lowest_total_risk(grid)))
 
     # part 2
     new_grid = grid.get_expanded_grid(5)
-    print(new_grid.display())
+    # the expanded grid is 25 times the input, only render it when asked to
+    if output.enabled(output.DEBUG):
+        output.write(new_grid.display(), output.DEBUG)
     network = new_grid.get_network()
     START = Node(0, 0)
     length, width = new_grid.get_dimensions()
@@ -173,10 +287,11 @@ def main():
     number_of_edges = 0
     for n, edges in network._edges.items():
         number_of_edges += len(edges)
-    print(f"number of edges = {number_of_edges}")
-    print(f"number of nodes = {len(network._nodes)}")
+    output.line(f"number of edges = {number_of_edges}", output.VERBOSE)
+    output.line(f"number of nodes = {len(network._nodes)}", output.VERBOSE)
     distance, shortest_path = network.get_shortest_path(START, END)
-    print(distance)
+    output.line(str(distance))
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,21 @@
-from collections import Counter
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
 from collections.abc import Iterator
-from typing import List, NamedTuple
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from parallel import Chunk, parallel_map
+import coords
+import engines
+import grids
+import tokenizer
 
 
 class Position(NamedTuple):
     x: int
     y: int
 
-    def __eq__(self, other) -> bool:
-        # type: (Position) -> bool
-        return self.x == other.x and self.y == other.y
-
-    def __hash__(self):
-        return hash((self.x, self.y))
-
     def __add__(self, other):
         # type: (Position) -> Position
         return Position(
@@ -75,60 +77,230 @@ class LineIterator(Iterator):
 
 class Grid(object):
     def __init__(self):
-        self.grid = []  # type: List[List[int]]
+        self.grid = np.zeros((0, 0), dtype=np.int32)
 
     @property
     def size(self):
         return len(self.grid)
 
     def add_line(self, line: Line):
-        max_size = max([line.start.x, line.start.y, line.end.x, line.end.y]) + 1
+        self.add_segment(line.start.x, line.start.y, line.end.x, line.end.y)
+
+    def add_segment(self, x1: int, y1: int, x2: int, y2: int):
+        max_size = max([x1, y1, x2, y2]) + 1
         if len(self.grid) < max_size:
             self._expand_grid(max_size)
-        for pos in line:
-            self.mark_position(pos)
+        steps = np.arange(max(abs(x2 - x1), abs(y2 - y1)) + 1)
+        xs = x1 + np.sign(x2 - x1) * steps
+        ys = y1 + np.sign(y2 - y1) * steps
+        # a line never visits the same position twice, so fancy indexing
+        # increments every position exactly once
+        self.grid[xs, ys] += 1
 
     def mark_position(self, pos: Position):
         self.grid[pos.x][pos.y] += 1
 
     def _expand_grid(self, max_size: int):
-        for i in range(max_size):
-            try:
-                self.grid[i].extend([0] * (max_size - len(self.grid[i])))
-            except IndexError:
-                self.grid.append([0] * (max_size))
+        self.grid = grids.grow(self.grid, (max_size, max_size))
 
     def display(self) -> str:
-        grid = ""
+        display = ""
         for row in self.grid:
             for item in row:
                 if item == 0:
-                    grid += "."
+                    display += "."
                 else:
-                    grid += str(item)
-                grid += " "
-            grid += "\n"
-        return grid
+                    display += str(item)
+                display += " "
+            display += "\n"
+        return display
 
     def get_counts(self) -> Counter:
-        counts = Counter()
-        for row in self.grid:
-            for item in row:
-                counts[item] += 1
-        return counts
+        values, counts = np.unique(self.grid, return_counts=True)
+        return Counter(dict(zip(values.tolist(), counts.tolist())))
 
 
-def main():
+INPUT = "data/vents.txt"
+
+
+def parse(path: str) -> np.ndarray:
+    """one row of x1, y1, x2, y2 per line of vents"""
+    return tokenizer.read_ints(path, columns=4, dtype=np.int32)
+
+
+def to_arrays(vents: np.ndarray) -> Dict[str, np.ndarray]:
+    return {"vents": vents}
+
+
+def from_arrays(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    return arrays["vents"]
+
+
+def get_overlaps_by_position(vents: np.ndarray) -> int:
+    """walk every line one position at a time"""
+    grid = Grid()
+    if len(vents):
+        grid._expand_grid(int(vents.max()) + 1)
+    for x1, y1, x2, y2 in vents.tolist():
+        for position in Line(Position(x1, y1), Position(x2, y2)):
+            grid.mark_position(position)
+    return sum(
+        [count for overlaps, count in grid.get_counts().items() if overlaps >= 2]
+    )
+
+
+def get_overlaps_by_key(vents: np.ndarray) -> int:
+    """count every position of every line in a dict of packed keys
+
+    Only the positions the lines visit take memory, however far apart the
+    lines are.
+    """
+    counts = defaultdict(int)  # type: Dict[int, int]
+    for x1, y1, x2, y2 in vents.tolist():
+        # packing checks the range, the end must fit as well as the start
+        coords.pack2(x2, y2)
+        key = coords.pack2(x1, y1)
+        step = coords.offset2((x2 > x1) - (x2 < x1), (y2 > y1) - (y2 < y1))
+        for _ in range(max(abs(x2 - x1), abs(y2 - y1)) + 1):
+            counts[key] += 1
+            key += step
+    return sum(1 for count in counts.values() if count >= 2)
+
+
+def get_overlaps(vents: np.ndarray) -> int:
     grid = Grid()
-    with open("data/vents.txt") as f:
-        for line in f:
-            start, end = line.split("->")
-            start_pos = Position(*[int(pos) for pos in start.split(",")])
-            end_pos = Position(*[int(pos) for pos in end.split(",")])
-            grid.add_line(Line(start=start_pos, end=end_pos))
-    print(
-        f"overlaps = {sum([count for overlaps, count in grid.get_counts().items() if overlaps >= 2])}"
+    if len(vents):
+        grid._expand_grid(int(vents.max()) + 1)
+    for x1, y1, x2, y2 in vents.tolist():
+        grid.add_segment(x1, y1, x2, y2)
+    return sum(
+        [count for overlaps, count in grid.get_counts().items() if overlaps >= 2]
+    )
+
+
+def get_overlaps_at_once(vents: np.ndarray) -> int:
+    """every position of every line in one array, counted with bincount"""
+    if not len(vents):
+        return 0
+    x1, y1, x2, y2 = vents.astype(np.int64).T
+    lengths = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + 1
+    # how far along its own line every position is
+    steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    xs = np.repeat(x1, lengths) + np.repeat(np.sign(x2 - x1), lengths) * steps
+    ys = np.repeat(y1, lengths) + np.repeat(np.sign(y2 - y1), lengths) * steps
+    size = int(vents.max()) + 1
+    return int((np.bincount(xs * size + ys) >= 2).sum())
+
+
+def _count_overlaps_in_band(chunk: Chunk, arrays: Dict[str, np.ndarray]) -> int:
+    """overlaps in the rows of the grid from `chunk.start` to `chunk.stop`"""
+    vents = arrays["vents"].astype(np.int64)
+    x1, y1, x2, y2 = vents.T
+    lengths = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + 1
+    # the steps along every line whose x falls in the band
+    dx = np.sign(x2 - x1)
+    first = np.where(
+        dx == 0, 0, np.where(dx > 0, chunk.start - x1, x1 - chunk.stop + 1)
+    )
+    last = np.where(
+        dx == 0,
+        np.where((chunk.start <= x1) & (x1 < chunk.stop), lengths, 0),
+        np.where(dx > 0, chunk.stop - x1, x1 - chunk.start + 1),
+    )
+    first = np.maximum(first, 0)
+    counts = np.maximum(np.minimum(last, lengths) - first, 0)
+    steps = np.repeat(first, counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
     )
+    xs = np.repeat(x1, counts) + np.repeat(dx, counts) * steps
+    ys = np.repeat(y1, counts) + np.repeat(np.sign(y2 - y1), counts) * steps
+    size = int(vents.max()) + 1
+    return int((np.bincount((xs - chunk.start) * size + ys) >= 2).sum())
+
+
+def get_overlaps_in_bands(vents: np.ndarray, workers: int) -> int:
+    """split the grid in bands of rows, each worker draws the lines in one"""
+    if not len(vents):
+        return 0
+    return parallel_map(
+        _count_overlaps_in_band,
+        {"vents": vents},
+        int(vents.max()) + 1,
+        workers=workers,
+        reduce=lambda a, b: a + b,
+        initial=0,
+    )
+
+
+def get_straight_lines(vents: np.ndarray) -> np.ndarray:
+    x1, y1, x2, y2 = vents.T
+    return vents[(x1 == x2) | (y1 == y2)]
+
+
+def part_one(vents: np.ndarray, workers: int = 1) -> int:
+    if workers != 1:
+        return get_overlaps_in_bands(get_straight_lines(vents), workers)
+    return get_overlaps(get_straight_lines(vents))
+
+
+def part_two(vents: np.ndarray, workers: int = 1) -> int:
+    if workers != 1:
+        return get_overlaps_in_bands(vents, workers)
+    return get_overlaps(vents)
+
+
+def part_one_reference(vents: np.ndarray) -> int:
+    return get_overlaps_by_position(get_straight_lines(vents))
+
+
+def part_two_reference(vents: np.ndarray) -> int:
+    return get_overlaps_by_position(vents)
+
+
+def part_one_by_key(vents: np.ndarray) -> int:
+    return get_overlaps_by_key(get_straight_lines(vents))
+
+
+def part_two_by_key(vents: np.ndarray) -> int:
+    return get_overlaps_by_key(vents)
+
+
+def part_one_at_once(vents: np.ndarray) -> int:
+    return get_overlaps_at_once(get_straight_lines(vents))
+
+
+def part_two_at_once(vents: np.ndarray) -> int:
+    return get_overlaps_at_once(vents)
+
+
+engines.register(__name__, "reference", part_one_reference, part_two_reference)
+engines.register(__name__, "segments", part_one, part_two)
+engines.register(__name__, "at_once", part_one_at_once, part_two_at_once)
+# for lines far apart, where a dense grid would not fit
+engines.register(
+    __name__, "packed", part_one_by_key, part_two_by_key, min_size=None
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="draw bands of the grid in this many processes (0: one per core)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    vents = parse(args.file)
+    print(f"overlaps = {part_one(vents, args.workers)}")
+    print(f"overlaps = {part_two(vents, args.workers)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
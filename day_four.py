@@ -1,10 +1,16 @@
-import re
-
 from collections import deque, namedtuple
-from typing import List, Optional
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from stages import Stage
+import stages
+import tokenizer
 
 
 class BingoItem(object):
+    __slots__ = ("value", "marked")
+
     def __init__(self, value: int, marked: bool = False):
         self.value = value
         self.marked = marked
@@ -91,24 +97,44 @@ class BingoBoard(object):
         return total_display
 
 
-def main():
+INPUT = "data/bingo.txt"
+
+
+def parse(path: str) -> Tuple[List[int], List[List[List[int]]]]:
+    with open(path, "rb") as f:
+        numbers_draw = tokenizer.extract_ints(f.readline())
+        # every board is 25 numbers, five rows of five
+        boards = tokenizer.extract_ints(f.read(), columns=25).reshape(-1, 5, 5)
+    return numbers_draw.tolist(), boards.tolist()
+
+
+def to_arrays(
+    data: Tuple[List[int], List[List[List[int]]]]
+) -> Dict[str, np.ndarray]:
+    numbers_draw, boards = data
+    return {
+        "numbers_draw": np.array(numbers_draw, dtype=np.int32),
+        "boards": np.array(boards, dtype=np.int32).reshape(-1, 5, 5),
+    }
+
+
+def from_arrays(
+    arrays: Dict[str, np.ndarray]
+) -> Tuple[List[int], List[List[List[int]]]]:
+    return arrays["numbers_draw"].tolist(), arrays["boards"].tolist()
+
+
+def play(
+    numbers: List[int], rows_for_boards: List[List[List[int]]]
+) -> List[Tuple[BingoBoard, int]]:
     boards = []  # type: List[BingoBoard]
-    pattern = re.compile(
-        r"^(?P<first>(\d|\s)\d )(?P<second>(\d|\s)\d )(?P<third>(\d|\s)\d )(?P<fourth>(\d|\s)\d )(?P<fifth>(\d|\s)\d)$"
-    )
-    with open("data/bingo.txt") as f:
-        numbers_draw = deque([int(d) for d in next(f).split(",")])
+    for rows in rows_for_boards:
         board = BingoBoard()
-        for line in f:
-            match = pattern.match(line.rstrip())
-            if match:
-                board.add_row([int(d) for d in match.groupdict().values()])
-            else:
-                board = BingoBoard()
-            if board.is_populated:
-                boards.append(board)
-
+        for row in rows:
+            board.add_row(row)
+        boards.append(board)
 
+    numbers_draw = deque(numbers)
     winning_boards = []  # type: List[Tuple[BingoBoard, int]]
     number_drawn = numbers_draw.popleft()
     while len(winning_boards) < len(boards) and numbers_draw:
@@ -119,16 +145,56 @@ def main():
                 board.is_completed = True
                 winning_boards.append((board, number_drawn))
         number_drawn = numbers_draw.popleft()
+    return winning_boards
+
+
+def get_score(winning_board: BingoBoard, winning_number: int) -> int:
+    return sum(winning_board.get_unmarked_values()) * winning_number
 
-    if len(winning_boards):
-        for winning_board, winning_number in winning_boards:
-            print(
-                f"""
-                    winning draw = {winning_number}
-                    board =
+
+def get_winning_boards(
+    data: Tuple[List[int], List[List[List[int]]]]
+) -> List[Tuple[BingoBoard, int]]:
+    return play(*data)
+
+
+def get_first_score(winning_boards: List[Tuple[BingoBoard, int]]) -> int:
+    return get_score(*winning_boards[0])
+
+
+def get_last_score(winning_boards: List[Tuple[BingoBoard, int]]) -> int:
+    return get_score(*winning_boards[-1])
+
+
+def part_one(data: Tuple[List[int], List[List[List[int]]]]) -> int:
+    return get_first_score(get_winning_boards(data))
+
+
+def part_two(data: Tuple[List[int], List[List[List[int]]]]) -> int:
+    return get_last_score(get_winning_boards(data))
+
+
+# one game gives both the first and the last board to win
+stages.register(
+    __name__,
+    Stage("winning_boards", get_winning_boards, ("data",)),
+    Stage("part_one", get_first_score, ("winning_boards",)),
+    Stage("part_two", get_last_score, ("winning_boards",)),
+)
+
+
+def main():
+    winning_boards = play(*parse(INPUT))
+    for winning_board, winning_number in winning_boards:
+        print(
+            f"""
+                winning draw = {winning_number}
+                board =
 {winning_board.display()}
-                    score = {sum(winning_board.get_unmarked_values()) * winning_number}
-                """
-            )
+                score = {get_score(winning_board, winning_number)}
+            """
+        )
+
 
-main()
+if __name__ == "__main__":
+    main()
@@ -3,33 +3,73 @@ from collections import Counter, defaultdict
 from typing import Dict, List, Tuple
 
 import copy
+import os
+
+from checkpoint import (
+    DISABLED,
+    Checkpoint,
+    add_checkpoint_arguments,
+    checkpoint_from_args,
+)
+from result_cache import MISSING, ResultCache
+from runner import load_day
+from stages import Stage
+import engines
+import stages
+
+
+INPUT = "data/polymer_test.txt"
+# the steps of the parts, a run of as many shares its answer with them
+PART_STEPS = {10: "part_one", 40: "part_two"}
 
 
 def get_args():
     parser = ArgumentParser()
     parser.add_argument("-S", "--steps", type=int, default=1)
     parser.add_argument("-F", "--file", required=True)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="polymerize again even if this file and steps were seen before",
+    )
+    add_checkpoint_arguments(parser)
     return parser.parse_args()
 
 
-def main():
-    args = get_args()
+def parse(path: str) -> Tuple[str, List[Tuple[str, str]]]:
     pair_insertion_rules = []  # type: List[Tuple[str, str]]
-    with open(args.file) as f:
+    with open(path) as f:
         template = next(f).strip()
         for line in f:
             if line.strip():
                 pattern, insert = line.strip().split("->")
                 pair_insertion_rules.append((pattern.strip(), insert.strip()))
+    return template, pair_insertion_rules
 
-    template_dict = defaultdict(int)  # type: Dict[str, List[int]]
+
+def count_pairs(template: str) -> Dict[str, int]:
+    template_dict = defaultdict(int)  # type: Dict[str, int]
     for i in range(len(template) - 1):
         template_dict[template[i] + template[i + 1]] += 1
-    new_template_dict = copy.deepcopy(template_dict)
+    return template_dict
 
-    print(f"template = {template}")
-    for step in range(1, args.steps + 1):
-        print(f"step {step}")
+
+def insert_pairs(
+    template_dict: Dict[str, int],
+    pair_insertion_rules: List[Tuple[str, str]],
+    steps: int,
+    start: int = 0,
+    checkpoint: Checkpoint = DISABLED,
+) -> Dict[str, int]:
+    """the pairs after `steps` steps, from the pairs after `start` steps"""
+    snapshot = checkpoint.load()
+    if snapshot:
+        start, pairs = snapshot
+        template_dict = defaultdict(int, pairs)
+    # the pairs given may be a plain dict, and stay as they are
+    new_template_dict = defaultdict(int, template_dict)
+
+    for step in range(start + 1, steps + 1):
         for pattern, insert in pair_insertion_rules:
             if pattern in template_dict:
                 new_template_dict[pattern[0] + insert] += template_dict[pattern]
@@ -38,8 +78,12 @@ def main():
                 if new_template_dict[pattern] <= 0:
                     new_template_dict.pop(pattern)
         template_dict = copy.deepcopy(new_template_dict)
+        checkpoint.tick(step, lambda: dict(template_dict))
+    checkpoint.done()
+    return template_dict
 
-    print("done")
+
+def get_difference(template: str, template_dict: Dict[str, int]) -> int:
     counter = Counter()
     for pattern, count in template_dict.items():
         counter[pattern[0]] += count
@@ -48,9 +92,81 @@ def main():
     most_common_list = counter.most_common()
     most_common = most_common_list[0]
     least_common = most_common_list[-1]
-    print(
-        f"most common element - least common element = {most_common[1] - least_common[1]}"
+    return most_common[1] - least_common[1]
+
+
+def polymerize(
+    template: str,
+    pair_insertion_rules: List[Tuple[str, str]],
+    steps: int,
+    checkpoint: Checkpoint = DISABLED,
+) -> int:
+    template_dict = insert_pairs(
+        count_pairs(template), pair_insertion_rules, steps, checkpoint=checkpoint
     )
+    return get_difference(template, template_dict)
+
+
+def part_one(data: Tuple[str, List[Tuple[str, str]]]) -> int:
+    return polymerize(*data, steps=10)
+
+
+def part_two(data: Tuple[str, List[Tuple[str, str]]]) -> int:
+    return polymerize(*data, steps=40)
+
+
+def get_first_steps(data: Tuple[str, List[Tuple[str, str]]]) -> Dict[str, int]:
+    template, pair_insertion_rules = data
+    return insert_pairs(count_pairs(template), pair_insertion_rules, 10)
+
+
+def get_difference_after_first_steps(
+    data: Tuple[str, List[Tuple[str, str]]], first_steps: Dict[str, int]
+) -> int:
+    return get_difference(data[0], first_steps)
+
+
+def get_difference_after_all_steps(
+    data: Tuple[str, List[Tuple[str, str]]], first_steps: Dict[str, int]
+) -> int:
+    template, pair_insertion_rules = data
+    template_dict = insert_pairs(first_steps, pair_insertion_rules, 40, start=10)
+    return get_difference(template, template_dict)
+
+
+# part two carries on from the pairs after the 10 steps of part one
+stages.register(
+    __name__,
+    Stage("first_steps", get_first_steps, ("data",)),
+    Stage("part_one", get_difference_after_first_steps, ("data", "first_steps")),
+    Stage("part_two", get_difference_after_all_steps, ("data", "first_steps")),
+)
+
+
+def main():
+    args = get_args()
+    template, pair_insertion_rules = parse(args.file)
+    print(f"template = {template}")
+    # keyed as the runner keys the parts, not by __main__
+    module = load_day(14)
+    engine = engines.select(module, engines.AUTO, os.path.getsize(args.file))
+    part = PART_STEPS.get(args.steps)
+    params = {"part": part} if part else {"steps": args.steps}
+    with ResultCache() as cache:
+        key = cache.get_key(module, engine.name, args.file, params)
+        difference = MISSING if args.no_cache else cache.get(key)
+        if difference is MISSING:
+            difference = polymerize(
+                template,
+                pair_insertion_rules,
+                args.steps,
+                checkpoint_from_args(
+                    args, "day_fourteen", template, pair_insertion_rules, args.steps
+                ),
+            )
+            cache.put(key, difference)
+    print(f"most common element - least common element = {difference}")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,145 +1,231 @@
-from typing import List, NamedTuple, Set
+from argparse import ArgumentParser
+from typing import Dict, List, NamedTuple, Optional
 from collections.abc import Iterator
 from functools import reduce
 
+import numpy as np
+
+from parallel import Chunk, SharedPool, parallel_map
+from stages import Stage
+import coords
+import grids
+import stages
+
 
 class Position(NamedTuple):
     i: int
     j: int
     height: int
 
-    def __eq__(self, other):
-        return (self.i, self.j) == (self.i, self.j)
+    @property
+    def key(self) -> int:
+        return coords.pack2(self.i, self.j)
 
-    def __hash__(self):
-        return hash((self.i, self.j))
-
-
-class Marked(object):
-    def __init__(self, marked: bool, height: int):
-        self.marked = marked
-        self.height = height
+    # a position is where it is, whatever height it was read with
+    def __eq__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.key == other.key
 
-    def __repr__(self):
-        return f"Marked<{self.height}>{'*' if self.marked else ''}"
+    # tuple compares its items for !=, heights included
+    def __ne__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.key != other.key
 
-    def pos_is_valid(self) -> bool:
-        return not self.marked and self.height != 9
+    def __hash__(self):
+        return self.key
 
 
 class Cave(Iterator):
-    def __init__(self):
-        self._grid = []  # type: List[List[int]]
+    def __init__(self, heights: Optional[np.ndarray] = None):
+        if heights is None:
+            heights = np.zeros((0, 0), dtype=np.uint8)
+        self._grid = heights
         self._curr = (0, 0)
 
     def add_row(self, row: List[int]):
-        self._grid.append(row)
-
-    def pos_is_low_point(self, pos: Position) -> bool:
-        return (
-            self._top_is_lower(pos)
-            and self._bottom_is_lower(pos)
-            and self._right_is_lower(pos)
-            and self._left_is_lower(pos)
-        )
-
-    def _top_is_lower(self, pos: Position) -> bool:
-        return pos.i == 0 or self._grid[pos.i][pos.j] < self._grid[pos.i - 1][pos.j]
-
-    def _bottom_is_lower(self, pos: Position) -> bool:
-        return (pos.i == (len(self._grid) - 1)) or self._grid[pos.i][
-            pos.j
-        ] < self._grid[pos.i + 1][pos.j]
+        row = np.array([row], dtype=np.uint8)
+        self._grid = np.concatenate([self._grid.reshape(-1, row.shape[1]), row])
 
-    def _left_is_lower(self, pos: Position) -> bool:
-        return pos.j == 0 or self._grid[pos.i][pos.j] < self._grid[pos.i][pos.j - 1]
+    def get_heights(self) -> np.ndarray:
+        return self._grid
 
-    def _right_is_lower(self, pos: Position) -> bool:
-        return (pos.j == (len(self._grid) - 1)) or self._grid[pos.i][
-            pos.j
-        ] < self._grid[pos.i][pos.j + 1]
+    def pos_is_low_point(self, pos: Position) -> bool:
+        height = self._grid[pos.i, pos.j]
+        for di, dj in grids.ORTHOGONAL:
+            i, j = pos.i + di, pos.j + dj
+            if grids.in_bounds(self._grid.shape, i, j) and self._grid[i, j] <= height:
+                return False
+        return True
+
+    def get_low_points(self) -> np.ndarray:
+        """mask of every position lower than all of its neighbours"""
+        is_lower = np.ones(self._grid.shape, dtype=bool)
+        for neighbour in grids.neighbours(self._grid, grids.ORTHOGONAL, fill=10):
+            is_lower &= self._grid < neighbour
+        return is_lower
 
     def __iter__(self):
         return self
 
     def __next__(self) -> Position:
-        if self._curr[1] == len(self._grid):
+        if self._curr[1] == self._grid.shape[1]:
             self._curr = (self._curr[0] + 1, 0)
-        if self._curr[0] == len(self._grid):
+        if self._curr[0] == self._grid.shape[0]:
             raise StopIteration
         pos = Position(
             i=self._curr[0],
             j=self._curr[1],
-            height=self._grid[self._curr[0]][self._curr[1]],
+            height=int(self._grid[self._curr]),
         )
         self._curr = (self._curr[0], self._curr[1] + 1)
         return pos
 
+    def get_basin_labels(self) -> np.ndarray:
+        """label of the basin of every position, -1 for positions of height 9"""
+        return grids.label_regions(self._grid != 9)
+
+    def get_basin_sizes(self) -> np.ndarray:
+        labels = self.get_basin_labels()
+        sizes = np.bincount(labels[labels >= 0])
+        return sizes[sizes > 0]
+
     def get_basins(self) -> List[List[Position]]:
-        # if # is not 9 and pos is not marked, add number
-        # try right, try left, try up, try down
-        grid = []
-        for row_i, row in enumerate(self._grid):
-            grid.append([Marked(marked=False, height=pos) for pos in row])
-
-        def inner(row_i: int, col_j: int) -> List[Position]:
-            """process row until end or reach a 9"""
-            if row_i >= len(grid) or col_j >= len(grid) or row_i < 0 or col_j < 0:
-                return set()
-            else:
-                grid[row_i][col_j].marked = True
-                positions = [
-                    Position(i=row_i, j=col_j, height=grid[row_i][col_j].height)
-                ]
-
-                can_go_up = (row_i - 1) >= 0
-                if can_go_up:
-                    if grid[row_i - 1][col_j].pos_is_valid():
-                        positions += inner(row_i - 1, col_j)
-
-                can_go_down = (row_i + 1) < len(grid)
-                if can_go_down:
-                    if grid[row_i + 1][col_j].pos_is_valid():
-                        positions += inner(row_i + 1, col_j)
-
-                can_go_right = (col_j + 1) < len(grid)
-                if can_go_right:
-                    if grid[row_i][col_j + 1].pos_is_valid():
-                        positions += inner(row_i, col_j + 1)
-
-                can_go_left = (col_j - 1) >= 0
-                if can_go_left:
-                    if grid[row_i][col_j - 1].pos_is_valid():
-                        positions += inner(row_i, col_j - 1)
-
-                return positions
-
-        basins = []  # type: List[List[int]]
-        for row_i in range(len(grid)):
-            for col_j in range(len(grid)):
-                mark = grid[row_i][col_j]
-                if not mark.pos_is_valid():
-                    continue
-                else:
-                    basin = list(inner(row_i, col_j))
-                    basins.append(basin)
-        return basins
+        labels = self.get_basin_labels()
+        basins = {}  # type: Dict[int, List[Position]]
+        for i, j in zip(*np.nonzero(labels >= 0)):
+            basins.setdefault(labels[i, j], []).append(
+                Position(i=int(i), j=int(j), height=int(self._grid[i, j]))
+            )
+        return list(basins.values())
+
+
+INPUT = "data/height_map.txt"
+
+
+def parse(path: str) -> np.ndarray:
+    with open(path) as f:
+        return grids.parse_digits(f)
+
+
+def to_arrays(heights: np.ndarray) -> Dict[str, np.ndarray]:
+    return {"heights": heights}
+
+
+def from_arrays(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    return arrays["heights"]
+
+
+def _get_risk_levels(chunk: Chunk, arrays: Dict[str, np.ndarray]) -> int:
+    # the halo rows are the neighbours above and below the chunk
+    heights = arrays["heights"][chunk.halo_start : chunk.halo_stop]
+    low_points = heights[chunk.core][Cave(heights).get_low_points()[chunk.core]]
+    return len(low_points) + int(low_points.sum())
+
+
+def _label_basins(chunk: Chunk, arrays: Dict[str, np.ndarray]) -> int:
+    heights = arrays["heights"][chunk.start : chunk.stop]
+    labels = Cave(heights).get_basin_labels()
+    # labels are flat indices within the chunk, make them ones of the grid
+    offset = chunk.start * heights.shape[1]
+    arrays["labels"][chunk.start : chunk.stop] = np.where(
+        labels >= 0, labels + offset, -1
+    )
+    return chunk.start
+
+
+def merge_basin_sizes(labels: np.ndarray, boundaries: List[int]) -> List[int]:
+    """sizes of basins labelled band by band
+
+    A basin that crosses from the last row of a band into the first row of
+    the next one was labelled twice, once in each band, its labels join.
+    """
+    roots = {}  # type: Dict[int, int]
+
+    def find(label: int) -> int:
+        while roots.get(label, label) != label:
+            label = roots[label]
+        return label
+
+    for row in boundaries:
+        above, below = labels[row - 1], labels[row]
+        joined = (above >= 0) & (below >= 0)
+        for a, b in set(zip(above[joined].tolist(), below[joined].tolist())):
+            a, b = find(a), find(b)
+            if a != b:
+                roots[max(a, b)] = min(a, b)
+    values, counts = np.unique(labels[labels >= 0], return_counts=True)
+    sizes = {}  # type: Dict[int, int]
+    for label, count in zip(values.tolist(), counts.tolist()):
+        root = find(label)
+        sizes[root] = sizes.get(root, 0) + count
+    return list(sizes.values())
+
+
+def part_one(heights: np.ndarray, workers: int = 1) -> int:
+    return parallel_map(
+        _get_risk_levels,
+        {"heights": heights},
+        len(heights),
+        workers=workers,
+        halo=1,
+        reduce=lambda a, b: a + b,
+        initial=0,
+    )
+
+
+def get_basin_sizes(heights: np.ndarray, workers: int = 1) -> List[int]:
+    labels = np.empty(heights.shape, dtype=np.int64)
+    with SharedPool({"heights": heights, "labels": labels}, workers) as pool:
+        boundaries = pool.map(_label_basins, len(heights))[1:]
+        return merge_basin_sizes(pool.arrays["labels"], boundaries)
+
+
+def part_two(heights: np.ndarray, workers: int = 1) -> int:
+    sum_of_basins = sorted(get_basin_sizes(heights, workers), reverse=True)
+    return reduce(lambda a, b: a * b, sum_of_basins[:3], 1)
+
+
+def get_risk_level_sum(cave: Cave) -> int:
+    low_points = cave.get_heights()[cave.get_low_points()]
+    return len(low_points) + int(low_points.sum())
+
+
+def get_product_of_basins(cave: Cave) -> int:
+    sizes = sorted(cave.get_basin_sizes().tolist(), reverse=True)
+    return reduce(lambda a, b: a * b, sizes[:3], 1)
+
+
+# the low points and the basins are different scans of the grid, only the
+# cave around it is shared
+stages.register(
+    __name__,
+    Stage("cave", Cave, ("data",)),
+    Stage("part_one", get_risk_level_sum, ("cave",)),
+    Stage("part_two", get_product_of_basins, ("cave",)),
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="split the height map between this many processes (0: one per core)",
+    )
+    return parser.parse_args()
 
 
 def main():
-    cave = Cave()
-    with open("data/height_map.txt") as f:
-        for line in f:
-            cave.add_row([int(pos) for pos in line.strip()])
-
-    low_points = []
-    for pos in cave:
-        if cave.pos_is_low_point(pos):
-            low_points.append(pos.height)
-    print(f"sum of risk levels = {len(low_points) + sum(low_points)}")
-    basins = cave.get_basins()
-    sum_of_basins = sorted([len(basin) for basin in basins], reverse=True)
-    print(f"product of basins = {reduce(lambda a, b: a * b, sum_of_basins[:3], 1)}")
-
-
-main()
+    args = get_args()
+    heights = parse(args.file)
+    print(f"sum of risk levels = {part_one(heights, args.workers)}")
+    print(f"product of basins = {part_two(heights, args.workers)}")
+
+
+if __name__ == "__main__":
+    main()
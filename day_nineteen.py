@@ -1,9 +1,23 @@
 from __future__ import annotations
+from argparse import ArgumentParser
 from collections import defaultdict
 from itertools import combinations
-from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 import copy
+import re
+
+import numpy as np
+
+from output import add_output_arguments, configure_from_args
+from pools import CHUNKS_PER_WORKER, add_backend_argument
+from stages import Stage
+import coords
+import metrics
+import output
+import pools
+import stages
+import tokenizer
 
 
 class Coords(NamedTuple):
@@ -24,6 +38,10 @@ class Translation(NamedTuple):
     z: int
 
 
+# the orientation and translation that map a scanner's beacons onto another's
+Match = Tuple[int, Translation]
+
+
 TRANSFORMATION_FNS = (
     # face z towards x
     lambda coords: Coords(coords.z, coords.y, -1 * coords.x),
@@ -59,10 +77,24 @@ TRANSFORMATION_FNS = (
 
 
 class Scanner(object):
+    __slots__ = (
+        "__identifier",
+        "beacons",
+        "_scanners_relative_to",
+        "_coords",
+        "_oriented",
+    )
+
     def __init__(self, identifier: int):
         self.__identifier = identifier
         self.beacons = []  # type: List[Coords]
         self._scanners_relative_to = {}  # type: Dict[Scanner, Tuple[int, Translation]]
+        # packed keys of the beacons in every orientation, made on first use
+        self._oriented = None  # type: Optional[List[List[int]]]
+
+    @property
+    def identifier(self) -> int:
+        return self.__identifier
 
     def __eq__(self, other: Scanner) -> bool:
         return self.__identifier == other.__identifier
@@ -80,110 +112,252 @@ class Scanner(object):
 
     def add_beacons(self, coords: List[Coords]) -> Scanner:
         self.beacons.extend(coords)
+        self._oriented = None
         return self
 
     def add_beacon(self, coords: Coords) -> Scanner:
         self.beacons.append(coords)
+        self._oriented = None
         return self
 
+    def get_oriented_keys(self) -> List[List[int]]:
+        if self._oriented is None:
+            self._oriented = [
+                coords.pack_all3(map(transformation_fn, self.beacons))
+                for transformation_fn in TRANSFORMATION_FNS
+            ]
+        return self._oriented
+
     def set_coords(self, coords: Coords) -> Scanner:
         self._coords = coords
         return self
 
-    def compare_to_scanner(self, scanner: Scanner) -> Optional[Tuple[int, Translation]]:
-        translations = defaultdict(int)  # type: Dict[Translation, int]
-        for fn_i, transformation_fn in enumerate(TRANSFORMATION_FNS):
-            for beacon in scanner.beacons:
-                for b in self.beacons:
-                    transformation = transformation_fn(b)
-                    translation = beacon - transformation
+    def match(self, scanner: Scanner) -> Tuple[Optional[Match], int]:
+        """the match with `scanner`, if any, and how many orientations it took"""
+        # translations are counted as offsets between packed keys
+        translations = defaultdict(int)  # type: Dict[int, int]
+        beacons = coords.pack_all3(scanner.beacons)
+        for fn_i, oriented in enumerate(self.get_oriented_keys()):
+            for beacon in beacons:
+                for b in oriented:
+                    translation = beacon - b
                     translations[translation] += 1
                     # atleast 12 beacons map to each other
                     if translations[translation] >= 12:
-                        return (fn_i, translation)
-        else:
-            return None
+                        offset = coords.unpack_offset3(translation)
+                        return (fn_i, Translation(*offset)), fn_i + 1
+        return None, len(TRANSFORMATION_FNS)
+
+    def compare_to_scanner(self, scanner: Scanner) -> Optional[Match]:
+        match, trials = self.match(scanner)
+        metrics.observe("day_nineteen.orientation_trials", trials)
+        return match
 
     def __repr__(self):
         return f"Scanner<{self.__identifier}>"
 
 
-def main():
-    with open("data/beacons_test.txt") as f:
-        scanners = []
-        for line in f:
-            if line.startswith("---"):
-                scanner_id = int(line.strip().strip("-").split()[1])
-                scanners.append(Scanner(scanner_id))
-            elif line.strip():
-                x, y, z = [int(pos) for pos in line.strip().split(",")]
-                scanners[-1].add_beacon(Coords(x, y, z))
-
-    mappings = defaultdict(
-        list
-    )  # type: Dict[Scanner, List[Tuple[Scanner, int, Translation]]]
-    for scanner_a, scanner_b in combinations(scanners, 2):
-        compare_result = scanner_b.compare_to_scanner(scanner_a)
-        if compare_result:
-            print(f"matched {scanner_b} to {scanner_a}")
-            (
-                fn_i,
-                scanner_b_to_a_translation,
-            ) = compare_result
-            mappings[scanner_a].append((scanner_b, fn_i, scanner_b_to_a_translation))
-            compare_result = scanner_a.compare_to_scanner(scanner_b)
-            (
-                fn_i,
-                scanner_a_to_b_translation,
-            ) = compare_result
-            mappings[scanner_b].append((scanner_a, fn_i, scanner_a_to_b_translation))
-            if len(mappings) == len(scanners):
-                break
-
-    def get_beacons_and_scanner_positions(
-        scanner: Scanner,
-    ) -> Tuple[List[Coords], List[Coords]]:
-        def inner(scanner, processed) -> Tuple[List[Coords], List[Coords]]:
-            scanner_positions = [Coords(0, 0, 0)]
-            beacons = copy.copy(scanner.beacons)
-            processed.add(scanner)
-            for other_scanner, fn_i, translation in mappings[scanner]:
-                if other_scanner in processed:
+INPUT = "data/beacons_test.txt"
+
+Mappings = Dict[Scanner, List[Tuple[Scanner, int, Translation]]]
+# the pairs of scanners compared and the matches of both ways of every pair,
+# with the orientations tried
+PairMatches = List[Tuple[Optional[Match], Optional[Match], List[int]]]
+
+
+SCANNER_PATTERN = re.compile(rb"--- scanner (\d+) ---")
+
+
+def parse(path: str) -> List[Scanner]:
+    with open(path, "rb") as f:
+        # ["", identifier, beacons, identifier, beacons, ...]
+        sections = SCANNER_PATTERN.split(f.read())
+    identifiers = [int(identifier) for identifier in sections[1::2]]
+    beacons = [
+        tokenizer.extract_ints(section, columns=3, dtype=np.int32)
+        for section in sections[2::2]
+    ]
+    return from_arrays(
+        {
+            "identifiers": np.array(identifiers, dtype=np.int32),
+            "counts": np.array([len(b) for b in beacons], dtype=np.int32),
+            "beacons": np.concatenate(beacons or [np.zeros((0, 3), np.int32)]),
+        }
+    )
+
+
+def to_arrays(scanners: List[Scanner]) -> Dict[str, np.ndarray]:
+    return {
+        "identifiers": np.array([s.identifier for s in scanners], dtype=np.int32),
+        "counts": np.array([len(s.beacons) for s in scanners], dtype=np.int32),
+        "beacons": np.array(
+            [beacon for s in scanners for beacon in s.beacons], dtype=np.int32
+        ).reshape(-1, 3),
+    }
+
+
+def from_arrays(arrays: Dict[str, np.ndarray]) -> List[Scanner]:
+    scanners = []  # type: List[Scanner]
+    beacons = arrays["beacons"].tolist()
+    start = 0
+    for identifier, count in zip(
+        arrays["identifiers"].tolist(), arrays["counts"].tolist()
+    ):
+        scanners.append(
+            Scanner(identifier).add_beacons(
+                [Coords(*beacon) for beacon in beacons[start : start + count]]
+            )
+        )
+        start += count
+    return scanners
+
+
+def _match_pairs(
+    pairs: Sequence[Tuple[int, int]], scanners: List[Scanner]
+) -> PairMatches:
+    """match both ways of every pair, the second only when the first does"""
+    matches = []  # type: PairMatches
+    for a, b in pairs:
+        b_to_a, trials = scanners[b].match(scanners[a])
+        a_to_b = None
+        tried = [trials]
+        if b_to_a:
+            a_to_b, trials = scanners[a].match(scanners[b])
+            tried.append(trials)
+        matches.append((b_to_a, a_to_b, tried))
+    return matches
+
+
+def get_mappings(
+    scanners: List[Scanner], workers: int = 1, backend: str = pools.AUTO
+) -> Mappings:
+    mappings = defaultdict(list)  # type: Mappings
+    pairs = list(combinations(range(len(scanners)), 2))
+    with pools.Pool(workers, backend, shared=scanners) as pool:
+        # the scanners are usually all mapped well before the last pair, the
+        # pairs are matched a batch at a time and the rest is skipped
+        batch_size = pool.workers * CHUNKS_PER_WORKER if pool.workers > 1 else 1
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start : start + batch_size]
+            matches = pool.map(_match_pairs, batch, chunks=len(batch))
+            for (a, b), (b_to_a, a_to_b, tried) in zip(
+                batch, (match for chunk in matches for match in chunk)
+            ):
+                for trials in tried:
+                    metrics.observe("day_nineteen.orientation_trials", trials)
+                if not b_to_a:
                     continue
-                other_scanner_beacons, other_scanner_positions = inner(
-                    other_scanner, processed
-                )
-                beacons.extend(
-                    Scanner.get_beacons_relative(
-                        fn_i, translation, other_scanner_beacons
-                    )
-                )
-                scanner_positions.extend(
-                    Scanner.get_beacons_relative(
-                        fn_i, translation, other_scanner_positions
-                    )
+                scanner_a, scanner_b = scanners[a], scanners[b]
+                output.line(f"matched {scanner_b} to {scanner_a}", output.VERBOSE)
+                mappings[scanner_a].append((scanner_b, *b_to_a))
+                mappings[scanner_b].append((scanner_a, *a_to_b))
+                if len(mappings) == len(scanners):
+                    return mappings
+    return mappings
+
+
+def get_beacons_and_scanner_positions(
+    mappings: Mappings,
+    scanner: Scanner,
+) -> Tuple[List[Coords], List[Coords]]:
+    def inner(scanner, processed) -> Tuple[List[Coords], List[Coords]]:
+        scanner_positions = [Coords(0, 0, 0)]
+        beacons = copy.copy(scanner.beacons)
+        processed.add(scanner)
+        for other_scanner, fn_i, translation in mappings[scanner]:
+            if other_scanner in processed:
+                continue
+            other_scanner_beacons, other_scanner_positions = inner(
+                other_scanner, processed
+            )
+            beacons.extend(
+                Scanner.get_beacons_relative(fn_i, translation, other_scanner_beacons)
+            )
+            scanner_positions.extend(
+                Scanner.get_beacons_relative(
+                    fn_i, translation, other_scanner_positions
                 )
-            return beacons, scanner_positions
+            )
+        return beacons, scanner_positions
 
-        beacons, scanners = inner(scanner, set())
-        return list(set(beacons)), scanners
+    beacons, scanners = inner(scanner, set())
+    return list(set(beacons)), scanners
 
-    beacons, scanner_positions = get_beacons_and_scanner_positions(scanners[0])
-    print(f"number of beacons = {len(beacons)}")
 
-    def manhattan_distance(coords_a: Coords, coords_b: Coords) -> int:
-        return (
-            abs(coords_a.x - coords_b.x)
-            + abs(coords_a.y - coords_b.y)
-            + abs(coords_a.z - coords_b.z)
-        )
+def manhattan_distance(coords_a: Coords, coords_b: Coords) -> int:
+    return (
+        abs(coords_a.x - coords_b.x)
+        + abs(coords_a.y - coords_b.y)
+        + abs(coords_a.z - coords_b.z)
+    )
 
+
+def get_largest_distance(scanner_positions: List[Coords]) -> int:
     largest_distance = 0
     for s_a, s_b in combinations(scanner_positions, 2):
         distance = manhattan_distance(s_a, s_b)
         if distance > largest_distance:
             largest_distance = distance
-    print(f"largest distance = {largest_distance}")
+    return largest_distance
+
+
+def locate(
+    scanners: List[Scanner], workers: int = 1, backend: str = pools.AUTO
+) -> Tuple[List[Coords], List[Coords]]:
+    """the beacons and the scanners, relative to the first scanner"""
+    mappings = get_mappings(scanners, workers, backend)
+    return get_beacons_and_scanner_positions(mappings, scanners[0])
+
+
+def part_one(
+    scanners: List[Scanner], workers: int = 1, backend: str = pools.AUTO
+) -> int:
+    beacons, _ = locate(scanners, workers, backend)
+    return len(beacons)
+
+
+def part_two(
+    scanners: List[Scanner], workers: int = 1, backend: str = pools.AUTO
+) -> int:
+    _, scanner_positions = locate(scanners, workers, backend)
+    return get_largest_distance(scanner_positions)
+
+
+# aligning the scanners is nearly all of the work of either part
+stages.register(
+    __name__,
+    Stage("located", locate, ("data",)),
+    Stage("part_one", lambda located: len(located[0]), ("located",)),
+    Stage("part_two", lambda located: get_largest_distance(located[1]), ("located",)),
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="match pairs of scanners on this many workers (0: one per core)",
+    )
+    add_backend_argument(parser)
+    add_output_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    configure_from_args(args)
+    scanners = parse(args.file)
+    mappings = get_mappings(scanners, args.workers, args.backend)
+    beacons, scanner_positions = get_beacons_and_scanner_positions(
+        mappings, scanners[0]
+    )
+    output.line(f"number of beacons = {len(beacons)}")
+    output.line(f"largest distance = {get_largest_distance(scanner_positions)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
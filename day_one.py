@@ -1,19 +1,236 @@
-# part 1
-measurments = [int(m) for m in open('data/inputs.txt')]
-initial = measurments[0]
-increases = 0
-for m in measurments[1:]:
-    if m > initial:
-        increases +=1
-    initial = m
-print(increases)
-
-
-# part 2
-initial = measurments[0:3]
-increases = 0
-for m in measurments[3:]:
-    if sum([m] + initial[1:]) > sum(initial):
-        increases += 1
-    initial = initial[1:] + [m]
-print(increases)
+from __future__ import annotations
+from argparse import ArgumentParser
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Sequence
+
+import os
+import sys
+
+from streams import STDIN, Stream, iter_ints, open_binary
+import engines
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class InvalidWindow(Exception):
+    pass
+
+
+INPUT = "data/inputs.txt"
+# depths converted to little endian int64, memory-mapped instead of parsed
+BINARY_SUFFIX = ".i64"
+BINARY_DTYPE = "<i8"
+# bytes of text (or of binary depths) counted at a time
+CHUNK_SIZE = 64 << 20
+# python counts small inputs faster than numpy gets going
+NUMPY_MIN_SIZE = 4 << 20
+
+
+def iter_depth_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """the depths of a file, as int64 arrays of about `chunk_size` bytes"""
+    # numpy only loads for the inputs large enough to need it
+    import numpy as np
+
+    import tokenizer
+
+    if path.endswith(BINARY_SUFFIX):
+        depths = np.memmap(path, dtype=BINARY_DTYPE, mode="r")
+        step = max(chunk_size // depths.itemsize, 1)
+        for start in range(0, len(depths), step):
+            yield np.asarray(depths[start : start + step], dtype=np.int64)
+        return
+    with open_binary(path) as f:
+        rest = b""
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            chunk = rest + chunk
+            # the last depth may continue in the next chunk
+            end = max(chunk.rfind(b"\n"), chunk.rfind(b" "), chunk.rfind(b"\t"))
+            rest = chunk[end + 1 :]
+            yield tokenizer.extract_ints(chunk[: end + 1])
+        yield tokenizer.extract_ints(rest)
+
+
+def iter_binary_depths(path: str) -> Iterator[int]:
+    for chunk in iter_depth_chunks(path):
+        yield from chunk.tolist()
+
+
+def parse(path: str) -> Stream[int]:
+    if path.endswith(BINARY_SUFFIX):
+        return Stream(path, iter_binary_depths)
+    return Stream(path, iter_ints)
+
+
+def convert(path: str, binary_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """write the depths of a text file as binary, return how many there are"""
+    count = 0
+    with open(binary_path + ".tmp", "wb") as f:
+        for chunk in iter_depth_chunks(path, chunk_size):
+            chunk.astype(BINARY_DTYPE).tofile(f)
+            count += len(chunk)
+    os.replace(binary_path + ".tmp", binary_path)
+    return count
+
+
+def check_window(window: int):
+    if window < 1:
+        raise InvalidWindow(f"a window holds at least 1 measurment, not {window}")
+
+
+def count_window_increases(measurments: Iterable[int], window: int) -> int:
+    """how often the sum of `window` consecutive measurments increases
+
+    Consecutive windows share all but one measurment, so comparing their
+    sums only compares the measurment entering with the one leaving,
+    `window` measurments back. The last `window` measurments are kept in a
+    ring buffer, `ring[i]` is the one about to leave.
+    """
+    check_window(window)
+    ring = [0] * window
+    i = 0
+    full = False
+    increases = 0
+    for m in measurments:
+        if full and m > ring[i]:
+            increases += 1
+        ring[i] = m
+        i += 1
+        if i == window:
+            i = 0
+            full = True
+    return increases
+
+
+def count_increases(measurments: Iterable[int], windows: Sequence[int]) -> List[int]:
+    """`count_window_increases` of every window, in a single pass
+
+    For inputs that can only be read once, such as standard input.
+    """
+    if not windows:
+        return []
+    for window in windows:
+        check_window(window)
+    size = max(windows)
+    # one ring buffer of the largest window serves the smaller ones too
+    ring = [0] * size
+    increases = [0] * len(windows)
+    seen = 0
+    i = 0
+    for m in measurments:
+        for w, window in enumerate(windows):
+            if seen >= window and m > ring[i - window]:
+                increases[w] += 1
+        ring[i] = m
+        seen += 1
+        i += 1
+        if i == size:
+            i = 0
+    return increases
+
+
+def count_increases_in_chunks(
+    chunks: Iterable[np.ndarray], windows: Sequence[int]
+) -> List[int]:
+    """`count_increases` over arrays of consecutive measurments
+
+    Every measurment is compared with the one `window` back, all of a chunk
+    at once. The last measurments of a chunk are carried over, so the first
+    ones of the next chunk are compared with them.
+    """
+    import numpy as np
+
+    for window in windows:
+        check_window(window)
+    if not windows:
+        return []
+    size = max(windows)
+    tail = np.zeros(0, dtype=np.int64)
+    increases = [0] * len(windows)
+    for chunk in chunks:
+        measurments = np.concatenate([tail, chunk])
+        for w, window in enumerate(windows):
+            # the measurments of this chunk that have one `window` back
+            start = max(len(tail), window)
+            if start >= len(measurments):
+                continue
+            entering = measurments[start:]
+            leaving = measurments[start - window : len(measurments) - window]
+            increases[w] += int(np.count_nonzero(entering > leaving))
+        tail = measurments[-size:]
+    return increases
+
+
+def part_one(measurments: Iterable[int]) -> int:
+    return count_window_increases(measurments, 1)
+
+
+def part_two(measurments: Iterable[int]) -> int:
+    return count_window_increases(measurments, 3)
+
+
+def part_one_numpy(measurments: Stream[int]) -> int:
+    (increases,) = count_increases_in_chunks(iter_depth_chunks(measurments.path), [1])
+    return increases
+
+
+def part_two_numpy(measurments: Stream[int]) -> int:
+    (increases,) = count_increases_in_chunks(iter_depth_chunks(measurments.path), [3])
+    return increases
+
+
+engines.register(__name__, "streaming", part_one, part_two)
+engines.register(
+    __name__, "numpy", part_one_numpy, part_two_numpy, min_size=NUMPY_MIN_SIZE
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-F", "--file", default=INPUT, help=f"depths to read, {STDIN} for stdin"
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=int,
+        action="append",
+        dest="windows",
+        help="compare the sums of this many measurments (default: 1 and 3)",
+    )
+    parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help=f"count with numpy a chunk at a time (default for files of "
+        f"{NUMPY_MIN_SIZE >> 20} MiB and more, and for {BINARY_SUFFIX} files)",
+    )
+    parser.add_argument(
+        "--convert",
+        metavar="PATH",
+        help=f"write the depths to PATH (ending in {BINARY_SUFFIX}) as binary, "
+        f"for -F to memory-map",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    if args.convert:
+        if not args.convert.endswith(BINARY_SUFFIX):
+            print(f"binary depths go in a {BINARY_SUFFIX} file", file=sys.stderr)
+            sys.exit(1)
+        print(f"converted {convert(args.file, args.convert)} depths")
+        return
+    windows = args.windows or [1, 3]
+    use_numpy = args.numpy or args.file.endswith(BINARY_SUFFIX)
+    if args.file != STDIN and os.path.getsize(args.file) >= NUMPY_MIN_SIZE:
+        use_numpy = True
+    if use_numpy:
+        counts = count_increases_in_chunks(iter_depth_chunks(args.file), windows)
+    else:
+        counts = count_increases(parse(args.file), windows)
+    for increases in counts:
+        print(increases)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,32 @@
-from typing import List
+from typing import Callable, List, Tuple
 
-try:
-    from scipy.optimize import minimize
+import functools
+import importlib.util
+
+import engines
+
+
+# "convex" and "scan" are exact, "scipy" runs Nelder-Mead and only imports
+# scipy once it is selected
+METHODS = ("convex", "scan", "scipy")
+
+CostFn = Callable[[List[int], List[int]], int]
+
+
+class UnknownMethod(Exception):
+    pass
+
+
+class ScipyNotInstalled(Exception):
+    pass
 
-    scipy_installed = True
-except ImportError:
-    scipy_installed = False
+
+class MinimumNotFound(Exception):
+    pass
+
+
+def scipy_installed() -> bool:
+    return importlib.util.find_spec("scipy") is not None
 
 
 def sum_of_costs_part_1(desired_position: List[int], crab_positions: List[int]) -> int:
@@ -20,35 +41,99 @@ def sum_of_costs_part_2(desired_position: List[int], crab_positions: List[int])
     return sum(costs)
 
 
+INPUT = "data/crabs.txt"
+
+
+def parse(path: str) -> List[int]:
+    with open(path) as f:
+        return [int(c) for c in next(f).split(",")]  # type: List[int]
+
+
+def _minimize_convex(sum_fn: CostFn, crab_positions: List[int]) -> Tuple[int, int]:
+    """binary search for the lowest cost, both cost functions are convex"""
+    low, high = min(crab_positions), max(crab_positions)
+    while low < high:
+        middle = (low + high) // 2
+        if sum_fn([middle], crab_positions) <= sum_fn([middle + 1], crab_positions):
+            high = middle
+        else:
+            low = middle + 1
+    return (low, sum_fn([low], crab_positions))
+
+
+def _minimize_scan(sum_fn: CostFn, crab_positions: List[int]) -> Tuple[int, int]:
+    min_position = (
+        0,
+        sum_fn([0], crab_positions),
+    )
+    for i in range(max(crab_positions)):
+        cost = sum_fn([i], crab_positions)
+        if cost < min_position[1]:
+            min_position = (i, cost)
+    return min_position
+
+
+def _minimize_scipy(sum_fn: CostFn, crab_positions: List[int]) -> Tuple[int, int]:
+    if not scipy_installed():
+        raise ScipyNotInstalled("the scipy method needs scipy, pip install scipy")
+    from scipy.optimize import minimize
+
+    solution = minimize(
+        sum_fn,
+        x0=crab_positions[0],
+        method="Nelder-Mead",
+        args=(crab_positions,),
+    )
+    if not solution.success:
+        raise MinimumNotFound(f"Nelder-Mead did not converge: {solution.message}")
+    position = round(solution.x[0])
+    return (position, sum_fn([position], crab_positions))
+
+
+def get_minimum_cost(
+    sum_fn: CostFn, crab_positions: List[int], method: str = "convex"
+) -> Tuple[int, int]:
+    if method not in METHODS:
+        raise UnknownMethod(method)
+    if method == "scipy":
+        return _minimize_scipy(sum_fn, crab_positions)
+    if method == "convex":
+        return _minimize_convex(sum_fn, crab_positions)
+    return _minimize_scan(sum_fn, crab_positions)
+
+
+def part_one(crab_positions: List[int], method: str = "convex") -> int:
+    _, cost = get_minimum_cost(sum_of_costs_part_1, crab_positions, method)
+    return cost
+
+
+def part_two(crab_positions: List[int], method: str = "convex") -> int:
+    _, cost = get_minimum_cost(sum_of_costs_part_2, crab_positions, method)
+    return int(cost)
+
+
+# scanning every position is the reference, scipy is approximate and only
+# runs when asked for
+for engine, method, min_size in (
+    ("reference", "scan", 0),
+    ("convex", "convex", 0),
+    ("scipy", "scipy", None),
+):
+    engines.register(
+        __name__,
+        engine,
+        functools.partial(part_one, method=method),
+        functools.partial(part_two, method=method),
+        min_size=min_size,
+    )
+
+
 def main():
-    with open("data/crabs.txt") as f:
-        crab_positions = [int(c) for c in next(f).split(",")]  # type: List[int]
-
-    sum_fn = sum_of_costs_part_2
-
-    solution_found = False
-    if scipy_installed:
-        solution = minimize(
-            sum_fn,
-            x0=crab_positions[0],
-            method="Nelder-Mead",
-            args=(crab_positions,),
-        )
-        solution_found = solution.success
-    if solution_found:
-        print(
-            f"minimum cost (minimize funtion) = {sum_fn([round(solution.x[0])], crab_positions)}, at position {round(solution.x[0])}, success = {solution.success}"
-        )
-    else:
-        min_position = (
-            0,
-            sum_fn([0], crab_positions),
-        )
-        for i in range(max(crab_positions)):
-            cost = sum_fn([i], crab_positions)
-            if cost < min_position[1]:
-                min_position = (i, cost)
-        print(f"minimum cost = {min_position[1]}, at position {min_position[0]}")
-
-
-main()
+    crab_positions = parse(INPUT)
+    for sum_fn in (sum_of_costs_part_1, sum_of_costs_part_2):
+        position, cost = get_minimum_cost(sum_fn, crab_positions)
+        print(f"minimum cost = {cost}, at position {position}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,50 @@
-from scipy.optimize import minimize
-from shapely.geometry import Point, Polygon
+from argparse import ArgumentParser
 from typing import NamedTuple, Tuple, List
 
+import operator
+
+from output import add_output_arguments, configure_from_args
+from pools import add_backend_argument
+from stages import Stage
+import output
+import pools
+import stages
+
 
 class Slope(NamedTuple):
     x: int
     y: int
 
 
-def point_missed_target(point: Point, target: Polygon) -> bool:
+class Point(NamedTuple):
+    x: int
+    y: int
+
+
+class Target(NamedTuple):
+    """axis aligned target area, `bounds` is (min_x, min_y, max_x, max_y)"""
+
+    min_x: int
+    min_y: int
+    max_x: int
+    max_y: int
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        return (self.min_x, self.min_y, self.max_x, self.max_y)
+
+
+def point_missed_target(point: Point, target: Target) -> bool:
     _, miny, _, _ = target.bounds
     return point.y < miny
 
 
-def target_contains_point(point: Point, target: Polygon) -> bool:
+def target_contains_point(point: Point, target: Target) -> bool:
     (minx, miny, maxx, maxy) = target.bounds
     return point.x <= maxx and point.x >= minx and point.y <= maxy and point.y >= miny
 
 
-def trajectory_hits_target(slope: Slope, target: Polygon) -> Tuple[bool, List[Point]]:
+def trajectory_hits_target(slope: Slope, target: Target) -> Tuple[bool, List[Point]]:
     def inner(point: Point, slope: Slope, path: List[Point]) -> bool:
         # if point == Point(21, -10):
         #    import pdb; pdb.set_trace()
@@ -39,41 +65,118 @@ def trajectory_hits_target(slope: Slope, target: Polygon) -> Tuple[bool, List[Po
     return inner(Point(0, 0), slope, [])
 
 
-def main():
-    with open("data/target.txt") as f:
+INPUT = "data/target.txt"
+
+
+def parse(path: str) -> Tuple[int, int, int, int]:
+    with open(path) as f:
         target_area = f.read().strip()
         x_area, y_area = target_area.lstrip("target area: ").split(", ")
         min_x, max_x = (int(x) for x in x_area[2:].split(".."))
         min_y, max_y = (int(y) for y in y_area[2:].split(".."))
-    target = Polygon(
-        [
-            Point(min_x, min_y),
-            Point(min_x, max_y),
-            Point(max_x, min_y),
-            Point(max_x, max_y),
-        ]
-    )
+    return min_x, max_x, min_y, max_y
 
-    # 17! is 153 meaning it will not move further rightward at point 153
-    # 19! is 190 meaning it will not move further rightward at point 153
-    # 113 was trial and error tbh
-    # slope = Slope(17, 113)
-    # hits, path = trajectory_hits_target(slope, target)
-    # if hits:
-    #    print(f"Slope {slope} hits target area {target}")
-    #    print(f"max is {max([p.y for p in path])}")
 
-    # 19! is 190 meaning it will not move further rightward at point 153
-    slopes_that_hit = []
-    (_, miny, maxx, maxy) = target.bounds
-    for x in range(int(maxx) + 1):
-        print(f"{x} of {maxx}")
+def get_target(area: Tuple[int, int, int, int]) -> Target:
+    min_x, max_x, min_y, max_y = area
+    return Target(min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y)
+
+
+def _get_trajectories_starting_with(
+    velocities: range, target: Target
+) -> List[Tuple[Slope, List[Point]]]:
+    """the trajectories that hit whose x velocity is one of `velocities`"""
+    (_, miny, _, _) = target.bounds
+    trajectories = []  # type: List[Tuple[Slope, List[Point]]]
+    for x in velocities:
         for y in range(int(miny), int(abs(miny)) + 1):
             slope = Slope(x, y)
             hits, path = trajectory_hits_target(slope, target)
             if hits:
-                slopes_that_hit.append(slope)
-    print(f"number of slopes that hit are {len(slopes_that_hit)}")
+                trajectories.append((slope, path))
+    return trajectories
+
+
+def get_trajectories_that_hit(
+    target: Target, workers: int = 1, backend: str = pools.AUTO
+) -> List[Tuple[Slope, List[Point]]]:
+    # 17! is 153 meaning it will not move further rightward at point 153
+    # 19! is 190 meaning it will not move further rightward at point 153
+    (_, _, maxx, _) = target.bounds
+    velocities = range(int(maxx) + 1)
+    if workers != 1:
+        # every x velocity is swept on its own, chunks of them in parallel
+        return pools.pool_map(
+            _get_trajectories_starting_with,
+            velocities,
+            workers=workers,
+            backend=backend,
+            shared=target,
+            reduce=operator.add,
+            initial=[],
+        )
+    trajectories = []  # type: List[Tuple[Slope, List[Point]]]
+    progress = output.progress(len(velocities), "x velocities")
+    for x in velocities:
+        progress.update(x)
+        trajectories.extend(_get_trajectories_starting_with(range(x, x + 1), target))
+    progress.done()
+    return trajectories
+
+
+def get_highest_point(trajectories: List[Tuple[Slope, List[Point]]]) -> int:
+    return max([max([0] + [p.y for p in path]) for _, path in trajectories])
+
+
+def get_trajectories(
+    area: Tuple[int, int, int, int], workers: int = 1, backend: str = pools.AUTO
+) -> List[Tuple[Slope, List[Point]]]:
+    return get_trajectories_that_hit(get_target(area), workers, backend)
+
+
+def part_one(
+    area: Tuple[int, int, int, int], workers: int = 1, backend: str = pools.AUTO
+) -> int:
+    return get_highest_point(get_trajectories(area, workers, backend))
+
+
+def part_two(
+    area: Tuple[int, int, int, int], workers: int = 1, backend: str = pools.AUTO
+) -> int:
+    return len(get_trajectories(area, workers, backend))
+
+
+# both parts look at the same trajectories, which take all of the time
+stages.register(
+    __name__,
+    Stage("trajectories", get_trajectories, ("data",)),
+    Stage("part_one", get_highest_point, ("trajectories",)),
+    Stage("part_two", len, ("trajectories",)),
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="sweep the x velocities on this many workers (0: one per core)",
+    )
+    add_backend_argument(parser)
+    add_output_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    configure_from_args(args)
+    trajectories = get_trajectories(parse(args.file), args.workers, args.backend)
+    output.line(f"max is {get_highest_point(trajectories)}")
+    output.line(f"number of slopes that hit are {len(trajectories)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,16 @@
-from collections import defaultdict
-from typing import List
+from argparse import ArgumentParser
+from collections import defaultdict, deque
+from typing import Iterator, List
+
+from checkpoint import (
+    DISABLED,
+    Checkpoint,
+    add_checkpoint_arguments,
+    checkpoint_from_args,
+)
+from output import add_output_arguments, configure_from_args
+import engines
+import output
 
 
 class Pond(object):
@@ -21,19 +32,108 @@ class Pond(object):
     def get_count(self) -> int:
         return sum([v for v in self.fishies.values()])
 
+    def simulate(
+        self, iter_days: int, checkpoint: Checkpoint = DISABLED
+    ) -> Iterator[int]:
+        """run `iter_days` new days, yielding the number of days run so far"""
+        start = 0
+        snapshot = checkpoint.load()
+        if snapshot:
+            start, fishies = snapshot
+            self.fishies = defaultdict(int, fishies)
+        for day_i in range(start + 1, iter_days + 1):
+            self.new_day()
+            checkpoint.tick(day_i, lambda: dict(self.fishies))
+            yield day_i
+        checkpoint.done()
 
-def main():
-    with open("data/lanternfish.txt") as f:
-        lantern_fish = [
+
+INPUT = "data/lanternfish.txt"
+
+
+def parse(path: str) -> List[int]:
+    with open(path) as f:
+        return [
             int(fishy_days_remaining) for fishy_days_remaining in next(f).split(",")
-        ]  # type: List[int]
+        ]
+
+
+def get_count_after(
+    lantern_fish: List[int], iter_days: int, checkpoint: Checkpoint = DISABLED
+) -> int:
     pond = Pond(lantern_fish)
+    for _ in pond.simulate(iter_days, checkpoint):
+        pass
+    return pond.get_count()
+
+
+def get_count_after_rotating(
+    lantern_fish: List[int], iter_days: int, checkpoint: Checkpoint = DISABLED
+) -> int:
+    """count the fish per timer, a day shifts every count down by one"""
+    timers = deque([0] * 9)  # type: deque[int]
+    for days_remaining in lantern_fish:
+        timers[days_remaining] += 1
+    start = 0
+    snapshot = checkpoint.load()
+    if snapshot:
+        start, counts = snapshot
+        timers = deque(counts)
+    for day_i in range(start + 1, iter_days + 1):
+        spawning = timers.popleft()
+        timers[6] += spawning
+        timers.append(spawning)
+        checkpoint.tick(day_i, lambda: list(timers))
+    checkpoint.done()
+    return sum(timers)
+
+
+def part_one(lantern_fish: List[int]) -> int:
+    return get_count_after(lantern_fish, 80)
+
 
-    iter_days = 256
+def part_two(lantern_fish: List[int]) -> int:
+    return get_count_after(lantern_fish, 256)
+
+
+def part_one_rotating(lantern_fish: List[int]) -> int:
+    return get_count_after_rotating(lantern_fish, 80)
+
+
+def part_two_rotating(lantern_fish: List[int]) -> int:
+    return get_count_after_rotating(lantern_fish, 256)
+
+
+engines.register(__name__, "reference", part_one, part_two)
+engines.register(__name__, "rotating", part_one_rotating, part_two_rotating)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument("--days", type=int, default=256)
+    add_checkpoint_arguments(parser)
+    add_output_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    configure_from_args(args)
+    lantern_fish = parse(args.file)
+    pond = Pond(lantern_fish)
+    checkpoint = checkpoint_from_args(args, "day_six", lantern_fish, args.days)
 
-    for day_i in range(1, iter_days + 1):
-        pond.new_day()
-        print(f"fishy count after {day_i} days is {pond.get_count()}")
+    # the count of every day is only worth summing when it is printed
+    every_day = output.enabled(output.VERBOSE)
+    for day_i in pond.simulate(args.days, checkpoint):
+        if every_day and day_i < args.days:
+            output.line(
+                f"fishy count after {day_i} days is {pond.get_count()}",
+                output.VERBOSE,
+            )
+    output.line(f"fishy count after {args.days} days is {pond.get_count()}")
 
 
-main()
+if __name__ == "__main__":
+    main()
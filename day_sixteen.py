@@ -1,12 +1,17 @@
 from functools import reduce
 from typing import List, Tuple
 
+from stages import Stage
+import stages
+
 
 class InvalidType(Exception):
     pass
 
 
 class Packet(object):
+    __slots__ = ("version", "type_id", "bits", "sub_packets")
+
     def __init__(self, version: int, type_id: int, bits: int):
         self.version = version
         self.type_id = type_id
@@ -93,6 +98,8 @@ class Packet(object):
 
 
 class PacketTypeFour(Packet):
+    __slots__ = ("number",)
+
     def __init__(self, version: int, bits: int, number: int):
         super().__init__(version, 4, bits)
         self.number = number
@@ -155,17 +162,51 @@ def parse_packet(
             return packet
 
 
+INPUT = "data/packets_test.txt"
+
+
+def parse(path: str) -> List[str]:
+    with open(path) as f:
+        return [hexadecimal.strip() for hexadecimal in f if hexadecimal.strip()]
+
+
+def get_packets(transmissions: List[str]) -> List[Packet]:
+    return [
+        parse_packet(Packet.hex_to_bits(hexadecimal)) for hexadecimal in transmissions
+    ]
+
+
+def get_sums_of_versions(packets: List[Packet]) -> List[int]:
+    return [packet.get_sum_of_versions() for packet in packets]
+
+
+def calculate(packets: List[Packet]) -> List[int]:
+    return [packet.calculate() for packet in packets]
+
+
+def part_one(transmissions: List[str]) -> List[int]:
+    return get_sums_of_versions(get_packets(transmissions))
+
+
+def part_two(transmissions: List[str]) -> List[int]:
+    return calculate(get_packets(transmissions))
+
+
+stages.register(
+    __name__,
+    Stage("packets", get_packets, ("data",)),
+    Stage("part_one", get_sums_of_versions, ("packets",)),
+    Stage("part_two", calculate, ("packets",)),
+)
+
+
 def main():
-    with open("data/packets_test.txt") as f:
-        for hexadecimal in f:
-            packet = parse_packet(Packet.hex_to_bits(hexadecimal.strip()))
-            print(
-                f"packet version sum for {hexadecimal.strip()} = {packet.get_sum_of_versions()}"
-            )
-            print(
-                f"packet version calculation for {hexadecimal.strip()} = {packet.calculate()}"
-            )
-            print()
+    for hexadecimal in parse(INPUT):
+        packet = parse_packet(Packet.hex_to_bits(hexadecimal))
+        print(f"packet version sum for {hexadecimal} = {packet.get_sum_of_versions()}")
+        print(f"packet version calculation for {hexadecimal} = {packet.calculate()}")
+        print()
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 from functools import reduce
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from stages import Stage
+from streams import Stream, iter_text
+import stages
 
 
 class IllegalCharacter(Exception):
@@ -64,44 +68,102 @@ def convert_characters_to_points_incomplete_line(missing_characters: List[str])
     )
 
 
-def main():
+INPUT = "data/syntax.txt"
+
+
+def parse(path: str) -> Stream[str]:
+    return Stream(path, iter_text)
+
+
+def check_line(line: str) -> Tuple[Optional[str], Optional[List[str]]]:
+    """the first illegal character of a corrupt line, or the characters
+    missing from an incomplete one"""
+    stack = []
+    for character in line:
+        if is_opening_character(character):
+            stack.append(character)
+        elif is_closing_character(character):
+            try:
+                opening_character = stack.pop()
+            except IndexError:
+                opening_character = "x"
+            if not characters_match(opening_character, character):
+                return character, None
+        else:
+            raise IllegalCharacter
+    incomplete_line = []  # type: List[str]
+    while stack:
+        opening_character = stack.pop()
+        ending_character = get_matching_character(opening_character)
+        incomplete_line.append(ending_character)
+    return None, incomplete_line
+
+
+def check_lines(lines: Iterable[str]) -> Tuple[List[str], List[List[str]]]:
     illegal_characters = []  # type: List[str]
     incomplete_lines = []  # type: List[List[str]]
-    with open("data/syntax.txt") as f:
-        for line in f:
-            stack = []
-            for character in line.strip():
-                if is_opening_character(character):
-                    stack.append(character)
-                elif is_closing_character(character):
-                    try:
-                        opening_character = stack.pop()
-                    except IndexError:
-                        opening_character = "x"
-                    if not characters_match(opening_character, character):
-                        illegal_characters.append(character)
-                        break
-                else:
-                    raise IllegalCharacter
-            else:
-                incomplete_line = []  # type: List[str]
-                while stack:
-                    opening_character = stack.pop()
-                    ending_character = get_matching_character(opening_character)
-                    incomplete_line.append(ending_character)
-                incomplete_lines.append(incomplete_line)
-    points = convert_characters_to_points_corrupt_line(illegal_characters)
-    print(f"total syntax error score is {points}")
-
+    for line in lines:
+        illegal_character, incomplete_line = check_line(line)
+        if illegal_character:
+            illegal_characters.append(illegal_character)
+        else:
+            incomplete_lines.append(incomplete_line)
+    return illegal_characters, incomplete_lines
+
+
+def part_one(lines: Iterable[str]) -> int:
+    # one line at a time, the corrupt lines are never all held in memory
+    total = 0
+    for line in lines:
+        illegal_character, _ = check_line(line)
+        if illegal_character:
+            total += convert_characters_to_points_corrupt_line([illegal_character])
+    return total
+
+
+def part_two(lines: Iterable[str]) -> int:
     scores_incomplete_lines = sorted(
-        [
-            convert_characters_to_points_incomplete_line(incomplete_line)
-            for incomplete_line in incomplete_lines
-        ]
+        convert_characters_to_points_incomplete_line(incomplete_line)
+        for _, incomplete_line in map(check_line, lines)
+        if incomplete_line is not None
     )  # type List[int]
-    print(
-        f"middle score = {scores_incomplete_lines[int(len(scores_incomplete_lines) / 2)]}"
-    )
+    return scores_incomplete_lines[int(len(scores_incomplete_lines) / 2)]
+
+
+def get_scores(lines: Iterable[str]) -> Tuple[int, List[int]]:
+    """the total score of the corrupt lines and the score of every
+    incomplete one, in a single pass over the lines"""
+    total = 0
+    scores_incomplete_lines = []  # type: List[int]
+    for line in lines:
+        illegal_character, incomplete_line = check_line(line)
+        if illegal_character:
+            total += convert_characters_to_points_corrupt_line([illegal_character])
+        else:
+            scores_incomplete_lines.append(
+                convert_characters_to_points_incomplete_line(incomplete_line)
+            )
+    return total, scores_incomplete_lines
+
+
+def get_middle_score(scores_incomplete_lines: List[int]) -> int:
+    scores_incomplete_lines = sorted(scores_incomplete_lines)
+    return scores_incomplete_lines[int(len(scores_incomplete_lines) / 2)]
+
+
+stages.register(
+    __name__,
+    Stage("scores", get_scores, ("data",)),
+    Stage("part_one", lambda scores: scores[0], ("scores",)),
+    Stage("part_two", lambda scores: get_middle_score(scores[1]), ("scores",)),
+)
+
+
+def main():
+    lines = parse(INPUT)
+    print(f"total syntax error score is {part_one(lines)}")
+    print(f"middle score = {part_two(lines)}")
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
-from typing import List, NamedTuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from stages import Stage
+import grids
+import stages
+import tokenizer
 
 
 class Position(NamedTuple):
@@ -12,27 +19,25 @@ class Fold(NamedTuple):
 
 
 class Grid(object):
-    def __init__(self):
-        self._grid = []  # type: List[List[bool]]
+    def __init__(self, dots: Optional[np.ndarray] = None):
+        if dots is None:
+            dots = np.zeros((0, 0), dtype=bool)
+        self._grid = dots
 
     def mark_position(self, position: Position):
         self._expand_grid(position)
-        self._grid[position.y][position.x] = True
-
-    def _expand_grid(self, position: Position):
-        try:
-            max_x = max([len(self._grid[0]), position.x + 1])
-        except IndexError:
-            max_x = position.x + 1
+        self._grid[position.y, position.x] = True
 
-        max_y = max([len(self._grid), position.y + 1])
-        if max_y == len(self._grid) and max_x == len(self._grid[0]):
+    def mark_positions(self, dots: np.ndarray):
+        """mark every row of x, y in `dots`"""
+        if not len(dots):
             return
-        for i in range(max_y):
-            try:
-                self._grid[i].extend([False] * (max_x - len(self._grid[i])))
-            except IndexError:
-                self._grid.append([False] * (max_x))
+        xs, ys = dots.T
+        self._expand_grid(Position(x=int(xs.max()), y=int(ys.max())))
+        self._grid[ys, xs] = True
+
+    def _expand_grid(self, position: Position):
+        self._grid = grids.grow(self._grid, (position.y + 1, position.x + 1))
 
     def fold(self, fold: Fold):
         if fold.horizontal:
@@ -41,53 +46,108 @@ class Grid(object):
             self._fold_vertical(fold.increment)
 
     def _fold_horizontal(self, y_fold: int):
-        for y in range(y_fold + 1, len(self._grid)):
-            for x in range(len(self._grid[y])):
-                marked = self._grid[y][x]
-                if marked:
-                    self.mark_position(Position(x, y=(2 * y_fold) - y))
-        self._grid = self._grid[:y_fold]
+        # row y lands on row 2 * y_fold - y, rows that would land above the
+        # top of the grid are dropped
+        folded = self._grid[:y_fold].copy()
+        overlap = min(max(len(self._grid) - y_fold - 1, 0), y_fold)
+        if overlap:
+            below = self._grid[y_fold + 1 : y_fold + 1 + overlap]
+            folded[y_fold - overlap :] |= below[::-1]
+        self._grid = folded
 
     def _fold_vertical(self, x_fold: int):
-        for y in range(len(self._grid)):
-            for x in range(x_fold + 1, len(self._grid[y])):
-                marked = self._grid[y][x]
-                if marked:
-                    self.mark_position(Position(x=(2 * x_fold) - x, y=y))
-            self._grid[y] = self._grid[y][:x_fold]
+        self._grid = self._grid.T
+        self._fold_horizontal(x_fold)
+        self._grid = np.ascontiguousarray(self._grid.T)
 
     def display(self) -> str:
-        display = ""
-        for row in self._grid:
-            for marked in row:
-                display += "#" if marked else "."
-                display += " "
-            display += "\n"
-        return display
+        return grids.display(self._grid, (". ", "# "))
 
     def number_of_dots_visible(self) -> int:
-        count = 0
-        for row in self._grid:
-            count += sum(row)
-        return count
+        return int(self._grid.sum())
 
+    def get_dots(self) -> np.ndarray:
+        return self._grid
 
-def main():
+
+INPUT = "data/dots.txt"
+
+
+def parse(path: str) -> Tuple[np.ndarray, List[Fold]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    # the dots come first, then a handful of folds
+    start = data.find(b"fold")
+    if start == -1:
+        start = len(data)
+    dots = tokenizer.extract_ints(data[:start], columns=2, dtype=np.int32)
     folds = []  # type: List[Fold]
+    for line in data[start:].decode().splitlines():
+        if line.startswith("fold"):
+            xy, increment = line.strip().split()[-1].split("=")
+            folds.append(Fold(increment=int(increment), horizontal=(xy == "y")))
+    return dots, folds
+
+
+def to_arrays(data: Tuple[np.ndarray, List[Fold]]) -> Dict[str, np.ndarray]:
+    dots, folds = data
+    return {
+        "dots": dots,
+        "folds": np.array(folds, dtype=np.int32).reshape(-1, 2),
+    }
+
+
+def from_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, List[Fold]]:
+    folds = [
+        Fold(increment=increment, horizontal=bool(horizontal))
+        for increment, horizontal in arrays["folds"].tolist()
+    ]
+    return arrays["dots"], folds
+
+
+def get_grid(dots: np.ndarray) -> Grid:
     grid = Grid()
-    with open("data/dots.txt") as f:
-        for line in f:
-            if line.startswith("fold"):
-                xy, increment = line.strip().split()[-1].split("=")
-                folds.append(Fold(increment=int(increment), horizontal=(xy == "y")))
-            elif line.strip():
-                pos = Position(*[int(i) for i in line.strip().split(",")])
-                grid.mark_position(pos)
+    grid.mark_positions(dots)
+    return grid
+
+
+def fold_first(data: Tuple[np.ndarray, List[Fold]]) -> Grid:
+    dots, folds = data
+    grid = get_grid(dots)
     grid.fold(folds[0])
-    print(f"count = {grid.number_of_dots_visible()}")
+    return grid
+
+
+def fold_the_rest(data: Tuple[np.ndarray, List[Fold]], first_fold: Grid) -> str:
+    _, folds = data
+    # folding replaces the array, the grid of the first fold stays as it is
+    grid = Grid(first_fold.get_dots())
     for fold in folds[1:]:
         grid.fold(fold)
-    print(grid.display())
+    return grid.display()
+
+
+def part_one(data: Tuple[np.ndarray, List[Fold]]) -> int:
+    return fold_first(data).number_of_dots_visible()
+
+
+def part_two(data: Tuple[np.ndarray, List[Fold]]) -> str:
+    return fold_the_rest(data, fold_first(data))
+
+
+stages.register(
+    __name__,
+    Stage("first_fold", fold_first, ("data",)),
+    Stage("part_one", Grid.number_of_dots_visible, ("first_fold",)),
+    Stage("part_two", fold_the_rest, ("data", "first_fold")),
+)
+
+
+def main():
+    data = parse(INPUT)
+    print(f"count = {part_one(data)}")
+    print(part_two(data))
 
 
-main()
+if __name__ == "__main__":
+    main()
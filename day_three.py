@@ -1,44 +1,50 @@
 from collections import Counter
-from typing import List, Optional, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from streams import Stream, iter_text
 
 
 BitPositionCount = Counter()
 
 
-def get_oxygen_data(
-    bit: Counter, oxygen_generator_data: List[str], index: int
-) -> List[str]:
+class RatingNotFound(Exception):
+    pass
+
+
+CANDIDATE_LIMIT = 1 << 16
+
+
+def get_oxygen_bit(bit: Counter) -> str:
     most_common = bit.most_common()[0]  # type: Tuple[str, int]
     least_common = bit.most_common()[-1]  # type: Tuple[str, int]
     same_count = most_common[1] == least_common[1]
-    oxygen_bit = "1" if same_count else most_common[0]  # type: str
-    return [d for d in oxygen_generator_data if d[index] == oxygen_bit]
+    return "1" if same_count else most_common[0]
 
 
-def get_co2_data(bit: Counter, co2_scrubber_data: List[str], index: int) -> List[str]:
+def get_co2_bit(bit: Counter) -> str:
     most_common = bit.most_common()[0]  # type: Tuple[str, int]
     least_common = bit.most_common()[-1]  # type: Tuple[str, int]
     same_count = most_common[1] == least_common[1]
-    co2_bit = "0" if same_count else least_common[0]  # type: str
+    return "0" if same_count else least_common[0]
+
+
+def get_oxygen_data(
+    bit: Counter, oxygen_generator_data: List[str], index: int
+) -> List[str]:
+    oxygen_bit = get_oxygen_bit(bit)
+    return [d for d in oxygen_generator_data if d[index] == oxygen_bit]
+
+
+def get_co2_data(bit: Counter, co2_scrubber_data: List[str], index: int) -> List[str]:
+    co2_bit = get_co2_bit(bit)
     return [d for d in co2_scrubber_data if d[index] == co2_bit]
 
 
-def populate_counter(data: List[str]) -> List[Counter]:
-    counter = [
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-        Counter(),
-    ]  # type: List[Counter]
+def populate_counter(data: Iterable[str]) -> List[Counter]:
+    counter = []  # type: List[Counter]
     for line in data:
+        if not counter:
+            counter = [Counter() for _ in range(len(line))]
         for i, bit in enumerate(line):
             counter[i][bit] += 1
     return counter
@@ -51,50 +57,96 @@ def get_counter_for_index(data: List[str], index: int) -> Counter:
     return counter
 
 
-def main():
-    all_data = []  # type: List[str]
-    with open("data/diagnostics.txt") as f:
-        for line in f:
-            all_data.append(line.strip())
-
-    # part 1
-    # counter = populate_counter(all_data)
-    # gamma = ''.join([bit.most_common()[0][0] for bit in counter])
-    # epsilon = ''.join([bit.most_common()[-1][0] for bit in counter])
-    # print(f'gamma = {gamma}, epsilon = {epsilon}, power consumption = {int(gamma, 2) * int(epsilon, 2)}')
-
-    # part 2
-
-    oxygen_generator_data = co2_scrubber_data = all_data
-    oxygen_filtered = co2_filtered = False
-    for i in range(len(all_data[0])):
-        if not oxygen_filtered:
-            oxygen_generator_data = get_oxygen_data(
-                get_counter_for_index(oxygen_generator_data, i),
-                oxygen_generator_data,
-                i,
+def get_rating(
+    all_data: Iterable[str],
+    get_bit: Callable[[Counter], str],
+    filter_data: Callable[[Counter, List[str], int], List[str]],
+    limit: int = CANDIDATE_LIMIT,
+) -> str:
+    """filter the data on one bit position after the other until one is left
+
+    The data is streamed again for every position, counting only the lines
+    that match the bits chosen so far, until at most `limit` lines match.
+    Those are kept in memory and filtered the usual way.
+    """
+    prefix = ""
+    candidates = None  # type: Optional[List[str]]
+    while candidates is None:
+        counter = Counter()
+        kept = []  # type: Optional[List[str]]
+        for line in all_data:
+            if not line.startswith(prefix):
+                continue
+            if len(line) > len(prefix):
+                counter[line[len(prefix)]] += 1
+            if kept is not None:
+                kept.append(line)
+                if len(kept) > limit:
+                    kept = None
+        if kept is not None:
+            candidates = kept
+        elif not counter:
+            raise RatingNotFound(
+                f"more than {limit} lines (the candidate limit) match every bit "
+                f"up to position {len(prefix)}"
             )
-
-        if not co2_filtered:
-            co2_scrubber_data = get_co2_data(
-                get_counter_for_index(co2_scrubber_data, i), co2_scrubber_data, i
+        else:
+            prefix += get_bit(counter)
+
+    index = len(prefix)
+    while len(candidates) > 1:
+        if index == len(candidates[0]):
+            raise RatingNotFound(
+                f"{len(candidates)} lines are still left past the last bit "
+                f"position, {index - 1}"
             )
+        candidates = filter_data(
+            get_counter_for_index(candidates, index), candidates, index
+        )
+        index += 1
+    if not candidates:
+        raise RatingNotFound(f"no line is left at bit position {index}")
+    return candidates[0]
+
+
+INPUT = "data/diagnostics.txt"
+
 
-        oxygen_filtered = len(oxygen_generator_data) == 1
-        co2_filtered = len(co2_scrubber_data) == 1
+def parse(path: str) -> Stream[str]:
+    return Stream(path, iter_text)
 
-        if oxygen_filtered and co2_filtered:
-            break
 
-    if not (oxygen_filtered and co2_filtered):
-        raise RuntimeError
+def part_one(all_data: Iterable[str]) -> int:
+    counter = populate_counter(all_data)
+    gamma = "".join([bit.most_common()[0][0] for bit in counter])
+    epsilon = "".join([bit.most_common()[-1][0] for bit in counter])
+    return int(gamma, 2) * int(epsilon, 2)
+
+
+def get_ratings(all_data: Iterable[str]) -> Tuple[str, str]:
+    return (
+        get_rating(all_data, get_oxygen_bit, get_oxygen_data),
+        get_rating(all_data, get_co2_bit, get_co2_data),
+    )
+
+
+def part_two(all_data: Iterable[str]) -> int:
+    oxygen_generator_rating, co2_scrubber_rating = get_ratings(all_data)
+    return int(oxygen_generator_rating, 2) * int(co2_scrubber_rating, 2)
+
+
+def main():
+    all_data = parse(INPUT)
+    print(f"power consumption = {part_one(all_data)}")
 
+    oxygen_generator_rating, co2_scrubber_rating = get_ratings(all_data)
     print(
         f"""
-            oxygen generator rating = {oxygen_generator_data}
-            co2 scrubber rating = {co2_scrubber_data}
-            life support rating = {int(oxygen_generator_data[0], 2) * int(co2_scrubber_data[0], 2)}"""
+            oxygen generator rating = {oxygen_generator_rating}
+            co2 scrubber rating = {co2_scrubber_rating}
+            life support rating = {part_two(all_data)}"""
     )
 
 
-main()
+if __name__ == "__main__":
+    main()
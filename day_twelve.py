@@ -1,5 +1,9 @@
 from collections import defaultdict
-from typing import Dict, List, NamedTuple, Set, Tuple
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from memo import Memo, memoize
+from stages import Stage
+import stages
 
 
 class CaveNotFound(Exception):
@@ -33,13 +37,48 @@ class Graph(object):
         self._edges[cave_a].add(cave_b)
         self._edges[cave_b].add(cave_a)
 
-    def get_paths(self) -> List[List[Cave]]:
+    def get_paths(self, part_two: bool = True) -> List[List[Cave]]:
         return self.explore_cave(
             cave=START,
             path=[],
             all_paths=[],
+            clause=self._part_two_clause if part_two else self._part_one_clause,
         )
 
+    def count_paths(
+        self, part_two: bool = True, memo: Optional[Memo] = None
+    ) -> int:
+        """the number of paths `get_paths` finds, without listing them
+
+        Paths that reach a cave having visited the same small caves (and
+        having or not visited one twice yet) continue the same way, so each
+        of those states is only explored once.
+        """
+
+        @memoize(memo or Memo())
+        def count_from(
+            cave: Cave, visited: FrozenSet[Cave], visited_twice: bool
+        ) -> int:
+            if cave == END:
+                return 1
+            count = 0
+            for next_cave in self._edges[cave]:
+                if next_cave == START:
+                    continue
+                if not next_cave.is_small:
+                    count += count_from(next_cave, visited, visited_twice)
+                elif next_cave not in visited:
+                    count += count_from(
+                        next_cave, visited | {next_cave}, visited_twice
+                    )
+                elif part_two and not visited_twice:
+                    count += count_from(next_cave, visited, True)
+            return count
+
+        count = count_from(START, frozenset([START]), False)
+        count_from.memo.report("day_twelve")
+        return count
+
     def _part_two_clause(self, cave: Cave, path: List[Cave]) -> bool:
         can_not_pass = False
         if cave == START and len(path) > 0:
@@ -60,30 +99,59 @@ class Graph(object):
         cave: Cave,
         path: List[Cave],
         all_paths: List[List[Cave]],
+        clause: Callable[[Cave, List[Cave]], bool],
     ) -> List[List[Cave]]:
         path = path + [cave]
         if cave == END:
             return all_paths + [path]
         else:
             for next_cave in self._edges[cave]:
-                if self._part_two_clause(next_cave, path):
+                if clause(next_cave, path):
                     continue
-                all_paths = self.explore_cave(next_cave, path, all_paths)
+                all_paths = self.explore_cave(next_cave, path, all_paths, clause)
             return all_paths
 
 
-def main():
+INPUT = "data/network_test.txt"
+
+
+def parse(path: str) -> List[Tuple[str, str]]:
+    with open(path) as f:
+        return [tuple(sorted(line.strip().split("-"))) for line in f]
+
+
+def get_graph(edges: List[Tuple[str, str]]) -> Graph:
     g = Graph()
-    with open("data/network_test.txt") as f:
-        for line in f:
-            caves = [
-                Cave(name=name, is_small=name.islower())
-                for name in sorted(line.strip().split("-"))
-            ]  # type: List[Cave]
-            g.add_caves_from(caves)
-            g.add_edge(caves[0], caves[1])
-    paths = sorted([",".join([c.name for c in path]) for path in g.get_paths()])
-    print(f"total paths = {len(paths)}")
-
-
-main()
+    for edge in edges:
+        caves = [
+            Cave(name=name, is_small=name.islower()) for name in edge
+        ]  # type: List[Cave]
+        g.add_caves_from(caves)
+        g.add_edge(caves[0], caves[1])
+    return g
+
+
+def part_one(edges: List[Tuple[str, str]]) -> int:
+    return get_graph(edges).count_paths(part_two=False)
+
+
+def part_two(edges: List[Tuple[str, str]]) -> int:
+    return get_graph(edges).count_paths()
+
+
+stages.register(
+    __name__,
+    Stage("graph", get_graph, ("data",)),
+    Stage("part_one", lambda g: g.count_paths(part_two=False), ("graph",)),
+    Stage("part_two", lambda g: g.count_paths(), ("graph",)),
+)
+
+
+def main():
+    edges = parse(INPUT)
+    print(f"total paths = {part_one(edges)}")
+    print(f"total paths = {part_two(edges)}")
+
+
+if __name__ == "__main__":
+    main()
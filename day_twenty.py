@@ -1,6 +1,21 @@
 from __future__ import annotations
-from collections.abc import Iterator
-from typing import NamedTuple
+from argparse import ArgumentParser
+from typing import NamedTuple, Optional
+
+import functools
+
+import numpy as np
+
+from checkpoint import (
+    DISABLED,
+    Checkpoint,
+    add_checkpoint_arguments,
+    checkpoint_from_args,
+)
+from parallel import Chunk, SharedPool
+from stages import Stage
+import grids
+import stages
 
 
 class Pixel(NamedTuple):
@@ -9,149 +24,213 @@ class Pixel(NamedTuple):
     bit: int
 
 
-class PixelOutOfBounds(Exception):
-    pass
-
+class Image(object):
+    """pixels of an infinite image, everything outside `pixels` is `default`"""
 
-class Image(Iterator):
-    def __init__(self, default: int = 0):
-        self._grid = []  # type: list[list[Pixel]]
-        self._curr_pixel = None
+    def __init__(self, pixels: Optional[np.ndarray] = None, default: int = 0):
+        if pixels is None:
+            pixels = np.zeros((0, 0), dtype=np.uint8)
+        self._grid = pixels
         self.default = default
 
     def add_pixels(self, row: list[int]) -> Image:
-        row_i = len(self._grid)
-        self._grid.append(
-            [Pixel(row=row_i, column=i, bit=bit) for i, bit in enumerate(row)]
-        )
+        row = np.array([row], dtype=np.uint8)
+        self._grid = np.concatenate([self._grid.reshape(-1, row.shape[1]), row])
         return self
 
-    def set_pixels(self, pixels: list[Pixel]) -> Image:
-        normalize_factor = abs(min([p.row for p in pixels]))
-        for pixel in pixels:
-            row_i = pixel.row + normalize_factor
-            column_i = pixel.column + normalize_factor
-            new_pixel = Pixel(row=row_i, column=column_i, bit=pixel.bit)
-            if len(self._grid) == row_i:
-                self._grid.append([])
-            elif len(self._grid) < row_i:
-                raise PixelOutOfBounds
-            row = self._grid[row_i]
-            if len(row) == column_i:
-                row.append(new_pixel)
-            elif len(row) < column_i:
-                raise PixelOutOfBounds
-            else:
-                row[column_i] = new_pixel
-        return self
-
-    def __iter__(self) -> Iterator:
-        return self
+    def display(self) -> str:
+        return grids.display(self._grid, ".#")
 
-    def __next__(self) -> Pixel:
-        if len(self._grid) == 0:
-            raise StopIteration
-        if self._curr_pixel is None:
-            self._curr_pixel = self._get_pixel(-1, -1)
-        if self._curr_pixel.row == (len(self._grid) + 1):
-            self._curr_pixel = None
-            raise StopIteration
-        if self._curr_pixel.column == (len(self._grid[0])):
-            column_i = -1
-            row_i = self._curr_pixel.row + 1
-        else:
-            column_i = self._curr_pixel.column + 1
-            row_i = self._curr_pixel.row
-        curr_pixel = self._curr_pixel
-        self._curr_pixel = self._get_pixel(row_i, column_i)
-        return curr_pixel
-
-    def get_surrounding_pixels(self, pixel: Pixel) -> list[Pixel]:
+    def get_pixels_lit_up(self) -> list[Pixel]:
         return [
-            # top left
-            self._get_pixel(pixel.row - 1, pixel.column - 1),
-            # top
-            self._get_pixel(pixel.row - 1, pixel.column),
-            # top right
-            self._get_pixel(pixel.row - 1, pixel.column + 1),
-            # left
-            self._get_pixel(pixel.row, pixel.column - 1),
-            # current
-            pixel,
-            # right
-            self._get_pixel(pixel.row, pixel.column + 1),
-            # bottom left
-            self._get_pixel(pixel.row + 1, pixel.column - 1),
-            # bottom
-            self._get_pixel(pixel.row + 1, pixel.column),
-            # bottom right
-            self._get_pixel(pixel.row + 1, pixel.column + 1),
+            Pixel(row=int(row), column=int(column), bit=1)
+            for row, column in zip(*np.nonzero(self._grid))
         ]
 
-    def _get_pixel(self, row_i: int, column_i: int) -> Pixel:
-        if row_i < 0 or column_i < 0:
-            pixel = Pixel(row=row_i, column=column_i, bit=self.default)
-        else:
-            try:
-                pixel = self._grid[row_i][column_i]
-            except IndexError:
-                pixel = Pixel(row=row_i, column=column_i, bit=self.default)
-        return pixel
+    def count_pixels_lit_up(self) -> int:
+        return int(self._grid.sum())
 
-    def display(self) -> str:
-        display = ""
-        for row in self._grid:
-            for pixel in row:
-                display += "." if pixel.bit == 0 else "#"
-            display += "\n"
-        return display
+    def get_pixels(self) -> np.ndarray:
+        return self._grid
 
-    def get_pixels_lit_up(self) -> list[Pixel]:
-        pixels = []
-        for row in self._grid:
-            pixels.extend([p for p in row if p.bit])
-        return pixels
+
+@functools.lru_cache(maxsize=64)
+def get_algorithm_bits(algorithm: str) -> np.ndarray:
+    """every enhancement step looks the same algorithm up, so do it once"""
+    bits = np.array([0 if c == "." else 1 for c in algorithm], dtype=np.uint8)
+    # the cached array is shared between callers
+    bits.flags.writeable = False
+    return bits
+
+
+def get_next_default(default: int, algorithm: str) -> int:
+    if default == 0 and algorithm[0] == "#":
+        return 1
+    elif default == 1 and algorithm[-1] == ".":
+        return 0
+    return 0
 
 
 def process_image(input_image: Image, algorithm: str) -> Image:
-    pixels = []  # type: list[Pixel]
-    for pixel in input_image:
-        surrounding_pixels = input_image.get_surrounding_pixels(pixel)
-        bit_str = "".join([str(p.bit) for p in surrounding_pixels])
-        index = int(bit_str, 2)
-        new_pixel = Pixel(
-            row=pixel.row, column=pixel.column, bit=0 if algorithm[index] == "." else 1
-        )
-        pixels.append(new_pixel)
-    default = 0
-    if input_image.default == 0 and algorithm[0] == "#" :
-        default = 1
-    elif input_image.default == 1 and algorithm[-1] == "." :
-        default = 0
-    return Image(default=default).set_pixels(pixels)
+    # the image grows by one pixel on every side, those pixels only see the
+    # infinite background past the edge
+    pixels = grids.pad(input_image.get_pixels(), 1, fill=input_image.default)
+    index = grids.window_index(pixels, fill=input_image.default)
+    return Image(
+        get_algorithm_bits(algorithm)[index],
+        default=get_next_default(input_image.default, algorithm),
+    )
+
+
+def _enhance_rows(
+    chunk: Chunk,
+    arrays: dict[str, np.ndarray],
+    source: str,
+    target: str,
+    default: int,
+    next_default: int,
+    margin: int,
+):
+    # the halo rows are the pixels above and below the chunk
+    pixels = arrays[source][chunk.halo_start : chunk.halo_stop]
+    index = grids.window_index(pixels, fill=default)
+    enhanced = arrays["bits"][index[chunk.core]]
+    # pixels the image has not grown to yet are the background, like the
+    # padding `process_image` adds
+    height, width = arrays[source].shape
+    rows = np.arange(chunk.start, chunk.stop)
+    enhanced[(rows < margin) | (rows >= height - margin)] = next_default
+    enhanced[:, :margin] = next_default
+    enhanced[:, width - margin :] = next_default
+    arrays[target][chunk.start : chunk.stop] = enhanced
+
+
+INPUT = "data/image_input_test.txt"
+
+
+def parse(path: str) -> tuple[str, np.ndarray]:
+    with open(path) as f:
+        algorithm = next(f).strip()
+        return algorithm, grids.parse_bits(f)
+
+
+def to_arrays(data: tuple[str, np.ndarray]) -> dict[str, np.ndarray]:
+    algorithm, pixels = data
+    return {
+        "algorithm": np.frombuffer(algorithm.encode(), dtype=np.uint8),
+        "pixels": pixels,
+    }
+
+
+def from_arrays(arrays: dict[str, np.ndarray]) -> tuple[str, np.ndarray]:
+    return arrays["algorithm"].tobytes().decode(), arrays["pixels"]
+
+
+def enhance(
+    data: tuple[str, np.ndarray],
+    times: int,
+    workers: int = 1,
+    checkpoint: Checkpoint = DISABLED,
+    default: int = 0,
+) -> int:
+    """enhance the image `times` times in bands of rows
+
+    The image is padded to its final size up front, with the pixels it has
+    not grown to yet kept as the background, so every step works on the same
+    two arrays in turn. `default` is the background of `pixels`.
+    """
+    algorithm, pixels = data
+    canvas = grids.pad(pixels, times, fill=default)
+    start = 0
+    snapshot = checkpoint.load()
+    if snapshot:
+        start, (canvas, default) = snapshot
+    # step `start` reads the image from "even" when `start` is even
+    arrays = {"bits": get_algorithm_bits(algorithm)}
+    arrays["even" if start % 2 == 0 else "odd"] = canvas
+    arrays["odd" if start % 2 == 0 else "even"] = np.empty_like(canvas)
+    target = "even" if start % 2 == 0 else "odd"
+    with SharedPool(arrays, workers) as pool:
+        for step in range(start, times):
+            source, target = ("even", "odd") if step % 2 == 0 else ("odd", "even")
+            next_default = get_next_default(default, algorithm)
+            pool.map(
+                _enhance_rows,
+                len(canvas),
+                source,
+                target,
+                default,
+                next_default,
+                times - step - 1,
+                halo=1,
+            )
+            default = next_default
+            checkpoint.tick(step + 1, lambda: (pool.arrays[target], default))
+        lit_up = int(pool.arrays[target].sum())
+    checkpoint.done()
+    return lit_up
+
+
+def part_one(data: tuple[str, np.ndarray], workers: int = 1) -> int:
+    return enhance(data, 2, workers)
+
+
+def part_two(data: tuple[str, np.ndarray], workers: int = 1) -> int:
+    return enhance(data, 50, workers)
+
+
+def get_first_steps(data: tuple[str, np.ndarray]) -> Image:
+    algorithm, pixels = data
+    return process_image(process_image(Image(pixels), algorithm), algorithm)
+
+
+def enhance_the_rest(data: tuple[str, np.ndarray], first_steps: Image) -> int:
+    algorithm, _ = data
+    return enhance(
+        (algorithm, first_steps.get_pixels()), 48, default=first_steps.default
+    )
+
+
+# part two carries on from the image after the 2 steps of part one
+stages.register(
+    __name__,
+    Stage("first_steps", get_first_steps, ("data",)),
+    Stage("part_one", Image.count_pixels_lit_up, ("first_steps",)),
+    Stage("part_two", enhance_the_rest, ("data", "first_steps")),
+)
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-F", "--file", default=INPUT)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        default=1,
+        help="enhance bands of the image in this many processes (0: one per core)",
+    )
+    add_checkpoint_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
-    input_image = Image()
-    with open("data/image_input_test.txt") as f:
-        algorithm = next(f).strip()
-        for line in f:
-            if line.strip():
-                input_image.add_pixels([0 if n == "." else 1 for n in line.strip()])
+    args = get_args()
+    algorithm, pixels = parse(args.file)
+    input_image = Image(pixels)
     print(input_image.display())
 
     output_image_1 = process_image(input_image, algorithm)
     print(output_image_1.display())
-    print(len(output_image_1.get_pixels_lit_up()))
+    print(output_image_1.count_pixels_lit_up())
 
     output_image_2 = process_image(output_image_1, algorithm)
     print(output_image_2.display())
-    print(len(output_image_2.get_pixels_lit_up()))
+    print(output_image_2.count_pixels_lit_up())
 
-    output_image = output_image_2
-    for i in range(48):
-        output_image = process_image(output_image, algorithm)
-    print(len(output_image.get_pixels_lit_up()))
+    checkpoint = checkpoint_from_args(args, "day_twenty", algorithm, pixels, 50)
+    print(enhance((algorithm, pixels), 50, args.workers, checkpoint))
 
 
-main()
+if __name__ == "__main__":
+    main()
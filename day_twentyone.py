@@ -2,6 +2,12 @@ from __future__ import annotations
 import random
 from typing import NamedTuple
 
+from memo import LRU, memoize
+
+
+# a game to 21 on a board of 10 has fewer states than this
+WINS_CACHE_SIZE = 1 << 16
+
 
 class Player(NamedTuple):
     id: int
@@ -149,13 +155,24 @@ class GameBoard(object):
         )
 
 
+def get_state(game: GameBoard, player: Player) -> tuple[int, int, int]:
+    # only the position on the board changes what happens next
+    return player.id, player.score, player.curr_position % game.board_length
+
+
+@memoize(
+    policy=LRU,
+    maxsize=WINS_CACHE_SIZE,
+    key=lambda game, player_one, player_two: (
+        game.board_length,
+        game.winning_threshold,
+        get_state(game, player_one),
+        get_state(game, player_two),
+    ),
+)
 def get_wins_dirac(
-    game: GameBoard,
-    player_one: Player,
-    player_two: Player,
-    cache: dict[tuple[Player, Player], tuple[int, int]] = None,
-):
-    cache = cache or {}
+    game: GameBoard, player_one: Player, player_two: Player
+) -> tuple[int, int]:
     player_one_wins = 0
     player_two_wins = 0
     player_one_outcomes = game.roll_dice_dirac(player_one)
@@ -167,48 +184,67 @@ def get_wins_dirac(
                 if p2.score >= game.winning_threshold:
                     player_two_wins += 1
                 else:
-                    if (p1, p2) in cache:
-                        result = cache[(p1, p2)]
-                    else:
-                        result = get_wins_dirac(
-                            game,
-                            p1,
-                            p2,
-                            cache,
-                        )
-                        cache[(p1, p2)] = result
+                    result = get_wins_dirac(game, p1, p2)
                     player_one_wins += result[0]
                     player_two_wins += result[1]
     return player_one_wins, player_two_wins
 
 
-def main():
-    with open("data/game.txt") as f:
+INPUT = "data/game.txt"
+
+
+def parse(path: str) -> tuple[int, int]:
+    with open(path) as f:
         player_one_curr_position = int(next(f).split(":")[1])
         player_two_curr_position = int(next(f).split(":")[1])
-    player_one = Player(1, 0, player_one_curr_position)
-    player_two = Player(2, 0, player_two_curr_position)
-
-    # game = GameBoard()
-    # dice = DeterminisiticDice(100)
-    # game_over = False
-    # while not game_over:
-    #    player_one = game.roll_dice(player_one, dice)
-    #    game_over = player_one.score >= game.winning_threshold
-    #    if not game_over:
-    #        player_two = game.roll_dice(player_two, dice)
-    #        game_over = player_two.score >= game.winning_threshold
-
-    # print(f"number of times rolled = {dice.number_of_times_rolled}")
-    # print(f"player one scored {player_one.score}")
-    # print(f"player two scored {player_two.score}")
-    # print(
-    #    f"product {dice.number_of_times_rolled * min(player_two.score, player_one.score)}"
-    # )
+    return player_one_curr_position, player_two_curr_position
+
+
+def play_deterministic(positions: tuple[int, int]) -> tuple[Player, Player, Dice]:
+    player_one = Player(1, 0, positions[0])
+    player_two = Player(2, 0, positions[1])
+    game = GameBoard()
+    dice = DeterminisiticDice(100)
+    game_over = False
+    while not game_over:
+        player_one = game.roll_dice(player_one, dice)
+        game_over = player_one.score >= game.winning_threshold
+        if not game_over:
+            player_two = game.roll_dice(player_two, dice)
+            game_over = player_two.score >= game.winning_threshold
+    return player_one, player_two, dice
+
+
+def part_one(positions: tuple[int, int]) -> int:
+    player_one, player_two, dice = play_deterministic(positions)
+    return dice.number_of_times_rolled * min(player_two.score, player_one.score)
+
+
+def play_dirac(positions: tuple[int, int]) -> tuple[int, int]:
+    player_one = Player(1, 0, positions[0])
+    player_two = Player(2, 0, positions[1])
     game = GameBoard(winning_threshold=21)
-    player_one_wins, player_two_wins = get_wins_dirac(game, player_one, player_two)
+    wins = get_wins_dirac(game, player_one, player_two)
+    get_wins_dirac.memo.report("day_twentyone")
+    return wins
+
+
+def part_two(positions: tuple[int, int]) -> int:
+    return max(play_dirac(positions))
+
+
+def main():
+    positions = parse(INPUT)
+    player_one, player_two, dice = play_deterministic(positions)
+    print(f"number of times rolled = {dice.number_of_times_rolled}")
+    print(f"player one scored {player_one.score}")
+    print(f"player two scored {player_two.score}")
+    print(f"product {part_one(positions)}")
+
+    player_one_wins, player_two_wins = play_dirac(positions)
     print(f"player one wins = {player_one_wins}")
     print(f"player two wins = {player_two_wins}")
 
 
-main()
+if __name__ == "__main__":
+    main()
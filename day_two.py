@@ -1,32 +1,57 @@
-## part 1
-#forward = 0
-#down = 0
-#for line in open('data/depth.txt'):
-#    command, value = line.split()
-#    if command == 'forward':
-#        forward += int(value)
-#    elif command == 'down':
-#        down += int(value)
-#    else:
-#        down -= int(value)
-#print(f'forward = {forward}')
-#print(f'down = {down}')
-#print(f'product = {forward * down}')
-#
-# part 2
-forward = 0
-depth = 0
-aim = 0
-for line in open('data/depth.txt'):
-    command, value = line.split()
-    if command == 'forward':
-        forward += int(value)
-        depth += (aim * int(value))
-    elif command == 'down':
-        aim += int(value)
-    elif command == 'up':
-        aim -= int(value)
-print(f'aim = {aim}')
-print(f'depth = {depth}')
-print(f'forward = {forward}')
-print(f'product = {forward * depth}')
+from typing import Iterable, Iterator, Tuple
+
+from streams import Stream, iter_lines
+
+
+INPUT = "data/depth.txt"
+
+# the same three strings for every line, rather than decoding each one
+COMMANDS = {command.encode(): command for command in ("forward", "down", "up")}
+
+
+def iter_commands(path: str) -> Iterator[Tuple[str, int]]:
+    for line in iter_lines(path):
+        command, value = line.split()
+        yield COMMANDS.get(command) or command.decode(), int(value)
+
+
+def parse(path: str) -> Stream[Tuple[str, int]]:
+    return Stream(path, iter_commands)
+
+
+def part_one(commands: Iterable[Tuple[str, int]]) -> int:
+    forward = 0
+    down = 0
+    for command, value in commands:
+        if command == "forward":
+            forward += value
+        elif command == "down":
+            down += value
+        else:
+            down -= value
+    return forward * down
+
+
+def part_two(commands: Iterable[Tuple[str, int]]) -> int:
+    forward = 0
+    depth = 0
+    aim = 0
+    for command, value in commands:
+        if command == "forward":
+            forward += value
+            depth += aim * value
+        elif command == "down":
+            aim += value
+        elif command == "up":
+            aim -= value
+    return forward * depth
+
+
+def main():
+    commands = parse(INPUT)
+    print(f"product = {part_one(commands)}")
+    print(f"product = {part_two(commands)}")
+
+
+if __name__ == "__main__":
+    main()
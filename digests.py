@@ -0,0 +1,58 @@
+"""Content hashes the caches key their entries by."""
+from types import ModuleType
+from typing import List, Set
+
+import ast
+import hashlib
+import os
+
+
+CHUNK_SIZE = 1 << 20
+# the modules of the repository, the ones a module's digest covers
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_local_imports(path: str) -> List[str]:
+    """the paths of the repository modules the source at `path` imports"""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()  # type: Set[str]
+    for node in ast.walk(tree):
+        # imports inside functions count too, the days defer some
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    paths = [os.path.join(ROOT, f"{name}.py") for name in sorted(names)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def get_sources(module: ModuleType) -> List[str]:
+    """the module's source and those of the repository modules it imports,
+    directly or not"""
+    seen = set()  # type: Set[str]
+    pending = [os.path.abspath(module.__file__)]
+    while pending:
+        path = pending.pop()
+        if path not in seen:
+            seen.add(path)
+            pending.extend(get_local_imports(path))
+    return sorted(seen)
+
+
+def module_digest(module: ModuleType) -> str:
+    """changes whenever the source of the module does, or the source of a
+    repository module it imports, such as `grids` or `tokenizer`"""
+    digest = hashlib.sha256()
+    for path in get_sources(module):
+        digest.update(os.path.relpath(path, ROOT).encode())
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
@@ -0,0 +1,109 @@
+"""Keep several implementations of a day's parts side by side.
+
+A day registers each implementation under a name, usually a plain
+`reference` one next to faster ones:
+
+    engines.register(__name__, "reference", part_one, part_two)
+    engines.register(__name__, "on_grid", part_one_on_grid, part_two_on_grid)
+
+Running with an engine name always uses that engine, which is how the fast
+engines get checked against the reference one. `auto` picks by input size:
+the engine with the largest `min_size` the input reaches, the one registered
+last on a tie. The thresholds `benchmark.py --calibrate` measured (kept in
+`.cache/engines.json`) replace the registered ones. Days that register
+nothing have a single `default` engine, their `part_one` and `part_two`,
+which runs whichever engine is asked for.
+"""
+from collections import defaultdict
+from types import ModuleType
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import json
+import os
+
+
+AUTO = "auto"
+DEFAULT = "default"
+CALIBRATION_PATH = ".cache/engines.json"
+
+
+class UnknownEngine(Exception):
+    pass
+
+
+class Engine(NamedTuple):
+    name: str
+    part_one: Callable[[Any], Any]
+    part_two: Callable[[Any], Any]
+    # smallest input, in bytes, `auto` uses this engine for, or None when
+    # the engine only runs when asked for by name
+    min_size: Optional[int]
+
+
+REGISTRY = defaultdict(dict)  # type: Dict[str, Dict[str, Engine]]
+
+
+def register(
+    module_name: str,
+    name: str,
+    part_one: Callable[[Any], Any],
+    part_two: Callable[[Any], Any],
+    min_size: Optional[int] = 0,
+):
+    REGISTRY[module_name][name] = Engine(name, part_one, part_two, min_size)
+
+
+def get_engines(module: ModuleType) -> Dict[str, Engine]:
+    if module.__name__ in REGISTRY:
+        return REGISTRY[module.__name__]
+    return {DEFAULT: Engine(DEFAULT, module.part_one, module.part_two, 0)}
+
+
+def load_calibration(path: str = CALIBRATION_PATH) -> Dict[str, Dict[str, int]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_calibration(
+    calibration: Dict[str, Dict[str, int]], path: str = CALIBRATION_PATH
+):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(calibration, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def select(
+    module: ModuleType,
+    name: str = AUTO,
+    input_size: int = 0,
+    calibration: Optional[Dict[str, Dict[str, int]]] = None,
+) -> Engine:
+    engines = get_engines(module)
+    if module.__name__ not in REGISTRY:
+        # a day with a single implementation runs it whatever the name
+        return engines[DEFAULT]
+    if name != AUTO:
+        if name not in engines:
+            raise UnknownEngine(f"{module.__name__} has no engine {name!r}")
+        return engines[name]
+    if calibration is None:
+        calibration = load_calibration()
+    thresholds = calibration.get(module.__name__, {})
+    candidates = [
+        (thresholds.get(engine.name, engine.min_size), i, engine)
+        for i, engine in enumerate(engines.values())
+    ]
+    candidates = [c for c in candidates if c[0] is not None]
+    if not candidates:
+        raise UnknownEngine(f"{module.__name__} has no engine for {AUTO!r}")
+    reached = [c for c in candidates if c[0] <= input_size]
+    if not reached:
+        # smaller than every threshold, use the engine for the smallest inputs
+        reached = [min(candidates, key=lambda c: c[0])]
+    # ties go to the engine registered last, the reference one comes first
+    _, _, engine = max(reached, key=lambda c: (c[0], c[1]))
+    return engine
@@ -0,0 +1,165 @@
+"""Run days (or single parts of days) concurrently on a process pool.
+
+Tasks are submitted longest expected first, using the wall time each task
+took on the previous run of the same input, so that the slowest days start
+right away and the short ones fill in the gaps. Tasks without a previous
+timing are assumed to be slow and go first.
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import json
+import os
+
+from runner import CACHED, PARTS, DayReport, run_day
+import engines
+
+
+TIMINGS_PATH = ".cache/timings.json"
+
+
+class Task(NamedTuple):
+    day: int
+    parts: Tuple[str, ...]
+    file: Optional[str]
+
+    @property
+    def key(self) -> str:
+        # the same day takes very different times on different inputs
+        return f"{self.day}:{'+'.join(self.parts)}:{self.file or ''}"
+
+
+def get_tasks(
+    days: Sequence[int],
+    file: Optional[str] = None,
+    parts: Sequence[str] = PARTS,
+    split_parts: bool = False,
+) -> List[Task]:
+    if split_parts:
+        return [Task(day, (part,), file) for day in days for part in parts]
+    return [Task(day, tuple(parts), file) for day in days]
+
+
+def load_expected_costs(path: str = TIMINGS_PATH) -> Dict[str, float]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_expected_costs(costs: Dict[str, float], path: str = TIMINGS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(costs, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def order_by_expected_cost(
+    tasks: List[Task], costs: Dict[str, float]
+) -> List[Task]:
+    return sorted(
+        tasks, key=lambda task: costs.get(task.key, float("inf")), reverse=True
+    )
+
+
+def get_stage_name(stage: str, report: DayReport, split: bool) -> str:
+    """the name of a stage of `report` among the stages of all its day's tasks
+
+    Every task of a split day runs its own parse (and shared stages), those
+    are named after the parts of their task, e.g. `parse[part_one]`.
+    """
+    if not split or stage in report.results:
+        return stage
+    return f"{stage}[{'+'.join(report.results)}]"
+
+
+def merge_reports(reports: List[DayReport]) -> List[DayReport]:
+    """combine the reports of the parts of a day into a single report"""
+    tasks = Counter(report.day for report in reports)
+    merged = {}  # type: Dict[int, DayReport]
+    for report in sorted(
+        reports, key=lambda r: (r.day, [PARTS.index(part) for part in r.results])
+    ):
+        split = tasks[report.day] > 1
+        if report.day not in merged:
+            merged[report.day] = DayReport(
+                report.day, report.file, report.engine, {}, [], [], {}
+            )
+        merged[report.day].results.update(report.results)
+        merged[report.day].timings.extend(
+            timing._replace(stage=get_stage_name(timing.stage, report, split))
+            for timing in report.timings
+        )
+        merged[report.day].profiles.extend(
+            profile._replace(stage=get_stage_name(profile.stage, report, split))
+            for profile in report.profiles
+        )
+        merged[report.day].metrics.update(
+            (get_stage_name(stage, report, split), stage_metrics)
+            for stage, stage_metrics in report.metrics.items()
+        )
+    return [merged[day] for day in sorted(merged)]
+
+
+def _run_task(
+    task: Task,
+    trace_memory: bool,
+    cache_parsed: bool,
+    profile_directory: Optional[str],
+    collect_metrics: bool,
+    engine: str,
+    cache_results: bool,
+) -> DayReport:
+    return run_day(
+        task.day,
+        file=task.file,
+        parts=task.parts,
+        trace_memory=trace_memory,
+        cache_parsed=cache_parsed,
+        profile_directory=profile_directory,
+        collect_metrics=collect_metrics,
+        engine=engine,
+        cache_results=cache_results,
+    )
+
+
+def run_parallel(
+    tasks: List[Task],
+    jobs: Optional[int] = None,
+    trace_memory: bool = True,
+    cache_parsed: bool = False,
+    profile_directory: Optional[str] = None,
+    collect_metrics: bool = False,
+    engine: str = engines.AUTO,
+    cache_results: bool = False,
+    timings_path: str = TIMINGS_PATH,
+) -> List[DayReport]:
+    costs = load_expected_costs(timings_path)
+    reports = []  # type: List[DayReport]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(
+                _run_task,
+                task,
+                trace_memory,
+                cache_parsed,
+                profile_directory,
+                collect_metrics,
+                engine,
+                cache_results,
+            ): task
+            for task in order_by_expected_cost(tasks, costs)
+        }
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            if [timing.stage for timing in report.timings] == [CACHED]:
+                # an answer from the result cache says nothing of the cost
+                continue
+            costs[futures[future].key] = sum(t.wall_time for t in report.timings)
+    if not profile_directory:
+        # profiled timings would skew the next ordering
+        save_expected_costs(costs, timings_path)
+    return merge_reports(reports)
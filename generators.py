@@ -0,0 +1,373 @@
+"""Seeded generators for synthetic inputs in every day's format.
+
+Each generator takes a `random.Random` and a `scale` and returns the text of
+an input file. `scale=1` is roughly the size of a real puzzle input and the
+natural size unit of the day (lines, cells, scanners, ...) grows linearly with
+`scale`, except where the solver is exponential in it (day 12) or the input
+has no size at all (day 21).
+
+    python generators.py -D 9 -S 100 --seed 7
+"""
+from argparse import ArgumentParser
+from typing import Callable, Dict, List
+
+import json
+import os
+import random
+
+from day_nineteen import TRANSFORMATION_FNS, Coords
+from runner import DAYS, get_module_name
+
+
+SCALES = (1, 10, 100, 1000)
+GENERATED_DIRECTORY = "data/generated"
+
+SEGMENTS = (
+    "abcefg",
+    "cf",
+    "acdeg",
+    "acdfg",
+    "bcdf",
+    "abdfg",
+    "abdefg",
+    "acf",
+    "abcdefg",
+    "abcdfg",
+)
+
+Generator = Callable[[random.Random, int], str]
+
+
+def _side(base: int, scale: int) -> int:
+    """side of a square grid whose number of cells grows with `scale`"""
+    return max(int(base * scale**0.5), 2)
+
+
+def _digit_grid(rng: random.Random, side: int, digits: str) -> str:
+    return "".join(
+        "".join(rng.choice(digits) for _ in range(side)) + "\n" for _ in range(side)
+    )
+
+
+def generate_depths(rng: random.Random, scale: int) -> str:
+    depth = rng.randint(100, 200)
+    lines = []  # type: List[str]
+    for _ in range(2000 * scale):
+        depth = max(depth + rng.randint(-5, 10), 0)
+        lines.append(f"{depth}\n")
+    return "".join(lines)
+
+
+def generate_commands(rng: random.Random, scale: int) -> str:
+    return "".join(
+        f"{rng.choice(('forward', 'down', 'up'))} {rng.randint(1, 9)}\n"
+        for _ in range(1000 * scale)
+    )
+
+
+def generate_diagnostics(rng: random.Random, scale: int) -> str:
+    lines = 1000 * scale
+    # values are unique so that both ratings filter down to a single value
+    width = max(12, (4 * lines).bit_length())
+    return "".join(
+        f"{value:0{width}b}\n" for value in rng.sample(range(2**width), lines)
+    )
+
+
+def generate_bingo(rng: random.Random, scale: int) -> str:
+    numbers = list(range(100))
+    rng.shuffle(numbers)
+    boards = []  # type: List[str]
+    for _ in range(100 * scale):
+        values = rng.sample(range(100), 25)
+        boards.append(
+            "".join(
+                " ".join(f"{value:2}" for value in values[row * 5 : (row + 1) * 5])
+                + "\n"
+                for row in range(5)
+            )
+        )
+    return ",".join(str(n) for n in numbers) + "\n\n" + "\n".join(boards)
+
+
+def generate_vents(rng: random.Random, scale: int) -> str:
+    lines = []  # type: List[str]
+    for _ in range(500 * scale):
+        x1, y1 = rng.randint(0, 989), rng.randint(0, 989)
+        dx, dy = rng.choice(((1, 0), (0, 1), (1, 1), (1, -1)))
+        longest = min(989 - x1, 989 - y1 if dy > 0 else y1 if dy < 0 else 989)
+        length = rng.randint(0, longest)
+        x2, y2 = x1 + dx * length, y1 + dy * length
+        if rng.random() < 0.5:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        lines.append(f"{x1},{y1} -> {x2},{y2}\n")
+    return "".join(lines)
+
+
+def generate_lanternfish(rng: random.Random, scale: int) -> str:
+    return ",".join(str(rng.randint(1, 5)) for _ in range(300 * scale)) + "\n"
+
+
+def generate_crabs(rng: random.Random, scale: int) -> str:
+    positions = [int(rng.expovariate(1 / 400)) % 2000 for _ in range(1000 * scale)]
+    return ",".join(str(p) for p in positions) + "\n"
+
+
+def generate_seven_segment(rng: random.Random, scale: int) -> str:
+    lines = []  # type: List[str]
+    for _ in range(200 * scale):
+        wiring = dict(zip("abcdefg", rng.sample("abcdefg", 7)))
+
+        def scramble(digit: int) -> str:
+            segments = [wiring[segment] for segment in SEGMENTS[digit]]
+            return "".join(rng.sample(segments, len(segments)))
+
+        patterns = [scramble(digit) for digit in rng.sample(range(10), 10)]
+        output = [scramble(rng.randint(0, 9)) for _ in range(4)]
+        lines.append(f"{' '.join(patterns)} | {' '.join(output)}\n")
+    return "".join(lines)
+
+
+def generate_height_map(rng: random.Random, scale: int) -> str:
+    # half of the cells are 9s so that basins stay bounded like real inputs
+    return _digit_grid(rng, _side(100, scale), "012345678999999999")
+
+
+def generate_syntax(rng: random.Random, scale: int) -> str:
+    pairs = ("()", "[]", "{}", "<>")
+    lines = []  # type: List[str]
+    for _ in range(100 * scale):
+        line = ""
+        stack = []  # type: List[str]
+        for _ in range(rng.randint(20, 110)):
+            if stack and rng.random() < 0.45:
+                line += stack.pop()
+            else:
+                opening, closing = rng.choice(pairs)
+                line += opening
+                stack.append(closing)
+        if not stack or rng.random() < 0.5:
+            # corrupt the line with a closing character that does not match
+            line += rng.choice([c for _, c in pairs if not stack or c != stack[-1]])
+        lines.append(line + "\n")
+    return "".join(lines)
+
+
+def generate_octopuses(rng: random.Random, scale: int) -> str:
+    return _digit_grid(rng, _side(10, scale), "0123456789")
+
+
+def generate_caves(rng: random.Random, scale: int) -> str:
+    # the number of paths grows exponentially with the number of small caves,
+    # so caves are added for every doubling of the scale
+    small = [f"c{i}" for i in range(4 + scale.bit_length())]
+    big = ["A", "B"]
+    edges = set()  # type: set
+    for cave in small + ["start", "end"]:
+        edges.add(tuple(sorted((cave, rng.choice(big)))))
+    for _ in range(len(small)):
+        edges.add(tuple(sorted(rng.sample(small, 2))))
+    return "".join(f"{a}-{b}\n" for a, b in sorted(edges))
+
+
+def generate_dots(rng: random.Random, scale: int) -> str:
+    # sizes of the form 2**n - 1 fold exactly in half every time
+    width = height = 2**11 - 1
+    dots = set()  # type: set
+    for _ in range(100 * scale):
+        dots.add((rng.randrange(width), rng.randrange(height)))
+    folds = []  # type: List[str]
+    while width > 31 or height > 7:
+        if width > 31:
+            width = (width - 1) // 2
+            folds.append(f"fold along x={width}\n")
+        if height > 7:
+            height = (height - 1) // 2
+            folds.append(f"fold along y={height}\n")
+    return "".join(f"{x},{y}\n" for x, y in sorted(dots)) + "\n" + "".join(folds)
+
+
+def generate_polymer(rng: random.Random, scale: int) -> str:
+    elements = "BCFHKNOPSV"
+    template = "".join(rng.choice(elements) for _ in range(20 * scale))
+    rules = "".join(
+        f"{a}{b} -> {rng.choice(elements)}\n" for a in elements for b in elements
+    )
+    return f"{template}\n\n{rules}"
+
+
+def generate_risk_levels(rng: random.Random, scale: int) -> str:
+    return _digit_grid(rng, _side(100, scale), "123456789")
+
+
+def _packet_bits(rng: random.Random, depth: int) -> str:
+    version = f"{rng.randint(0, 7):03b}"
+    if depth == 0 or rng.random() < 0.3:
+        value = f"{rng.randint(0, 2**20):b}"
+        value = value.zfill(-(-len(value) // 4) * 4)
+        groups = [value[i : i + 4] for i in range(0, len(value), 4)]
+        last = len(groups) - 1
+        return (
+            version
+            + "100"
+            + "".join(("1" if i < last else "0") + g for i, g in enumerate(groups))
+        )
+    type_id = rng.choice((0, 1, 2, 3, 5, 6, 7))
+    count = 2 if type_id >= 5 else rng.randint(1, 4)
+    sub_packets = "".join(_packet_bits(rng, depth - 1) for _ in range(count))
+    header = version + f"{type_id:03b}"
+    if rng.random() < 0.5:
+        return header + "0" + f"{len(sub_packets):015b}" + sub_packets
+    return header + "1" + f"{count:011b}" + sub_packets
+
+
+def generate_packets(rng: random.Random, scale: int) -> str:
+    lines = []  # type: List[str]
+    for _ in range(5 * scale):
+        bits = _packet_bits(rng, depth=4)
+        bits += "0" * (-len(bits) % 8)
+        lines.append(f"{int(bits, 2):0{len(bits) // 4}X}\n")
+    return "".join(lines)
+
+
+def generate_target(rng: random.Random, scale: int) -> str:
+    factor = scale**0.5
+    min_x = int(rng.randint(100, 160) * factor)
+    max_x = min_x + int(rng.randint(20, 50) * factor)
+    min_y = -int(rng.randint(100, 150) * factor)
+    max_y = min_y + int(rng.randint(20, 50) * factor)
+    return f"target area: x={min_x}..{max_x}, y={min_y}..{max_y}\n"
+
+
+def _random_snail_number(rng: random.Random, depth: int):
+    if depth == 4 or (depth > 1 and rng.random() < 0.3):
+        return rng.randint(0, 9)
+    return [_random_snail_number(rng, depth + 1), _random_snail_number(rng, depth + 1)]
+
+
+def generate_snail_numbers(rng: random.Random, scale: int) -> str:
+    return "".join(
+        json.dumps(_random_snail_number(rng, 1), separators=(",", ":")) + "\n"
+        for _ in range(10 * scale)
+    )
+
+
+def generate_beacons(rng: random.Random, scale: int) -> str:
+    # scanners form a chain where neighbours share at least 12 beacons
+    positions = [Coords(0, 0, 0)]
+    beacons = set()  # type: set
+    for _ in range(5 * scale - 1):
+        axis = rng.randrange(3)
+        offset = [rng.randint(-100, 100) for _ in range(3)]
+        offset[axis] = rng.choice((-1, 1)) * rng.randint(1000, 1200)
+        previous = positions[-1]
+        position = Coords(*(p + o for p, o in zip(previous, offset)))
+        for _ in range(12):
+            beacons.add(
+                Coords(
+                    *(
+                        rng.randint(max(p, q) - 1000, min(p, q) + 1000)
+                        for p, q in zip(previous, position)
+                    )
+                )
+            )
+        positions.append(position)
+    for position in positions:
+        for _ in range(13):
+            beacons.add(Coords(*(p + rng.randint(-1000, 1000) for p in position)))
+
+    reports = []  # type: List[str]
+    for i, position in enumerate(positions):
+        transformation_fn = rng.choice(TRANSFORMATION_FNS)
+        seen = [
+            transformation_fn(Coords(*(b - p for b, p in zip(beacon, position))))
+            for beacon in beacons
+            if all(abs(b - p) <= 1000 for b, p in zip(beacon, position))
+        ]
+        rng.shuffle(seen)
+        reports.append(
+            f"--- scanner {i} ---\n"
+            + "".join(f"{c.x},{c.y},{c.z}\n" for c in seen)
+        )
+    return "\n".join(reports)
+
+
+def generate_image(rng: random.Random, scale: int) -> str:
+    algorithm = "".join(rng.choice(".#") for _ in range(512))
+    return algorithm + "\n\n" + _digit_grid(rng, _side(10, scale), ".#")
+
+
+def generate_game(rng: random.Random, scale: int) -> str:
+    # the input is two starting positions, there is nothing to scale
+    return (
+        f"Player 1 starting position: {rng.randint(1, 10)}\n"
+        f"Player 2 starting position: {rng.randint(1, 10)}\n"
+    )
+
+
+GENERATORS = {
+    1: generate_depths,
+    2: generate_commands,
+    3: generate_diagnostics,
+    4: generate_bingo,
+    5: generate_vents,
+    6: generate_lanternfish,
+    7: generate_crabs,
+    8: generate_seven_segment,
+    9: generate_height_map,
+    10: generate_syntax,
+    11: generate_octopuses,
+    12: generate_caves,
+    13: generate_dots,
+    14: generate_polymer,
+    15: generate_risk_levels,
+    16: generate_packets,
+    17: generate_target,
+    18: generate_snail_numbers,
+    19: generate_beacons,
+    20: generate_image,
+    21: generate_game,
+}  # type: Dict[int, Generator]
+
+
+def generate(day: int, scale: int, seed: int = 0) -> str:
+    return GENERATORS[day](random.Random(f"{day}:{scale}:{seed}"), scale)
+
+
+def get_path(
+    day: int, scale: int, seed: int = 0, directory: str = GENERATED_DIRECTORY
+) -> str:
+    return os.path.join(directory, f"{get_module_name(day)}_x{scale}_s{seed}.txt")
+
+
+def write_input(
+    day: int, scale: int, seed: int = 0, directory: str = GENERATED_DIRECTORY
+) -> str:
+    """write a generated input unless it already exists and return its path"""
+    path = get_path(day, scale, seed, directory)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            f.write(generate(day, scale, seed))
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("-D", "--day", type=int, action="append", dest="days")
+    parser.add_argument("-S", "--scale", type=int, action="append", dest="scales")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", default=GENERATED_DIRECTORY)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    for day in args.days or range(1, len(DAYS) + 1):
+        for scale in args.scales or SCALES:
+            print(write_input(day, scale, args.seed, args.directory))
+
+
+if __name__ == "__main__":
+    main()
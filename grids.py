@@ -0,0 +1,139 @@
+"""2D grids backed by contiguous numpy arrays.
+
+The grid days keep their own classes but store cells in a single array and
+use these helpers instead of per-cell python loops. Neighbour access works on
+whole arrays: `shifted(array, di, dj, fill)` is the array as seen from the
+neighbour at offset (di, dj), so `array < shifted(array, -1, 0, fill=10)` is
+"lower than the cell above" for every cell at once.
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+Offset = Tuple[int, int]
+
+ORTHOGONAL = ((-1, 0), (1, 0), (0, -1), (0, 1))  # type: Tuple[Offset, ...]
+DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))  # type: Tuple[Offset, ...]
+SURROUNDING = ORTHOGONAL + DIAGONAL  # type: Tuple[Offset, ...]
+# row major order of a 3x3 window, the top left neighbour is the most
+# significant bit when a window is read as a binary number
+WINDOW = tuple(
+    (di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)
+)  # type: Tuple[Offset, ...]
+
+
+class InvalidGrid(Exception):
+    pass
+
+
+def _rows(lines: Iterable[str]) -> List[str]:
+    rows = [line.strip() for line in lines if line.strip()]
+    if len(set(len(row) for row in rows)) > 1:
+        raise InvalidGrid("rows have different lengths")
+    return rows
+
+
+def parse_digits(lines: Iterable[str]) -> np.ndarray:
+    """one uint8 cell per digit character"""
+    rows = _rows(lines)
+    if not rows:
+        return np.zeros((0, 0), dtype=np.uint8)
+    cells = np.frombuffer("".join(rows).encode(), dtype=np.uint8) - ord("0")
+    if (cells > 9).any():
+        raise InvalidGrid("grid contains non digit characters")
+    return cells.reshape(len(rows), len(rows[0]))
+
+
+def parse_bits(lines: Iterable[str], on: str = "#") -> np.ndarray:
+    """one uint8 cell per character, 1 where the character is `on`"""
+    rows = _rows(lines)
+    if not rows:
+        return np.zeros((0, 0), dtype=np.uint8)
+    cells = np.frombuffer("".join(rows).encode(), dtype=np.uint8) == ord(on)
+    return cells.astype(np.uint8).reshape(len(rows), len(rows[0]))
+
+
+def shifted(array: np.ndarray, di: int, dj: int, fill=0) -> np.ndarray:
+    """`out[i, j] == array[i + di, j + dj]`, or `fill` outside of the grid"""
+    out = np.full_like(array, fill)
+    height, width = array.shape
+    if abs(di) >= height or abs(dj) >= width:
+        return out
+    out[max(-di, 0) : height - max(di, 0), max(-dj, 0) : width - max(dj, 0)] = array[
+        max(di, 0) : height - max(-di, 0), max(dj, 0) : width - max(-dj, 0)
+    ]
+    return out
+
+
+def neighbours(
+    array: np.ndarray, offsets: Sequence[Offset] = ORTHOGONAL, fill=0
+) -> List[np.ndarray]:
+    return [shifted(array, di, dj, fill) for di, dj in offsets]
+
+
+def count_neighbours(
+    mask: np.ndarray, offsets: Sequence[Offset] = SURROUNDING
+) -> np.ndarray:
+    """number of neighbours of every cell for which `mask` is set"""
+    counts = np.zeros(mask.shape, dtype=np.uint8)
+    for neighbour in neighbours(mask.astype(np.uint8), offsets):
+        counts += neighbour
+    return counts
+
+
+def window_index(bits: np.ndarray, fill: int = 0) -> np.ndarray:
+    """read the 3x3 window around every cell as a 9 bit number"""
+    index = np.zeros(bits.shape, dtype=np.uint16)
+    for di, dj in WINDOW:
+        index = (index << 1) | shifted(bits, di, dj, fill)
+    return index
+
+
+def pad(array: np.ndarray, width: int, fill=0) -> np.ndarray:
+    return np.pad(array, width, mode="constant", constant_values=fill)
+
+
+def grow(array: np.ndarray, shape: Tuple[int, int], fill=0) -> np.ndarray:
+    """return `array` grown to at least `shape`, new cells set to `fill`"""
+    height = max(array.shape[0], shape[0])
+    width = max(array.shape[1], shape[1])
+    if (height, width) == array.shape:
+        return array
+    grown = np.full((height, width), fill, dtype=array.dtype)
+    grown[: array.shape[0], : array.shape[1]] = array
+    return grown
+
+
+def in_bounds(shape: Tuple[int, int], i: int, j: int) -> bool:
+    return 0 <= i < shape[0] and 0 <= j < shape[1]
+
+
+def label_regions(mask: np.ndarray) -> np.ndarray:
+    """label orthogonally connected regions of `mask`, -1 outside of them
+
+    Every cell starts with its own flat index as label, then repeatedly takes
+    the smallest label among its neighbours in the region and follows labels
+    to the label's own label, until nothing changes.
+    """
+    size = mask.size
+    flat_mask = mask.ravel()
+    labels = np.where(flat_mask, np.arange(size), size).reshape(mask.shape)
+    while True:
+        smallest = labels
+        for neighbour in neighbours(labels, ORTHOGONAL, fill=size):
+            smallest = np.minimum(smallest, neighbour)
+        smallest = np.where(mask, smallest, size)
+        flat = smallest.ravel()
+        inside = flat < size
+        flat[inside] = flat[flat[inside]]
+        if np.array_equal(smallest, labels):
+            break
+        labels = smallest
+    return np.where(mask, labels, -1)
+
+
+def display(array: np.ndarray, characters: Sequence[str]) -> str:
+    """render a grid of small integers using `characters[value]`"""
+    lookup = np.array(list(characters))
+    return "".join("".join(row) + "\n" for row in lookup[array.astype(np.intp)])
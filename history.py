@@ -0,0 +1,264 @@
+"""Keep every benchmark run in a SQLite database and flag slowdowns.
+
+`benchmark.py` records each run here: for every measurement the day, engine,
+input size, wall and cpu time and peak memory, next to the interpreter and
+the git commit the run was made on. The report compares the latest run with
+a baseline of the `--window` runs before it on the same interpreter, per
+(day, engine, input size). Timings are roughly log-normal, so the comparison
+is made on log times: a measurement is a regression when it is more than
+`--z` standard deviations slower than the baseline mean (a one sided z-test)
+and also at least `--min-ratio` times slower, so a very steady baseline does
+not flag a few percent of noise.
+
+    python benchmark.py -D 18 -D 19 -S 1 -S 10
+    python history.py
+    python history.py --window 20 --z 2.5
+"""
+from argparse import ArgumentParser
+from typing import Any, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+
+HISTORY_PATH = ".cache/history.sqlite"
+WINDOW = 10
+Z_SCORE = 3.0
+MIN_RATIO = 1.2
+# fewer measurements than this do not make a baseline
+MIN_BASELINE = 3
+# timings of a very steady baseline still vary by a couple percent between
+# runs, this keeps the standard deviation of log times from being 0
+MIN_LOG_STDEV = 0.02
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "id INTEGER PRIMARY KEY, created REAL, python TEXT, git_commit TEXT)",
+    "CREATE TABLE IF NOT EXISTS measurements ("
+    "run_id INTEGER REFERENCES runs(id), day INTEGER, engine TEXT, "
+    "scale INTEGER, input_bytes INTEGER, wall_time REAL, cpu_time REAL, "
+    "peak_memory INTEGER)",
+    "CREATE INDEX IF NOT EXISTS measurements_by_key "
+    "ON measurements (day, engine, input_bytes)",
+)
+
+
+class Comparison(NamedTuple):
+    day: int
+    engine: str
+    input_bytes: int
+    wall_time: float
+    # measurements in the baseline
+    baseline_size: int
+    # geometric mean of the baseline wall times
+    baseline_time: Optional[float]
+    ratio: Optional[float]
+    z_score: Optional[float]
+    regression: bool
+
+
+def connect(path: str = HISTORY_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+    return connection
+
+
+def get_python() -> str:
+    return f"{platform.python_implementation()} {platform.python_version()}"
+
+
+def get_git_commit() -> Optional[str]:
+    """the commit checked out, marked `-dirty` when there are local changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if status.strip() else commit
+
+
+def record(measurements: Iterable[Any], path: str = HISTORY_PATH) -> int:
+    """store the `benchmark.Measurement`s of one run, failed ones are skipped"""
+    connection = connect(path)
+    try:
+        with connection:
+            run_id = connection.execute(
+                "INSERT INTO runs (created, python, git_commit) VALUES (?, ?, ?)",
+                (time.time(), get_python(), get_git_commit()),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        m.day,
+                        m.engine,
+                        m.scale,
+                        m.input_bytes,
+                        m.wall_time,
+                        m.cpu_time,
+                        m.peak_memory,
+                    )
+                    for m in measurements
+                    if not m.error
+                ],
+            )
+    finally:
+        connection.close()
+    return run_id
+
+
+def compare(
+    wall_time: float,
+    baseline: List[float],
+    z: float = Z_SCORE,
+    min_ratio: float = MIN_RATIO,
+) -> Tuple[Optional[float], Optional[float], Optional[float], bool]:
+    """baseline time, ratio, z-score and whether `wall_time` is a regression"""
+    if len(baseline) < MIN_BASELINE:
+        return None, None, None, False
+    logs = [math.log(previous) for previous in baseline]
+    mean = statistics.mean(logs)
+    stdev = max(statistics.stdev(logs), MIN_LOG_STDEV)
+    z_score = (math.log(wall_time) - mean) / stdev
+    ratio = wall_time / math.exp(mean)
+    return math.exp(mean), ratio, z_score, z_score > z and ratio >= min_ratio
+
+
+def get_report(
+    path: str = HISTORY_PATH,
+    window: int = WINDOW,
+    z: float = Z_SCORE,
+    min_ratio: float = MIN_RATIO,
+    run_id: Optional[int] = None,
+) -> Tuple[Optional[int], List[Comparison]]:
+    """compare a run (the latest by default) with the runs before it"""
+    connection = connect(path)
+    try:
+        if run_id is None:
+            (run_id,) = connection.execute("SELECT MAX(id) FROM runs").fetchone()
+        if run_id is None:
+            return None, []
+        (python,) = connection.execute(
+            "SELECT python FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        latest = connection.execute(
+            "SELECT day, engine, input_bytes, wall_time FROM measurements "
+            "WHERE run_id = ? ORDER BY day, engine, input_bytes",
+            (run_id,),
+        ).fetchall()
+        comparisons = []  # type: List[Comparison]
+        for day, engine, input_bytes, wall_time in latest:
+            rows = connection.execute(
+                "SELECT m.run_id, m.wall_time FROM measurements m "
+                "JOIN runs r ON r.id = m.run_id "
+                "WHERE m.day = ? AND m.engine = ? AND m.input_bytes = ? "
+                "AND r.python = ? AND m.run_id < ? ORDER BY m.run_id DESC",
+                (day, engine, input_bytes, python, run_id),
+            )
+            # a run may measure the same input more than once, every
+            # measurement of the last `window` runs counts
+            runs = set()  # type: Set[int]
+            baseline = []  # type: List[float]
+            for previous_run, previous_time in rows:
+                runs.add(previous_run)
+                if len(runs) > window:
+                    break
+                baseline.append(previous_time)
+            comparisons.append(
+                Comparison(
+                    day,
+                    engine,
+                    input_bytes,
+                    wall_time,
+                    len(baseline),
+                    *compare(wall_time, baseline, z, min_ratio),
+                )
+            )
+    finally:
+        connection.close()
+    return run_id, comparisons
+
+
+def to_table(comparisons: List[Comparison]) -> str:
+    table = (
+        f"{'day':>4} {'engine':<12} {'input (KiB)':>12} {'wall (s)':>10} "
+        f"{'baseline (s)':>13} {'n':>5} {'ratio':>6} {'z':>6}\n"
+    )
+    for c in comparisons:
+        baseline = ratio = z_score = ""
+        if c.baseline_time is not None:
+            baseline = f"{c.baseline_time:.4f}"
+            ratio = f"{c.ratio:.2f}"
+            z_score = f"{c.z_score:.1f}"
+        flag = " REGRESSION" if c.regression else ""
+        table += (
+            f"{c.day:>4} {c.engine:<12} {c.input_bytes / 1024:>12.1f} "
+            f"{c.wall_time:>10.4f} {baseline:>13} {c.baseline_size:>5} "
+            f"{ratio:>6} {z_score:>6}{flag}\n"
+        )
+    return table
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument(
+        "--run", type=int, help="the run to compare (default: the latest)"
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=WINDOW,
+        help="compare with up to this many previous runs",
+    )
+    parser.add_argument(
+        "--z",
+        type=float,
+        default=Z_SCORE,
+        help="standard deviations of log time a regression is slower by",
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        default=MIN_RATIO,
+        help="and how many times slower than the baseline it is at least",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    run_id, comparisons = get_report(
+        args.history, args.window, args.z, args.min_ratio, args.run
+    )
+    if run_id is None:
+        print(f"no runs in {args.history}, run benchmark.py first", file=sys.stderr)
+        sys.exit(1)
+    print(f"run {run_id}")
+    print(to_table(comparisons))
+    regressions = [c for c in comparisons if c.regression]
+    if regressions:
+        days = sorted({c.day for c in regressions})
+        print(f"slower on days {', '.join(map(str, days))}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
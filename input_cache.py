@@ -0,0 +1,72 @@
+"""Cache parsed inputs as .npy arrays keyed by the content of the input.
+
+A day opts in by defining `to_arrays(data) -> Dict[str, np.ndarray]` and
+`from_arrays(arrays) -> data`. The first run parses the text input and saves
+one .npy file per array under `.cache/parsed/<day>-<hash>/`, later runs
+memory-map those files instead of parsing. The hash covers both the input file
+and the source of the day module, so changing either parses again.
+"""
+from types import ModuleType
+from typing import Any, Dict
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from digests import file_digest, module_digest
+
+
+CACHE_DIRECTORY = ".cache/parsed"
+
+
+def is_cacheable(module: ModuleType) -> bool:
+    return hasattr(module, "to_arrays") and hasattr(module, "from_arrays")
+
+
+def get_cache_path(
+    module: ModuleType, path: str, directory: str = CACHE_DIRECTORY
+) -> str:
+    digest = hashlib.sha256(module_digest(module).encode())
+    digest.update(file_digest(path).encode())
+    return os.path.join(directory, f"{module.__name__}-{digest.hexdigest()[:32]}")
+
+
+def load_arrays(cache_path: str) -> Dict[str, np.ndarray]:
+    return {
+        name[: -len(".npy")]: np.load(os.path.join(cache_path, name), mmap_mode="r")
+        for name in os.listdir(cache_path)
+        if name.endswith(".npy")
+    }
+
+
+def save_arrays(cache_path: str, arrays: Dict[str, np.ndarray]):
+    """write every array, then move the whole directory into place"""
+    parent = os.path.dirname(cache_path)
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=parent)
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            np.save(os.path.join(temporary, f"{name}.npy"), array)
+        os.replace(temporary, cache_path)
+    except OSError:
+        # another process cached the same input first
+        shutil.rmtree(temporary, ignore_errors=True)
+        if not os.path.isdir(cache_path):
+            raise
+
+
+def load_parsed(
+    module: ModuleType, path: str, directory: str = CACHE_DIRECTORY
+) -> Any:
+    if not is_cacheable(module):
+        return module.parse(path)
+    cache_path = get_cache_path(module, path, directory)
+    if os.path.isdir(cache_path):
+        return module.from_arrays(load_arrays(cache_path))
+    data = module.parse(path)
+    save_arrays(cache_path, module.to_arrays(data))
+    return data
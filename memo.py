@@ -0,0 +1,177 @@
+"""Memoize recursive solvers with bounded memory and visible hit rates.
+
+A `Memo` maps keys to computed values and evicts by one of three policies:
+
+- `lru`: keep at most `maxsize` entries, dropping the least recently used
+- `size`: keep at most `max_bytes` (as measured by `sizeof`), least recently
+  used first
+- `none`: never evict
+
+Hits, misses and evictions are counted locally, `report` adds the counts
+since the previous report to `metrics` once, so the lookups themselves stay
+cheap. A memo given a `path` starts from the entries saved there and `save`
+writes them back, keys and values must then pickle.
+
+    @memoize(maxsize=1 << 16, key=lambda game, p1, p2: (p1, p2))
+    def get_wins(game, p1, p2): ...
+
+    get_wins.memo.stats()
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+import functools
+import os
+import pickle
+import sys
+
+import metrics
+
+
+LRU = "lru"
+SIZE = "size"
+NONE = "none"
+POLICIES = (LRU, SIZE, NONE)
+MAXSIZE = 1 << 16
+MAX_BYTES = 64 << 20
+
+# stands for a key that is not memoized, None is a valid value
+MISSING = object()
+
+
+class UnknownPolicy(Exception):
+    pass
+
+
+class MemoStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    bytes: Optional[int]
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+class Memo(object):
+    def __init__(
+        self,
+        policy: str = LRU,
+        maxsize: int = MAXSIZE,
+        max_bytes: int = MAX_BYTES,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+        path: Optional[str] = None,
+    ):
+        if policy not in POLICIES:
+            raise UnknownPolicy(f"{policy!r} is not one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.path = path
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, Any]
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._reported = (0, 0, 0)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                for key, value in pickle.load(f):
+                    self.put(key, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any:
+        """the value of `key`, or `MISSING`"""
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.policy != NONE:
+                self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.policy == SIZE:
+            if key in self._entries:
+                self._bytes -= self.sizeof(self._entries[key])
+            self._bytes += self.sizeof(value)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.policy == LRU:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        elif self.policy == SIZE:
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self.sizeof(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> MemoStats:
+        return MemoStats(
+            self.hits,
+            self.misses,
+            self.evictions,
+            len(self._entries),
+            self._bytes if self.policy == SIZE else None,
+        )
+
+    def report(self, prefix: str):
+        """add the counts since the last report to `metrics`"""
+        counts = (self.hits, self.misses, self.evictions)
+        for name, count, reported in zip(
+            ("cache_hits", "cache_misses", "cache_evictions"), counts, self._reported
+        ):
+            if count > reported:
+                metrics.increment(f"{prefix}.{name}", count - reported)
+        self._reported = counts
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(list(self._entries.items()), f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def memoize(
+    memo: Optional[Memo] = None,
+    key: Optional[Callable[..., Hashable]] = None,
+    **options: Any,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """memoize a function of hashable positional arguments into `memo`
+
+    `key` maps the arguments to the key, for arguments that do not hash or
+    that do not change the result. The other options create the memo when
+    none is given, it is available as the `memo` of the memoized function.
+    """
+    if memo is None:
+        memo = Memo(**options)
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def memoized(*args):
+            k = key(*args) if key else args
+            value = memo.get(k)
+            if value is MISSING:
+                value = fn(*args)
+                memo.put(k, value)
+            return value
+
+        memoized.memo = memo
+        return memoized
+
+    return decorator
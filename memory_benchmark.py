@@ -0,0 +1,168 @@
+"""Measure the bytes per element of the classes the days build in bulk.
+
+Each layout builds its elements from a generated input, the same way the day
+does, and divides the memory tracemalloc sees allocated while building them
+by the number of elements. Run it before and after changing a class to see
+what the change is worth.
+
+    python memory_benchmark.py -S 10
+"""
+from argparse import ArgumentParser
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+import gc
+import json
+import tracemalloc
+
+from generators import GENERATED_DIRECTORY, write_input
+import day_eighteen
+import day_four
+import day_nineteen
+import day_sixteen
+import day_twenty
+
+
+# build every element from an input prepared up front, count the elements
+Builder = Tuple[Callable[[], List[Any]], Callable[[Any], int]]
+
+
+class LayoutMeasurement(NamedTuple):
+    layout: str
+    scale: int
+    elements: int
+    total_bytes: int
+    bytes_per_element: float
+
+
+def _build_board(rows: List[List[int]]) -> day_four.BingoBoard:
+    board = day_four.BingoBoard()
+    for row in rows:
+        board.add_row(row)
+    return board
+
+
+def bingo_items(scale: int, seed: int, directory: str) -> Builder:
+    _, boards = day_four.parse(write_input(4, scale, seed, directory))
+    return (
+        lambda: [_build_board(rows) for rows in boards],
+        lambda board: sum(len(row) for row in board.data),
+    )
+
+
+def _count_packets(packet: day_sixteen.Packet) -> int:
+    return 1 + sum(_count_packets(sub_packet) for sub_packet in packet.sub_packets)
+
+
+def packets(scale: int, seed: int, directory: str) -> Builder:
+    bits = [
+        day_sixteen.Packet.hex_to_bits(hexadecimal)
+        for hexadecimal in day_sixteen.parse(write_input(16, scale, seed, directory))
+    ]
+    return lambda: [day_sixteen.parse_packet(b) for b in bits], _count_packets
+
+
+def _count_snail_numbers(snail_number: day_eighteen.SnailNumber) -> int:
+    if isinstance(snail_number, day_eighteen.RegularNumber):
+        return 1
+    return (
+        1
+        + _count_snail_numbers(snail_number.left)
+        + _count_snail_numbers(snail_number.right)
+    )
+
+
+def snail_numbers(scale: int, seed: int, directory: str) -> Builder:
+    rows = day_eighteen.parse(write_input(18, scale, seed, directory))
+    return (
+        lambda: [day_eighteen.parse_to_snail_number(row) for row in rows],
+        _count_snail_numbers,
+    )
+
+
+def scanners(scale: int, seed: int, directory: str) -> Builder:
+    parsed = day_nineteen.parse(write_input(19, scale, seed, directory))
+    # the beacon lists are shared, this only measures the scanners
+    return (
+        lambda: [
+            day_nineteen.Scanner(scanner.identifier)
+            .add_beacons(scanner.beacons)
+            .set_coords(day_nineteen.Coords(0, 0, 0))
+            for scanner in parsed
+        ],
+        lambda scanner: 1,
+    )
+
+
+def pixels(scale: int, seed: int, directory: str) -> Builder:
+    _, bits = day_twenty.parse(write_input(20, scale, seed, directory))
+    image = day_twenty.Image(bits)
+    # the lit pixels of the image, in a single list
+    return lambda: [image.get_pixels_lit_up()], len
+
+
+LAYOUTS = {
+    "day_four.BingoItem": bingo_items,
+    "day_sixteen.Packet": packets,
+    "day_eighteen.SnailNumber": snail_numbers,
+    "day_nineteen.Scanner": scanners,
+    "day_twenty.Pixel": pixels,
+}  # type: Dict[str, Callable[[int, int, str], Builder]]
+
+
+def measure_layout(
+    layout: str, scale: int, seed: int = 0, directory: str = GENERATED_DIRECTORY
+) -> LayoutMeasurement:
+    build, count = LAYOUTS[layout](scale, seed, directory)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        elements = build()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    total = sum(count(element) for element in elements)
+    size = after - before
+    return LayoutMeasurement(layout, scale, total, size, size / total)
+
+
+def to_table(measurements: List[LayoutMeasurement]) -> str:
+    table = (
+        f"{'layout':<26} {'scale':>6} {'elements':>10} {'total (KiB)':>12} "
+        f"{'bytes/element':>14}\n"
+    )
+    for measurement in measurements:
+        table += (
+            f"{measurement.layout:<26} {measurement.scale:>6} "
+            f"{measurement.elements:>10} {measurement.total_bytes / 1024:>12.1f} "
+            f"{measurement.bytes_per_element:>14.1f}\n"
+        )
+    return table
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-L", "--layout", choices=sorted(LAYOUTS), action="append", dest="layouts"
+    )
+    parser.add_argument("-S", "--scale", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", default=GENERATED_DIRECTORY)
+    parser.add_argument("-O", "--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    measurements = [
+        measure_layout(layout, args.scale, args.seed, args.directory)
+        for layout in args.layouts or LAYOUTS
+    ]
+    print(to_table(measurements))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([m._asdict() for m in measurements], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
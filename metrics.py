@@ -0,0 +1,90 @@
+"""Count the algorithmic work a day does, next to how long it takes.
+
+Hot paths report into a process wide registry:
+
+    metrics.increment("day_fifteen.heap_pushes", pushes)
+    metrics.observe("day_nineteen.orientations_tried", trials)
+
+Counters add up, histograms keep the count, sum, min, max and power of two
+buckets of what they observe. Nothing is recorded until `enable()` is called,
+until then both functions return straight away, so the days can report
+unconditionally. Loops that would report on every iteration count into a
+local and report once instead.
+"""
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class Histogram(object):
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None  # type: Any
+        self.max = None  # type: Any
+        # bucket b holds the values v with 2 ** (b - 1) <= v < 2 ** b
+        self.buckets = defaultdict(int)  # type: Dict[int, int]
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[int(value).bit_length()] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "buckets": {
+                f"<{2 ** bucket}": count
+                for bucket, count in sorted(self.buckets.items())
+            },
+        }
+
+
+class Registry(object):
+    def __init__(self):
+        self.enabled = False
+        self.counters = defaultdict(int)  # type: Dict[str, int]
+        self.histograms = defaultdict(Histogram)  # type: Dict[str, Histogram]
+
+    def increment(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] += value
+
+    def observe(self, name: str, value: float):
+        if self.enabled:
+            self.histograms[name].observe(value)
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        metrics = dict(sorted(self.counters.items()))  # type: Dict[str, Any]
+        for name, histogram in sorted(self.histograms.items()):
+            metrics[name] = histogram.to_dict()
+        return metrics
+
+
+REGISTRY = Registry()
+
+increment = REGISTRY.increment
+observe = REGISTRY.observe
+reset = REGISTRY.reset
+snapshot = REGISTRY.snapshot
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def is_enabled() -> bool:
+    return REGISTRY.enabled
@@ -0,0 +1,170 @@
+"""Write what the days print through one buffered, leveled sink.
+
+Printing from inside a solver's loop costs a write (and with a terminal, a
+flush) per line, which at production sizes is more than the loop itself.
+The days write to a process wide sink instead:
+
+    output.line(f"fishy count after {day} days is {count}", level=output.VERBOSE)
+    output.write(grid.display(), level=output.DEBUG)
+
+Every message has a level, the sink only keeps messages at or below its own
+level (`NORMAL` until `configure` says otherwise) and drops the rest
+straight away, so the days can write unconditionally. Messages that are
+expensive to build are guarded with `enabled(level)`. Kept messages are
+buffered and written out in large blocks, when the buffer is full, on
+`flush` and when the process exits.
+
+Loops that report how far they are use a `Progress`, which writes at most
+one line every `interval` seconds however often it is updated:
+
+    progress = output.progress(len(velocities), "x velocities")
+    for i, x in enumerate(velocities):
+        progress.update(i + 1)
+    progress.done()
+
+Scripts take the level with `add_output_arguments`.
+"""
+from argparse import ArgumentParser, Namespace
+from typing import IO, List, Optional
+
+import atexit
+import sys
+import time
+
+
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+DEBUG = 3
+BUFFER_SIZE = 1 << 16
+PROGRESS_INTERVAL = 1.0
+
+
+class Output(object):
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        level: int = NORMAL,
+        buffer_size: int = BUFFER_SIZE,
+    ):
+        # None stands for whatever sys.stdout is when the buffer is written
+        self.stream = stream
+        self.level = level
+        self.buffer_size = buffer_size
+        self._buffer = []  # type: List[str]
+        self._buffered = 0
+
+    def enabled(self, level: int = NORMAL) -> bool:
+        return level <= self.level
+
+    def write(self, text: str, level: int = NORMAL):
+        if level > self.level:
+            return
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def line(self, text: str, level: int = NORMAL):
+        self.write(text + "\n", level)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        stream = self.stream or sys.stdout
+        stream.write("".join(self._buffer))
+        stream.flush()
+        self._buffer = []
+        self._buffered = 0
+
+
+class Progress(object):
+    def __init__(
+        self,
+        sink: Output,
+        total: Optional[int] = None,
+        label: str = "",
+        interval: float = PROGRESS_INTERVAL,
+        level: int = VERBOSE,
+    ):
+        self.sink = sink
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.level = level
+        self.enabled = sink.enabled(level)
+        self._started = self._last = time.monotonic()
+
+    def _report(self, done: int, now: float):
+        total = f" of {self.total}" if self.total is not None else ""
+        self.sink.line(
+            f"{self.label}: {done}{total} ({now - self._started:.1f}s)", self.level
+        )
+        # progress is read while the loop runs, it can not wait for the buffer
+        self.sink.flush()
+        self._last = now
+
+    def update(self, done: int):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._report(done, now)
+
+    def done(self):
+        if self.enabled:
+            self._report(self.total if self.total is not None else 0, time.monotonic())
+
+
+OUTPUT = Output()
+atexit.register(OUTPUT.flush)
+
+
+def configure(level: Optional[int] = None, stream: Optional[IO[str]] = None):
+    OUTPUT.flush()
+    if level is not None:
+        OUTPUT.level = level
+    if stream is not None:
+        OUTPUT.stream = stream
+
+
+def enabled(level: int = NORMAL) -> bool:
+    return OUTPUT.enabled(level)
+
+
+def write(text: str, level: int = NORMAL):
+    OUTPUT.write(text, level)
+
+
+def line(text: str, level: int = NORMAL):
+    OUTPUT.line(text, level)
+
+
+def flush():
+    OUTPUT.flush()
+
+
+def progress(
+    total: Optional[int] = None,
+    label: str = "",
+    interval: float = PROGRESS_INTERVAL,
+    level: int = VERBOSE,
+) -> Progress:
+    return Progress(OUTPUT, total, label, interval, level)
+
+
+def add_output_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="print more, once for progress and details, twice for everything",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="print nothing but errors"
+    )
+
+
+def configure_from_args(args: Namespace):
+    configure(QUIET if args.quiet else min(NORMAL + args.verbose, DEBUG))
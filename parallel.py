@@ -0,0 +1,146 @@
+"""Map a function over row chunks of numpy arrays in a pool of processes.
+
+Sending a grid to a worker with plain multiprocessing pickles all of it for
+every task. Instead the arrays are copied once into shared memory, every
+worker maps them when it starts, and tasks only carry the rows to work on.
+A chunk is a range of rows (along the first axis) plus a halo of rows on
+either side, clipped to the array, for stencils that read their neighbours.
+The results of the chunks come back in order, or folded with `reduce`.
+
+    def count_low_points(chunk, arrays):
+        heights = arrays["heights"][chunk.halo_start : chunk.halo_stop]
+        ...
+
+    with SharedPool({"heights": heights}, workers=4) as pool:
+        count = pool.map(count_low_points, len(heights), halo=1, reduce=add)
+
+Arrays the chunks write to are shared the same way, the parent reads them
+from `pool.arrays` before the pool is closed. With a single worker nothing
+is shared or started, the function runs on the arrays themselves.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import functools
+
+import numpy as np
+
+# the chunks are those of `pools`, which does without numpy
+from pools import CHUNKS_PER_WORKER, Chunk, get_chunks, get_workers
+
+
+class SharedArray(NamedTuple):
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+# the arrays of the pool a worker belongs to, mapped once when it starts
+_ARRAYS = {}  # type: Dict[str, np.ndarray]
+_SEGMENTS = []  # type: List[SharedMemory]
+
+
+def _attach(shared: Dict[str, SharedArray]):
+    for key, array in shared.items():
+        segment = SharedMemory(array.name)
+        _SEGMENTS.append(segment)
+        _ARRAYS[key] = np.ndarray(array.shape, array.dtype, buffer=segment.buf)
+
+
+def _call(fn: Callable[..., Any], chunk: Chunk, args: Tuple[Any, ...]) -> Any:
+    return fn(chunk, _ARRAYS, *args)
+
+
+class SharedPool(object):
+    def __init__(self, arrays: Dict[str, np.ndarray], workers: int = 1):
+        self.workers = get_workers(workers)
+        self.arrays = arrays
+        self._segments = []  # type: List[SharedMemory]
+        self._pool = None  # type: Optional[ProcessPoolExecutor]
+        if self.workers == 1:
+            return
+        shared = {}  # type: Dict[str, SharedArray]
+        self.arrays = {}
+        try:
+            for key, array in arrays.items():
+                # an empty segment can not be created
+                segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._segments.append(segment)
+                self.arrays[key] = np.ndarray(
+                    array.shape, array.dtype, buffer=segment.buf
+                )
+                self.arrays[key][...] = array
+                shared[key] = SharedArray(segment.name, array.shape, array.dtype.str)
+            self._pool = ProcessPoolExecutor(
+                self.workers, initializer=_attach, initargs=(shared,)
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def map(
+        self,
+        fn: Callable[..., Any],
+        length: int,
+        *args: Any,
+        halo: int = 0,
+        reduce: Optional[Callable[[Any, Any], Any]] = None,
+        initial: Any = None,
+        chunks: Optional[int] = None,
+    ) -> Any:
+        """`fn(chunk, arrays, *args)` for chunks of `length` rows
+
+        `fn` and `args` go to the workers by pickle, `fn` must be a module
+        level function. `initial` is what `reduce` gives for no rows.
+        """
+        if chunks is None:
+            chunks = self.workers * CHUNKS_PER_WORKER if self._pool else 1
+        chunked = get_chunks(length, chunks, halo)
+        if self._pool is None:
+            results = [fn(chunk, self.arrays, *args) for chunk in chunked]
+        else:
+            results = list(
+                self._pool.map(
+                    _call, [fn] * len(chunked), chunked, [args] * len(chunked)
+                )
+            )
+        if reduce is None:
+            return results
+        if not results:
+            return initial
+        return functools.reduce(reduce, results)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        # views of the segments must go before the segments can
+        self.arrays = {}
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self) -> "SharedPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parallel_map(
+    fn: Callable[..., Any],
+    arrays: Dict[str, np.ndarray],
+    length: int,
+    *args: Any,
+    workers: int = 1,
+    halo: int = 0,
+    reduce: Optional[Callable[[Any, Any], Any]] = None,
+    initial: Any = None,
+) -> Any:
+    """a single `SharedPool.map`, for arrays that are only read"""
+    with SharedPool(arrays, workers) as pool:
+        return pool.map(
+            fn, length, *args, halo=halo, reduce=reduce, initial=initial
+        )
@@ -0,0 +1,202 @@
+"""Map a function over chunks of a sequence on threads or processes.
+
+The pairwise loops of some days (every pair of snail numbers, of scanners,
+every starting velocity) are pure python and independent of each other. On
+a free-threaded CPython (3.13t and later, without the GIL) threads run them
+in parallel and share their inputs as they are. With a GIL only processes
+do, and everything a task needs is pickled to them. The backend is picked
+per run:
+
+- `threads`: a thread pool, nothing is pickled
+- `processes`: a process pool, `shared` is pickled once to every worker
+  when it starts and tasks only carry their chunk of the sequence
+- `auto`: threads without a GIL, processes with one
+
+The function gets its chunk of the sequence (a slice, ranges slice to
+ranges), then `shared`, then the other arguments:
+
+    def count_hits(velocities, target):
+        ...
+
+    with Pool(workers=4, shared=target) as pool:
+        hits = pool.map(count_hits, range(max_x + 1), reduce=add, initial=0)
+
+Functions run on threads must not change what they share, and must leave
+alone state that is not thread safe (memos, `metrics`) or report into it
+from the calling thread. With a single worker the function runs in the
+calling thread, on one chunk, whatever the backend.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import functools
+import os
+import sys
+
+
+AUTO = "auto"
+THREADS = "threads"
+PROCESSES = "processes"
+BACKENDS = (AUTO, THREADS, PROCESSES)
+
+
+# more chunks than workers evens out chunks that take longer
+CHUNKS_PER_WORKER = 4
+
+
+class UnknownBackend(Exception):
+    pass
+
+
+class Chunk(NamedTuple):
+    # rows the chunk is responsible for
+    start: int
+    stop: int
+    # rows the chunk may read, the halo around them clipped to the array
+    halo_start: int
+    halo_stop: int
+
+    @property
+    def core(self) -> slice:
+        """the chunk's own rows, within the rows it reads"""
+        return slice(self.start - self.halo_start, self.stop - self.halo_start)
+
+
+def get_chunks(length: int, count: int, halo: int = 0) -> List[Chunk]:
+    """split `length` rows into up to `count` chunks of about the same size"""
+    count = max(1, min(count, length))
+    bounds = [length * i // count for i in range(count + 1)]
+    return [
+        Chunk(start, stop, max(start - halo, 0), min(stop + halo, length))
+        for start, stop in zip(bounds, bounds[1:])
+        if stop > start
+    ]
+
+
+def get_workers(workers: int) -> int:
+    """0 stands for one worker per core"""
+    return workers or os.cpu_count() or 1
+
+
+def gil_enabled() -> bool:
+    # sys._is_gil_enabled is new in 3.13, older interpreters always have one
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+
+def get_backend(backend: str = AUTO) -> str:
+    if backend not in BACKENDS:
+        raise UnknownBackend(f"{backend!r} is not one of {', '.join(BACKENDS)}")
+    if backend == AUTO:
+        return PROCESSES if gil_enabled() else THREADS
+    return backend
+
+
+# what the pool a process worker belongs to shares, set once when it starts
+_SHARED = None  # type: Any
+
+
+def _share(shared: Any):
+    global _SHARED
+    _SHARED = shared
+
+
+def _call(fn: Callable[..., Any], items: Sequence[Any], args: Tuple[Any, ...]) -> Any:
+    return fn(items, _SHARED, *args)
+
+
+# threads share the pool's `shared` as it is
+def _call_with(
+    fn: Callable[..., Any], shared: Any, args: Tuple[Any, ...], items: Sequence[Any]
+) -> Any:
+    return fn(items, shared, *args)
+
+
+class Pool(object):
+    def __init__(self, workers: int = 1, backend: str = AUTO, shared: Any = None):
+        self.workers = get_workers(workers)
+        self.backend = get_backend(backend)
+        self.shared = shared
+        self._executor = None  # type: Optional[Executor]
+        if self.workers == 1:
+            return
+        if self.backend == THREADS:
+            self._executor = ThreadPoolExecutor(self.workers)
+        else:
+            self._executor = ProcessPoolExecutor(
+                self.workers, initializer=_share, initargs=(shared,)
+            )
+
+    def map(
+        self,
+        fn: Callable[..., Any],
+        items: Sequence[Any],
+        *args: Any,
+        reduce: Optional[Callable[[Any, Any], Any]] = None,
+        initial: Any = None,
+        chunks: Optional[int] = None,
+    ) -> Any:
+        """`fn(chunk, shared, *args)` for chunks of `items`, in order
+
+        On processes `fn` must be a module level function and the chunks and
+        `args` must pickle. `initial` is what `reduce` gives for no items.
+        """
+        if chunks is None:
+            chunks = self.workers * CHUNKS_PER_WORKER if self._executor else 1
+        chunked = [
+            items[chunk.start : chunk.stop]
+            for chunk in get_chunks(len(items), chunks)
+        ]  # type: List[Sequence[Any]]
+        if self._executor is None:
+            results = [fn(part, self.shared, *args) for part in chunked]
+        elif self.backend == THREADS:
+            call = functools.partial(_call_with, fn, self.shared, args)
+            results = list(self._executor.map(call, chunked))
+        else:
+            results = list(
+                self._executor.map(
+                    _call, [fn] * len(chunked), chunked, [args] * len(chunked)
+                )
+            )
+        if reduce is None:
+            return results
+        if not results:
+            return initial
+        return functools.reduce(reduce, results)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "Pool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pool_map(
+    fn: Callable[..., Any],
+    items: Sequence[Any],
+    *args: Any,
+    workers: int = 1,
+    backend: str = AUTO,
+    shared: Any = None,
+    reduce: Optional[Callable[[Any, Any], Any]] = None,
+    initial: Any = None,
+) -> Any:
+    """a single `Pool.map`"""
+    with Pool(workers, backend, shared) as pool:
+        return pool.map(fn, items, *args, reduce=reduce, initial=initial)
+
+
+def add_backend_argument(parser: ArgumentParser):
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=AUTO,
+        help="run the workers as threads or processes "
+        "(auto: threads when the interpreter has no GIL)",
+    )
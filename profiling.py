@@ -0,0 +1,89 @@
+"""Profile the stages of a day with cProfile and tracemalloc.
+
+Every stage (parse, part_one, part_two) runs under its own profiler and
+writes two files to the profile directory:
+
+    day_fifteen-part_two.pstats    load with `python -m pstats`
+    day_fifteen-part_two.snapshot  load with `tracemalloc.Snapshot.load`
+
+A run of only some of the parts of a day adds them to the name, e.g.
+`day_fifteen.part_one-parse.pstats`, so the tasks of a day split by part
+do not overwrite each other's files.
+
+The snapshot holds the memory still allocated when the stage returned, the
+reported allocations are the lines holding the most new memory at that point.
+Profiled runs are slower, their timings are only useful relative to each
+other.
+"""
+from typing import Any, Callable, List, NamedTuple, Tuple
+
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+
+PROFILE_DIRECTORY = ".cache/profiles"
+TRACEBACK_FRAMES = 10
+TOP = 10
+
+
+class StageProfile(NamedTuple):
+    stage: str
+    stats_path: str
+    snapshot_path: str
+    allocations: List[str]
+
+
+def profile(
+    name: str,
+    stage: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    directory: str = PROFILE_DIRECTORY,
+    top: int = TOP,
+) -> Tuple[Any, StageProfile]:
+    """run `fn` under cProfile and tracemalloc, saving both under `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    started_tracing = False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEBACK_FRAMES)
+        started_tracing = True
+    profiler = cProfile.Profile()
+    before = tracemalloc.take_snapshot()
+    try:
+        result = profiler.runcall(fn, *args)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    stats_path = os.path.join(directory, f"{name}-{stage}.pstats")
+    snapshot_path = os.path.join(directory, f"{name}-{stage}.snapshot")
+    profiler.dump_stats(stats_path)
+    after.dump(snapshot_path)
+    # leave out what tracemalloc allocates for its own snapshots
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    differences = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "lineno"
+    )
+    allocations = [str(difference) for difference in differences[:top]]
+    return result, StageProfile(stage, stats_path, snapshot_path, allocations)
+
+
+def get_hotspots(stage_profile: StageProfile, top: int = TOP) -> str:
+    """the functions with the most cumulative time, and the largest allocations"""
+    stream = io.StringIO()
+    stats = pstats.Stats(stage_profile.stats_path, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    lines = stream.getvalue().splitlines()
+    # drop the preamble pstats prints above the table
+    start = next(
+        (i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), 0
+    )
+    hotspots = f"== {stage_profile.stage} ({stage_profile.stats_path})\n"
+    hotspots += "\n".join(line for line in lines[start:] if line.strip())
+    hotspots += f"\n-- allocations ({stage_profile.snapshot_path})\n"
+    hotspots += "\n".join(stage_profile.allocations[:top])
+    return hotspots
@@ -0,0 +1,144 @@
+"""Remember answers across runs, in a SQLite database under `.cache`.
+
+An answer is keyed by the day module (including its source, and the sources
+of the repository modules it imports), the engine, the content of the input
+and any parameters, such as the part or the number of steps, so changing
+any of them computes it again. Answers are stored as
+JSON, ones that can not round trip through it are not cached. Once the
+stored answers take more than `max_bytes` the least recently used ones are
+evicted.
+
+    with ResultCache() as cache:
+        key = cache.get_key(module, engine, path, {"part": "part_one"})
+        answer = cache.get(key)
+        if answer is MISSING:
+            answer = ...
+            cache.put(key, answer)
+"""
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from digests import file_digest, module_digest
+
+
+RESULTS_PATH = ".cache/results.sqlite"
+MAX_BYTES = 64 << 20
+
+# stands for an answer that is not cached, None is a valid answer
+MISSING = object()
+
+
+class ResultCache(object):
+    def __init__(self, path: str = RESULTS_PATH, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connection = None  # type: Optional[sqlite3.Connection]
+        # inputs are often looked up once per part
+        self._digests = {}  # type: Dict[str, str]
+        self._module_digests = {}  # type: Dict[str, str]
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # several processes of a pool may share the database
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)"
+            )
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _digest(self, path: str) -> str:
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+
+    def _module_digest(self, module: ModuleType) -> str:
+        if module.__name__ not in self._module_digests:
+            self._module_digests[module.__name__] = module_digest(module)
+        return self._module_digests[module.__name__]
+
+    def get_key(
+        self,
+        module: ModuleType,
+        engine: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        key = json.dumps(
+            [
+                module.__name__,
+                self._module_digest(module),
+                engine,
+                self._digest(path),
+                params or {},
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Any:
+        row = self.connection.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return MISSING
+        with self.connection:
+            self.connection.execute(
+                "UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> bool:
+        """cache `value`, unless JSON would hand back something different"""
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            return False
+        if json.loads(encoded) != value:
+            # tuples come back as lists, keys as strings
+            return False
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, encoded, len(encoded), time.time()),
+            )
+            self._evict()
+        return True
+
+    def _evict(self):
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        rows = self.connection.execute(
+            "SELECT key, size FROM results ORDER BY last_used"
+        )
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
@@ -0,0 +1,416 @@
+"""Run day solutions as a library and report the cost of every stage.
+
+    python runner.py -D 5 -D 9 --format json
+    python runner.py -D 15 -F data/path_test.txt
+    python runner.py -D 15 --profile
+    python runner.py -D 18 --metrics
+    python runner.py -D 15 --engine reference
+    python runner.py -D 14 --cache-results
+"""
+from argparse import ArgumentParser
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import functools
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from profiling import StageProfile
+from result_cache import MISSING, ResultCache
+import engines
+import metrics
+import profiling
+import stages
+
+
+DAYS = (
+    "one",
+    "two",
+    "three",
+    "four",
+    "five",
+    "six",
+    "seven",
+    "eight",
+    "nine",
+    "ten",
+    "eleven",
+    "twelve",
+    "thirteen",
+    "fourteen",
+    "fifteen",
+    "sixteen",
+    "seventeen",
+    "eighteen",
+    "nineteen",
+    "twenty",
+    "twentyone",
+)
+
+PARTS = ("part_one", "part_two")
+# the single stage of a report answered from the result cache
+CACHED = "cached"
+
+
+class UnknownDay(Exception):
+    pass
+
+
+class StageTiming(NamedTuple):
+    stage: str
+    wall_time: float
+    cpu_time: float
+    peak_memory: int
+
+
+class DayReport(NamedTuple):
+    day: int
+    file: str
+    engine: str
+    results: Dict[str, Any]
+    timings: List[StageTiming]
+    profiles: List[StageProfile]
+    metrics: Dict[str, Dict[str, Any]]
+
+
+def get_module_name(day: int) -> str:
+    if day < 1 or day > len(DAYS):
+        raise UnknownDay(day)
+    return f"day_{DAYS[day - 1]}"
+
+
+def load_day(day: int) -> ModuleType:
+    return importlib.import_module(get_module_name(day))
+
+
+def get_default_days() -> List[int]:
+    """the days whose default input is in the tree"""
+    return [
+        day
+        for day in range(1, len(DAYS) + 1)
+        if os.path.exists(load_day(day).INPUT)
+    ]
+
+
+def run_stage(
+    stage: str, fn: Callable[..., Any], *args: Any, trace_memory: bool = True
+) -> Tuple[Any, StageTiming]:
+    """run `fn`, measuring wall time, cpu time and peak allocated bytes"""
+    started_tracing = False
+    baseline = 0
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        result = fn(*args)
+    finally:
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        peak_memory = 0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak_memory = max(peak - baseline, 0)
+            if started_tracing:
+                tracemalloc.stop()
+    return result, StageTiming(stage, wall_time, cpu_time, peak_memory)
+
+
+def run_day(
+    day: int,
+    file: Optional[str] = None,
+    parts: Sequence[str] = PARTS,
+    trace_memory: bool = True,
+    cache_parsed: bool = False,
+    profile_directory: Optional[str] = None,
+    collect_metrics: bool = False,
+    engine: str = engines.AUTO,
+    cache_results: bool = False,
+) -> DayReport:
+    """run the parse stage and then each part, with the parts of `engine`
+
+    Days that share work between their parts run it once, as stages of its
+    own before the parts, see `stages`.
+    With `profile_directory` every stage also runs under cProfile and
+    tracemalloc, see `profiling`. With `collect_metrics` the report holds
+    the counters and histograms each stage reported, see `metrics`. With
+    `cache_results` the answers come from `result_cache` when every part was
+    answered before, the report then has a single `cached` stage.
+    """
+    module = load_day(day)
+    file = file or module.INPUT
+    selected = engines.select(module, engine, os.path.getsize(file))
+    parse = module.parse
+    if cache_parsed:
+        # numpy is only needed once the cache is asked for
+        import input_cache
+
+        parse = functools.partial(input_cache.load_parsed, module)
+    timings = []  # type: List[StageTiming]
+    profiles = []  # type: List[StageProfile]
+    stage_metrics = {}  # type: Dict[str, Dict[str, Any]]
+
+    profile_name = module.__name__
+    if set(parts) != set(PARTS):
+        # the tasks of a day split by part profile their stages at once
+        profile_name += "." + "+".join(parts)
+
+    def run(stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+        if profile_directory:
+            fn = functools.partial(
+                profiling.profile,
+                profile_name,
+                stage,
+                fn,
+                directory=profile_directory,
+            )
+        if collect_metrics:
+            metrics.reset()
+            metrics.enable()
+        try:
+            result, timing = run_stage(stage, fn, *args, trace_memory=trace_memory)
+        finally:
+            if collect_metrics:
+                metrics.disable()
+                stage_metrics[stage] = metrics.snapshot()
+        if profile_directory:
+            result, stage_profile = result
+            profiles.append(stage_profile)
+        timings.append(timing)
+        return result
+
+    def report(results: Dict[str, Any]) -> DayReport:
+        return DayReport(
+            day=day,
+            file=file,
+            engine=selected.name,
+            results=results,
+            timings=timings,
+            profiles=profiles,
+            metrics=stage_metrics,
+        )
+
+    if cache_results:
+        with ResultCache() as cache:
+            keys = {
+                part: cache.get_key(module, selected.name, file, {"part": part})
+                for part in parts
+            }
+            cached = run(
+                CACHED, lambda: {part: cache.get(key) for part, key in keys.items()}
+            )
+        if all(answer is not MISSING for answer in cached.values()):
+            return report(cached)
+
+    data = run("parse", parse, file)
+    results = stages.solve(module, selected, data, parts, run)
+    if cache_results:
+        with ResultCache() as cache:
+            for part, answer in results.items():
+                cache.put(keys[part], answer)
+    return report(results)
+
+
+def to_json(reports: List[DayReport]) -> str:
+    return json.dumps(
+        [
+            {
+                "day": report.day,
+                "file": report.file,
+                "engine": report.engine,
+                "results": report.results,
+                "timings": [timing._asdict() for timing in report.timings],
+                "profiles": [
+                    {
+                        "stage": stage_profile.stage,
+                        "stats_path": stage_profile.stats_path,
+                        "snapshot_path": stage_profile.snapshot_path,
+                    }
+                    for stage_profile in report.profiles
+                ],
+                "metrics": report.metrics,
+            }
+            for report in reports
+        ],
+        indent=2,
+        default=str,
+    )
+
+
+def to_table(reports: List[DayReport]) -> str:
+    # split tasks name their stages after their parts, e.g. parse[part_one]
+    width = max(
+        [14] + [len(timing.stage) for report in reports for timing in report.timings]
+    )
+    table = (
+        f"{'day':>4} {'stage':<{width}} {'wall (s)':>10} {'cpu (s)':>10} "
+        f"{'peak (KiB)':>12}\n"
+    )
+    for report in reports:
+        for timing in report.timings:
+            table += (
+                f"{report.day:>4} {timing.stage:<{width}} {timing.wall_time:>10.4f} "
+                f"{timing.cpu_time:>10.4f} {timing.peak_memory / 1024:>12.1f}\n"
+            )
+    for report in reports:
+        for part, result in report.results.items():
+            table += f"day {report.day} {part} = {result} ({report.engine})\n"
+    for report in reports:
+        for stage, values in report.metrics.items():
+            for name, value in values.items():
+                if isinstance(value, dict):
+                    value = (
+                        f"count={value['count']} mean={value['mean']:.2f} "
+                        f"max={value['max']}"
+                    )
+                table += f"day {report.day} {stage} {name}: {value}\n"
+    return table
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-D",
+        "--day",
+        type=int,
+        action="append",
+        dest="days",
+        help="day to run, may be repeated (default: every day)",
+    )
+    parser.add_argument(
+        "-F", "--file", help="input file, only valid when running a single day"
+    )
+    parser.add_argument("-P", "--part", choices=PARTS, action="append", dest="parts")
+    parser.add_argument("--format", choices=("table", "json"), default="table")
+    parser.add_argument(
+        "-O", "--output", help="write the report here instead of stdout"
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip tracemalloc, which slows down allocation heavy days",
+    )
+    parser.add_argument(
+        "--cache-parsed",
+        action="store_true",
+        help="load parsed inputs from .cache/parsed, parsing only on a miss",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="run days on a pool of this many processes (0: one per core)",
+    )
+    parser.add_argument(
+        "--split-parts",
+        action="store_true",
+        help="with --jobs, run part one and part two of a day as separate tasks",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=profiling.PROFILE_DIRECTORY,
+        metavar="DIRECTORY",
+        help="profile every stage, writing .pstats and tracemalloc snapshots to "
+        f"DIRECTORY (default: {profiling.PROFILE_DIRECTORY}) and printing the "
+        "hotspots to stderr",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=profiling.TOP,
+        help="with --profile, how many functions to print per stage",
+    )
+    parser.add_argument(
+        "--engine",
+        default=engines.AUTO,
+        help="implementation of the parts to run, by name (default: auto, "
+        "picked from the input size)",
+    )
+    parser.add_argument(
+        "--cache-results",
+        action="store_true",
+        help="answer from .cache/results.sqlite when the same day, engine and "
+        "input were run before",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="collect the work counters the days report, per stage",
+    )
+    args = parser.parse_args()
+    if args.file and (not args.days or len(args.days) != 1):
+        parser.error("--file can only be used with a single --day")
+    return args
+
+
+def main():
+    args = get_args()
+    days = args.days
+    if not days:
+        days = get_default_days()
+        missing = sorted(set(range(1, len(DAYS) + 1)) - set(days))
+        if missing:
+            print(
+                f"skipping days {', '.join(map(str, missing))}, "
+                "their inputs are not in the tree",
+                file=sys.stderr,
+            )
+    if args.jobs != 1:
+        # imported here, the executor builds on this module
+        from executor import get_tasks, run_parallel
+
+        tasks = get_tasks(days, args.file, args.parts or PARTS, args.split_parts)
+        reports = run_parallel(
+            tasks,
+            jobs=args.jobs or None,
+            trace_memory=not args.no_memory,
+            cache_parsed=args.cache_parsed,
+            profile_directory=args.profile,
+            collect_metrics=args.metrics,
+            engine=args.engine,
+            cache_results=args.cache_results,
+        )
+    else:
+        reports = [
+            run_day(
+                day,
+                file=args.file,
+                parts=args.parts or PARTS,
+                trace_memory=not args.no_memory,
+                cache_parsed=args.cache_parsed,
+                profile_directory=args.profile,
+                collect_metrics=args.metrics,
+                engine=args.engine,
+                cache_results=args.cache_results,
+            )
+            for day in days
+        ]
+    for day_report in reports:
+        for stage_profile in day_report.profiles:
+            print(
+                f"day {day_report.day} "
+                + profiling.get_hotspots(stage_profile, args.top)
+                + "\n",
+                file=sys.stderr,
+            )
+    report = to_json(reports) if args.format == "json" else to_table(reports)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
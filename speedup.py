@@ -0,0 +1,188 @@
+"""Measure how the parallel loops of the days scale with their workers.
+
+Every (day, backend, workers) runs the part that holds the day's pairwise
+loop in a fresh interpreter, so memos and warm pools do not carry over from
+one measurement to the next. The speedup of a run is the wall time with one
+worker over its own, the efficiency is the speedup per worker. The threads
+backend only scales on a free-threaded CPython, the header says which kind
+of interpreter ran.
+
+    python speedup.py -S 10
+    python speedup.py -D 18 -W 1 -W 2 -W 4 --backend threads
+"""
+from argparse import SUPPRESS, ArgumentParser
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from generators import GENERATED_DIRECTORY, write_input
+from runner import load_day
+import pools
+
+
+# the part of every day whose loop runs on the workers
+PARTS = {17: "part_two", 18: "part_two", 19: "part_two"}
+
+
+class Run(NamedTuple):
+    day: int
+    backend: str
+    workers: int
+    wall_time: Optional[float]
+    error: Optional[str]
+
+
+def time_part(day: int, path: str, workers: int, backend: str) -> float:
+    module = load_day(day)
+    data = module.parse(path)
+    part = getattr(module, PARTS[day])
+    start = time.perf_counter()
+    part(data, workers=workers, backend=backend)
+    return time.perf_counter() - start
+
+
+def measure(
+    day: int, path: str, workers: int, backend: str, timeout: float
+) -> Run:
+    command = [sys.executable, __file__, "--measure", "-D", str(day), "-F", path]
+    command += ["-W", str(workers), "--backend", backend]
+    try:
+        process = subprocess.run(
+            command, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return Run(day, backend, workers, None, "timeout")
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ["failed"])[-1]
+        return Run(day, backend, workers, None, error)
+    return Run(day, backend, workers, json.loads(process.stdout), None)
+
+
+def get_default_workers() -> List[int]:
+    """powers of two up to the number of cores, and the number of cores"""
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 < cores:
+        workers.append(workers[-1] * 2)
+    return sorted(set(workers + [cores, 2]))
+
+
+def run_speedup(
+    days: Sequence[int],
+    paths: Dict[int, str],
+    workers: Sequence[int],
+    backends: Sequence[str],
+    timeout: float = 300,
+) -> List[Run]:
+    runs = []  # type: List[Run]
+    for day in days:
+        for backend in backends:
+            for count in sorted(set(workers) | {1}):
+                run = measure(day, paths[day], count, backend, timeout)
+                runs.append(run)
+                if run.error:
+                    break
+    return runs
+
+
+def to_table(runs: List[Run]) -> str:
+    serial = {
+        (run.day, run.backend): run.wall_time for run in runs if run.workers == 1
+    }
+    table = (
+        f"{'day':>4} {'backend':<10} {'workers':>7} {'wall (s)':>10} "
+        f"{'speedup':>8} {'efficiency':>10}\n"
+    )
+    for run in runs:
+        if run.error:
+            table += f"{run.day:>4} {run.backend:<10} {run.workers:>7} {run.error}\n"
+            continue
+        speedup = efficiency = ""
+        baseline = serial.get((run.day, run.backend))
+        if baseline:
+            speedup = f"{baseline / run.wall_time:.2f}"
+            efficiency = f"{baseline / run.wall_time / run.workers:.2f}"
+        table += (
+            f"{run.day:>4} {run.backend:<10} {run.workers:>7} "
+            f"{run.wall_time:>10.4f} {speedup:>8} {efficiency:>10}\n"
+        )
+    return table
+
+
+def get_args():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-D", "--day", type=int, action="append", dest="days", choices=sorted(PARTS)
+    )
+    parser.add_argument(
+        "-S",
+        "--scale",
+        type=int,
+        help="run on generated inputs of this scale (default: the days' inputs)",
+    )
+    parser.add_argument("-F", "--file", help="input file, for a single day")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-W",
+        "--workers",
+        type=int,
+        action="append",
+        help="worker counts to run (default: powers of two up to the cores)",
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        dest="backends",
+        choices=(pools.THREADS, pools.PROCESSES),
+        help="backends to run (default: both)",
+    )
+    parser.add_argument(
+        "-T", "--timeout", type=float, default=300, help="seconds per run"
+    )
+    parser.add_argument("--directory", default=GENERATED_DIRECTORY)
+    parser.add_argument("-O", "--output", help="also write the runs as JSON")
+    # run a single measurement and print its wall time, used by `measure`
+    parser.add_argument("--measure", action="store_true", help=SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    days = args.days or sorted(PARTS)
+    if args.measure:
+        (workers,) = args.workers
+        (backend,) = args.backends
+        print(json.dumps(time_part(days[0], args.file, workers, backend)))
+        return
+    if args.file and len(days) > 1:
+        print("-F needs a single day", file=sys.stderr)
+        sys.exit(1)
+    paths = {}  # type: Dict[int, str]
+    for day in days:
+        if args.file:
+            paths[day] = args.file
+        elif args.scale:
+            paths[day] = write_input(day, args.scale, args.seed, args.directory)
+        else:
+            paths[day] = load_day(day).INPUT
+    gil = "with" if pools.gil_enabled() else "without"
+    print(f"{sys.implementation.name} {sys.version.split()[0]}, {gil} a GIL")
+    runs = run_speedup(
+        days,
+        paths,
+        args.workers or get_default_workers(),
+        args.backends or [pools.THREADS, pools.PROCESSES],
+        args.timeout,
+    )
+    print(to_table(runs))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([run._asdict() for run in runs], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
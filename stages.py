@@ -0,0 +1,113 @@
+"""Compute what both parts of a day need once, as a small dependency graph.
+
+The parts of a day often start with the same work: aligning the scanners of
+day 19, finding the trajectories of day 17, the first fold of day 13, or
+the first steps of a simulation that part two only runs for longer. A day
+declares that work as stages, each computed from the parsed input (`data`)
+or from other stages, and registers the graph for one of its engines:
+
+    stages.register(
+        __name__,
+        Stage("first_fold", fold_first, ("data",)),
+        Stage("part_one", count_dots, ("first_fold",)),
+        Stage("part_two", fold_the_rest, ("data", "first_fold")),
+    )
+
+`solve` runs the stages the requested parts need, each once and in order,
+so the work both parts need is only done once. Stages must not change their
+inputs, other stages may read them too. Days (or engines) without a graph
+run their `part_one` and `part_two` separately, which stay the way to get a
+single part anywhere else.
+"""
+from collections import defaultdict
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import engines
+
+
+DATA = "data"
+
+
+class UnknownStage(Exception):
+    pass
+
+
+class CyclicStages(Exception):
+    pass
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...]
+
+
+class Graph(object):
+    def __init__(self, *stages: Stage):
+        self.stages = {stage.name: stage for stage in stages}
+
+    def get_order(self, targets: Sequence[str]) -> List[Stage]:
+        """the stages `targets` need, every stage after its inputs"""
+        order = []  # type: List[Stage]
+        done = {DATA}
+        visiting = set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name not in self.stages:
+                raise UnknownStage(name)
+            if name in visiting:
+                raise CyclicStages(name)
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            visiting.remove(name)
+            done.add(name)
+            order.append(self.stages[name])
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def run(
+        self,
+        data: Any,
+        targets: Sequence[str],
+        run: Optional[Callable[..., Any]] = None,
+    ) -> Dict[str, Any]:
+        """the values of `targets`, every stage run as `run(name, fn, *inputs)`"""
+        values = {DATA: data}  # type: Dict[str, Any]
+        for stage in self.get_order(targets):
+            inputs = [values[name] for name in stage.inputs]
+            if run is None:
+                values[stage.name] = stage.fn(*inputs)
+            else:
+                values[stage.name] = run(stage.name, stage.fn, *inputs)
+        return {target: values[target] for target in targets}
+
+
+GRAPHS = defaultdict(dict)  # type: Dict[str, Dict[str, Graph]]
+
+
+def register(module_name: str, *stages: Stage, engine: str = engines.DEFAULT):
+    GRAPHS[module_name][engine] = Graph(*stages)
+
+
+def get_graph(module: ModuleType, engine: str) -> Optional[Graph]:
+    return GRAPHS.get(module.__name__, {}).get(engine)
+
+
+def solve(
+    module: ModuleType,
+    engine: engines.Engine,
+    data: Any,
+    parts: Sequence[str],
+    run: Optional[Callable[..., Any]] = None,
+) -> Dict[str, Any]:
+    """the answers of `parts`, through the stages of `engine` if it has any"""
+    graph = get_graph(module, engine.name)
+    if graph is None:
+        graph = Graph(*(Stage(part, getattr(engine, part), (DATA,)) for part in parts))
+    return graph.run(data, parts, run)
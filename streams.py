@@ -0,0 +1,110 @@
+"""Read line based inputs in constant memory, however large they are.
+
+Files are read in large chunks (or memory-mapped) instead of line by line,
+and the days get a `Stream` back from `parse` instead of a list. A stream
+reads its file again every time it is iterated, so part one and part two
+can both walk an input that does not fit in memory. The file must not
+change between the two.
+
+    for depth in Stream("data/inputs.txt", iter_ints): ...
+
+`iter_ints` reads standard input for the path `-`, which can only be read
+once.
+"""
+from typing import IO, Callable, Generic, Iterator, TypeVar
+
+import contextlib
+import mmap
+import os
+import sys
+
+
+CHUNK_SIZE = 1 << 20
+STDIN = "-"
+
+T = TypeVar("T")
+
+
+def _iter_chunked_lines(path: str, chunk_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        rest = b""
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            lines = (rest + chunk).split(b"\n")
+            # the last line may continue in the next chunk
+            rest = lines.pop()
+            yield from lines
+        yield rest
+
+
+def _iter_mapped_lines(path: str) -> Iterator[bytes]:
+    if not os.path.getsize(path):
+        # an empty file can not be mapped
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        start = 0
+        while start < len(m):
+            end = m.find(b"\n", start)
+            if end == -1:
+                end = len(m)
+            yield m[start:end]
+            start = end + 1
+
+
+def iter_lines(
+    path: str, chunk_size: int = CHUNK_SIZE, use_mmap: bool = False
+) -> Iterator[bytes]:
+    """the non blank lines of a file, as bytes without their line endings"""
+    if use_mmap:
+        lines = _iter_mapped_lines(path)
+    else:
+        lines = _iter_chunked_lines(path, chunk_size)
+    for line in lines:
+        line = line.rstrip(b"\r")
+        if line:
+            yield line
+
+
+def iter_text(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    for line in iter_lines(path, chunk_size):
+        yield line.decode()
+
+
+@contextlib.contextmanager
+def open_binary(path: str) -> Iterator[IO[bytes]]:
+    """a file opened for reading bytes, or standard input for `-`"""
+    if path == STDIN:
+        # standard input stays open for whoever reads it next
+        yield sys.stdin.buffer
+        return
+    with open(path, "rb") as f:
+        yield f
+
+
+def iter_ints(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[int]:
+    """every whitespace separated integer in a file
+
+    Whole chunks are split at once, rather than line by line.
+    """
+    with open_binary(path) as f:
+        rest = b""
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            chunk = rest + chunk
+            # the last number may continue in the next chunk
+            end = max(chunk.rfind(b"\n"), chunk.rfind(b" "), chunk.rfind(b"\t"))
+            rest = chunk[end + 1 :]
+            yield from map(int, chunk[: end + 1].split())
+        yield from map(int, rest.split())
+
+
+class Stream(Generic[T]):
+    """an input that is read again from its file on every iteration"""
+
+    def __init__(self, path: str, read: Callable[[str], Iterator[T]]):
+        self.path = path
+        self.read = read
+
+    def __iter__(self) -> Iterator[T]:
+        return self.read(self.path)
+
+    def __repr__(self):
+        return f"Stream({self.path!r}, {self.read.__name__})"
@@ -0,0 +1,112 @@
+from typing import Any, Dict, List
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from daemon import BadRequest, Daemon, check_request
+import daemon
+
+
+# stand ins for daemon._solve, they run in the daemon's workers
+def _slow_solve(request: Dict[str, Any]) -> Dict[str, Any]:
+    time.sleep(1)
+    return {"results": {"part_one": request["day"]}, "wall_time": 1, "error": None}
+
+
+def _crashing_solve(request: Dict[str, Any]) -> Dict[str, Any]:
+    if request["day"] == 2:
+        # as an out of memory kill would
+        os._exit(1)
+    return {"results": {"part_one": request["day"]}, "wall_time": 0, "error": None}
+
+
+async def _send(writer: asyncio.StreamWriter, request: Dict[str, Any]):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+
+
+async def _receive(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    line = await asyncio.wait_for(reader.readline(), 30)
+    assert line, "the daemon closed the connection without answering"
+    return json.loads(line)
+
+
+async def _run(path: str, talk) -> List[Dict[str, Any]]:
+    """serve on `path` while `talk(path)` runs, return what it returns"""
+    serving = asyncio.create_task(Daemon(path, workers=1).serve())
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    try:
+        return await talk(path)
+    finally:
+        await asyncio.wait_for(serving, 30)
+
+
+def test_shutdown_answers_requests_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "_solve", _slow_solve)
+
+    async def talk(path: str) -> List[Dict[str, Any]]:
+        reader, writer = await asyncio.open_unix_connection(path)
+        await _send(writer, {"id": 1, "day": 1, "input": "1\n2\n"})
+        # let the daemon read the request before it is told to stop
+        await asyncio.sleep(0.2)
+        stop_reader, stop_writer = await asyncio.open_unix_connection(path)
+        await _send(stop_writer, {"id": 2, "op": "shutdown"})
+        responses = [await _receive(stop_reader), await _receive(reader)]
+        stop_writer.close()
+        writer.close()
+        return responses
+
+    stopped, solved = asyncio.run(_run(str(tmp_path / "solver.sock"), talk))
+    assert stopped == {"id": 2, "error": None}
+    assert solved["id"] == 1
+    assert solved["error"] is None
+    assert solved["results"] == {"part_one": 1}
+
+
+def test_dead_worker_fails_only_its_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "_solve", _crashing_solve)
+
+    async def talk(path: str) -> List[Dict[str, Any]]:
+        reader, writer = await asyncio.open_unix_connection(path)
+        responses = []
+        for request_id, day in enumerate((2, 1, 3)):
+            await _send(writer, {"id": request_id, "day": day, "input": "1\n"})
+            responses.append(await _receive(reader))
+        await _send(writer, {"op": "shutdown"})
+        await _receive(reader)
+        writer.close()
+        return responses
+
+    crashed, *solved = asyncio.run(_run(str(tmp_path / "solver.sock"), talk))
+    assert crashed["error"].startswith("BrokenProcessPool")
+    assert [response["error"] for response in solved] == [None, None]
+    assert [response["results"] for response in solved] == [
+        {"part_one": 1},
+        {"part_one": 3},
+    ]
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"day": True, "file": "input.txt"},
+        {"day": 1.0, "file": "input.txt"},
+        {"day": 1, "file": "input.txt", "cache": "false"},
+        {"day": 1, "file": "input.txt", "cache": 0},
+        {"day": 1, "file": "input.txt", "engine": 1},
+    ],
+)
+def test_check_request_types(request_):
+    with pytest.raises(BadRequest):
+        check_request(request_)
+
+
+def test_check_request_defaults():
+    request = check_request({"day": 9, "file": "input.txt", "cache": False})
+    assert request["cache"] is False
+    assert request["engine"] == "auto"